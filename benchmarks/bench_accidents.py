@@ -0,0 +1,75 @@
+# Mesure l'agrégation des accidents corporels sur un fichier synthétique de plusieurs millions de
+# lignes (ordre de grandeur de l'historique national BAAC) : ancienne méthode (quatre groupby par
+# année puis copie des colonnes) contre agreger_accidents, par année puis avec des clés plus fines
+# (mois, commune, cellule de grille). Mesure aussi la relecture de l'instantané colonne par colonne.
+# Usage : python -m benchmarks.bench_accidents [--lignes 1000000 4000000] [--communes 35000]
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from mobilite.accidents import agreger_accidents
+from mobilite.instantane import charger_instantane
+
+# Accidents simulés sur 2005-2023, positions en France métropolitaine (Web Mercator)
+def simuler(lignes, communes, generateur):
+    secondes = generateur.integers(1104537600, 1704067200, lignes)
+    return pd.DataFrame({
+        'date': pd.to_datetime(secondes, unit="s", utc=True),
+        'ntu': (generateur.random(lignes) < 0.06).astype(np.int32),
+        'nbh': generateur.poisson(0.4, lignes).astype(np.int32),
+        'nbnh': generateur.poisson(0.9, lignes).astype(np.int32),
+        'x': generateur.uniform(-530000, 910000, lignes),
+        'y': generateur.uniform(5090000, 6630000, lignes),
+        'commune': pd.Categorical.from_codes(generateur.integers(0, communes, lignes),
+                                             [f"{i:05d}" for i in range(communes)]),
+    })
+
+# Méthode d'origine du script principal
+def ancienne_methode(df):
+    df = df.copy()
+    df['year'] = df['date'].dt.year
+    groupes = df.groupby('year').agg({'ntu': 'sum', 'nbh': 'sum', 'nbnh': 'sum'}).reset_index()
+    for mesure in ('ntu', 'nbh', 'nbnh'):
+        groupes[f"{mesure}_mean"] = df.groupby('year')[mesure].mean().values
+    for mesure in ('ntu', 'nbh', 'nbnh'):
+        groupes[f"{mesure}_orig"] = groupes[mesure]
+    return groupes
+
+def chronometrer(fonction, repetitions=3):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        resultat = fonction()
+    return resultat, (time.perf_counter() - debut) / repetitions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lignes", type=int, nargs="+", default=[1_000_000, 4_000_000])
+    parser.add_argument("--communes", type=int, default=35_000)
+    parser.add_argument("--cellule", type=float, default=10_000, help="côté des cellules de grille (m)")
+    args = parser.parse_args()
+
+    regroupements = [('annee',), ('annee', 'mois'), ('annee', 'commune'), ('annee', 'cellule')]
+    print(f"{'lignes':>9} {'regroupement':>16} {'groupes':>8} {'ancienne (ms)':>14} {'agrégation (ms)':>16}")
+    for lignes in args.lignes:
+        df = simuler(lignes, args.communes, np.random.default_rng(0))
+        attendu, t_ancienne = chronometrer(lambda: ancienne_methode(df))
+        for cles in regroupements:
+            resultat, t_agregation = chronometrer(lambda: agreger_accidents(df, cles, taille_cellule=args.cellule))
+            if cles == ('annee',):
+                assert np.array_equal(resultat['ntu'], attendu['ntu']) and np.allclose(resultat['nbh_moyenne'], attendu['nbh_mean'])
+            ancienne = f"{t_ancienne * 1e3:.1f}" if cles == ('annee',) else "-"
+            print(f"{lignes:>9} {'+'.join(cles):>16} {len(resultat):>8} {ancienne:>14} {t_agregation * 1e3:>16.1f}")
+
+        # Instantané : le fichier JSON n'est analysé qu'une fois, les lancements suivants relisent les colonnes
+        with tempfile.TemporaryDirectory() as dossier:
+            source = os.path.join(dossier, "accidents.json")
+            with open(source, "w", encoding="utf-8") as fichier:
+                fichier.write("[]")
+            _, t_instantane = chronometrer(lambda: charger_instantane(source, lambda data: df, lecteur=lambda chemin: [],
+                                                                         dossier=os.path.join(dossier, "instantanes")))
+        print(f"{lignes:>9} {'instantané':>16} {'':>8} {'':>14} {t_instantane * 1e3:>16.1f}")
+
+if __name__ == "__main__":
+    main()
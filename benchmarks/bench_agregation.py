@@ -0,0 +1,33 @@
+# Mesure le regroupement en amas des arrêts de bus du dépôt multipliés par facteur (copies décalées) :
+# durée du précalcul de tous les niveaux et nombre d'amas par niveau, qui reste borné par
+# l'emprise de la ville quand le nombre de points grandit
+# Usage : python -m benchmarks.bench_agregation [--facteurs 1 10 100 1000]
+import argparse
+import time
+import numpy as np
+from mobilite import analyse
+from mobilite.agregation import TAILLES_PAR_DEFAUT, niveaux_agregation
+from benchmarks.bench_analyse import charger
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--facteurs", type=int, nargs="+", default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+
+    generateur = np.random.default_rng(0)
+    bus = analyse.analyse_data_reparation_velo_trans_comm(charger("topologie_arret_bus.json"))
+    niveaux = " ".join(f"{f'amas {taille:.0f} m':>12}" for taille in TAILLES_PAR_DEFAUT)
+    print(f"{'points':>10} {'précalcul (ms)':>15} {niveaux}")
+    for facteur in args.facteurs:
+        x = (bus['x'].to_numpy()[None, :] + generateur.normal(0, 200, size=(facteur, 1))).ravel()
+        y = (bus['y'].to_numpy()[None, :] + generateur.normal(0, 200, size=(facteur, 1))).ravel()
+        debut = time.perf_counter()
+        amas = niveaux_agregation(x, y)
+        duree = time.perf_counter() - debut
+        # Tous les points sont comptés une fois à chaque niveau
+        assert (amas.groupby('niveau')['nombre'].sum() == len(x)).all()
+        nombres = amas['niveau'].value_counts().sort_index()
+        print(f"{len(x):>10} {duree * 1e3:>15.1f} " + " ".join(f"{nombre:>12}" for nombre in nombres))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Compare les fonctions d'analyse vectorisées aux boucles d'origine
+# sur les fichiers JSON du dépôt multipliés par 100
+# Usage : python -m benchmarks.bench_analyse [--facteur 100] [--repetitions 3]
+import argparse
+import json
+import time
+import numpy as np
+from mobilite import analyse
+from benchmarks import boucles_historiques
+
+# Fonction pour charger un fichier JSON du dépôt
+def charger(chemin):
+    with open(chemin, encoding="utf-8") as fichier:
+        return json.load(fichier)
+
+# Les stations vélo ne sont disponibles qu'en temps réel : on les fabrique à partir des arrêts de bus
+def stations_velo_synthetiques(bus):
+    generateur = np.random.default_rng(0)
+    stations = []
+    for arret in bus:
+        total = int(generateur.integers(10, 40))
+        velos = int(generateur.integers(0, total + 1))
+        stations.append({"nom": arret["nom"], "coordonnees": arret["coordonnees"],
+                         "nombreemplacementsactuels": total,
+                         "nombreemplacementsdisponibles": total - velos,
+                         "nombrevelosdisponibles": velos})
+    return stations
+
+# Jeux de données (nom de la fonction d'analyse -> enregistrements)
+def jeux_de_donnees():
+    bus = charger("topologie_arret_bus.json")
+    return {
+        "analyse_station_velo": stations_velo_synthetiques(bus),
+        "analyse_data_reparation_velo": charger("stations-reparation-velo.json"),
+        "analyse_data_reparation_velo_parc_relais": charger("etat-des-parcs-relais.json"),
+        "analyse_data_reparation_velo_trans_comm": bus,
+        # Le fichier de trafic du dépôt utilise l'ancienne enveloppe "fields"
+        "analyse_data_reparation_velo_trafic": [r["fields"] for r in charger("etat-du-trafic.json")],
+    }
+
+# Colonnes renommées depuis les boucles d'origine (colonne d'origine -> colonne actuelle) : le trafic
+# n'a plus qu'une vitesse moyenne par relevé, le maximum et le minimum par route sont calculés ensuite
+CORRESPONDANCES = {
+    "analyse_data_reparation_velo_trafic": {"max_averagevehiclespeed": "averagevehiclespeed",
+                                            "min_averagevehiclespeed": "averagevehiclespeed"},
+}
+
+# Meilleur temps sur plusieurs répétitions
+def chronometrer(fonction, data, repetitions):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction(data)
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur, resultat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--facteur", type=int, default=100)
+    parser.add_argument("--repetitions", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'fonction':45} {'lignes':>9} {'boucle (s)':>11} {'vectorisé (s)':>14} {'gain':>6}")
+    for nom, data in jeux_de_donnees().items():
+        data = data * args.facteur
+        t_boucle, attendu = chronometrer(getattr(boucles_historiques, nom), data, args.repetitions)
+        t_vecto, obtenu = chronometrer(getattr(analyse, nom), data, args.repetitions)
+        # Chaque colonne de la boucle d'origine doit se retrouver avec les mêmes valeurs ; les colonnes
+        # ajoutées depuis (tronçon et champs du trafic pour l'indice de congestion) ne sont pas comparées
+        correspondances = CORRESPONDANCES.get(nom, {})
+        for colonne in attendu.columns:
+            cible = correspondances.get(colonne, colonne)
+            assert cible in obtenu.columns, (nom, cible)
+            if colonne == "date":
+                assert (attendu[colonne] == obtenu[cible]).all(), nom
+            else:
+                np.testing.assert_array_equal(np.asarray(attendu[colonne]), np.asarray(obtenu[cible]), err_msg=nom)
+        print(f"{nom:45} {len(data):>9} {t_boucle:>11.3f} {t_vecto:>14.3f} {t_boucle / t_vecto:>5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Compare la construction de la couche des pistes cyclables (boucles d'origine / tampon à plat)
+# en temps de calcul et en taille de la page HTML générée
+# Usage : python -m benchmarks.bench_geometrie [--facteur 1]
+import argparse
+import numpy as np
+from bokeh.document import Document
+from bokeh.embed import file_html
+from bokeh.events import DocumentReady
+from bokeh.models import ColumnDataSource
+from bokeh.plotting import figure
+from bokeh.resources import CDN
+from mobilite import analyse
+from mobilite.geometrie import source_multi_lignes
+from benchmarks import boucles_historiques
+from benchmarks.bench_analyse import charger, chronometrer
+
+# Taille en octets d'une page contenant uniquement la couche multi_line
+def taille_html(source, remplissage=None):
+    document = Document()
+    plot = figure(x_axis_type="mercator", y_axis_type="mercator")
+    plot.multi_line(xs='x', ys='y', source=source)
+    if remplissage is not None:
+        document.js_on_event(DocumentReady, remplissage)
+    document.add_root(plot)
+    return len(file_html(plot, CDN).encode("utf-8"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--facteur", type=int, default=1)
+    parser.add_argument("--repetitions", type=int, default=3)
+    args = parser.parse_args()
+
+    data = charger("amenagement_cyclable.json") * args.facteur
+    t_boucle, attendu = chronometrer(boucles_historiques.analyse_data_reparation_velo_pistes_cyclables, data, args.repetitions)
+    t_plat, obtenu = chronometrer(analyse.analyse_data_reparation_velo_pistes_cyclables, data, args.repetitions)
+
+    # Sur ce fichier chaque MultiLineString n'a qu'une partie : les sommets doivent être identiques
+    if len(attendu) == len(obtenu):
+        np.testing.assert_allclose(np.concatenate(obtenu['x']), np.concatenate([np.asarray(x) for x in attendu['x']]))
+        np.testing.assert_allclose(np.concatenate(obtenu['y']), np.concatenate([np.asarray(y) for y in attendu['y']]))
+
+    print(f"enregistrements : {len(data)}, parties : {len(obtenu)}")
+    taille_origine = taille_html(ColumnDataSource(attendu))
+    taille_plate = taille_html(*source_multi_lignes(obtenu))
+    print(f"boucles d'origine : {t_boucle:.3f} s, page de {taille_origine / 1e6:.2f} Mo")
+    print(f"tampon à plat     : {t_plat:.3f} s, page de {taille_plate / 1e6:.2f} Mo")
+    print(f"gain : {t_boucle / t_plat:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Mesure l'historique des relevés de trafic : coût d'ajout d'un relevé (agrégats compris), puis
+# vitesses min/max/moyenne (avec ou sans centile) de la dernière heure par dénomination et série
+# horaire avec centile, lues dans les agrégats ou recalculées en relisant les relevés bruts
+# Usage : python -m benchmarks.bench_historique [--jours 1 3] [--troncons 300] [--pas 60]
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from mobilite.historique import Historique
+
+# Relevés simulés : un par pas secondes pendant jours, vitesse propre à chaque tronçon plus du bruit
+def simuler(historique, jours, troncons, pas, generateur):
+    cles = [f"{i}_D" for i in range(troncons)]
+    denominations = [f"Voie {i % (troncons // 6 + 1)}" for i in range(troncons)]
+    base = generateur.uniform(20, 90, troncons)
+    debut = 19675 * 86400.0  # minuit UTC
+    horodatages = debut + np.arange(int(jours * 86400 / pas)) * pas
+    duree = time.perf_counter()
+    for horodatage in horodatages:
+        vitesses = np.clip(base + generateur.normal(0, 10, troncons), 0, None).round()
+        historique.ajouter("trafic", pd.DataFrame({"troncon": cles, "denomination": denominations,
+                                                   "averagevehiclespeed": vitesses}), horodatage)
+    return horodatages[-1] + pas, (time.perf_counter() - duree) / len(horodatages)
+
+# Même calcul que Historique.glissant(par_groupe=True), à partir des relevés bruts
+def glissant_brut(historique, fin, duree):
+    releves = historique.releves("trafic", "averagevehiclespeed", fin - duree, fin)
+    groupes = dict(historique.connexion.execute("SELECT cle, groupe FROM groupes WHERE jeu = 'trafic'").fetchall())
+    return releves.groupby(releves['cle'].map(groupes))['valeur'].agg(['count', 'mean', 'min', 'max', lambda v: v.quantile(0.95)])
+
+# Même calcul que Historique.agregats, à partir des relevés bruts
+def agregats_bruts(historique, fenetre):
+    releves = historique.releves("trafic", "averagevehiclespeed")
+    releves['debut'] = np.floor(releves['horodatage'] / fenetre) * fenetre
+    return releves.groupby(['cle', 'debut'])['valeur'].agg(['count', 'mean', 'min', 'max', lambda v: v.quantile(0.95)])
+
+def chronometrer(fonction, repetitions=5):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        resultat = fonction()
+    return resultat, (time.perf_counter() - debut) / repetitions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jours", type=float, nargs="+", default=[1, 3])
+    parser.add_argument("--troncons", type=int, default=300)
+    parser.add_argument("--pas", type=float, default=60, help="secondes entre deux relevés")
+    args = parser.parse_args()
+
+    print(f"{'jours':>6} {'relevés':>9} {'ajout (ms)':>11} {'heure agrégats (ms)':>20} {'+ centile (ms)':>15} {'heure brut (ms)':>16} "
+          f"{'série 1 h agrégats (ms)':>24} {'série 1 h brut (ms)':>19}")
+    for jours in args.jours:
+        with tempfile.TemporaryDirectory() as dossier, Historique(os.path.join(dossier, "historique.sqlite")) as historique:
+            fin, t_ajout = simuler(historique, jours, args.troncons, args.pas, np.random.default_rng(0))
+            glissant, t_glissant = chronometrer(lambda: historique.glissant("trafic", "averagevehiclespeed", 3600, fin, par_groupe=True,
+                                                                            centile=False))
+            avec_centile, t_centile = chronometrer(lambda: historique.glissant("trafic", "averagevehiclespeed", 3600, fin, par_groupe=True))
+            attendu, t_glissant_brut = chronometrer(lambda: glissant_brut(historique, fin, 3600))
+            # Les tranches de 15 min sont alignées sur l'heure simulée : mêmes relevés des deux côtés
+            assert np.allclose(glissant['maximum'], attendu['max']) and np.allclose(glissant['moyenne'], attendu['mean'])
+            assert np.allclose(avec_centile['p95'], attendu.iloc[:, 4])
+            serie, t_serie = chronometrer(lambda: historique.agregats("trafic", "averagevehiclespeed", "1h"))
+            attendue, t_serie_brute = chronometrer(lambda: agregats_bruts(historique, 3600))
+            assert np.allclose(serie['p95'], attendue.iloc[:, 4]) and np.allclose(serie['minimum'], attendue['min'])
+            releves = historique.connexion.execute("SELECT count(*) FROM releves_trafic").fetchone()[0]
+            print(f"{jours:>6g} {releves:>9} {t_ajout * 1e3:>11.2f} {t_glissant * 1e3:>20.2f} {t_centile * 1e3:>15.2f} {t_glissant_brut * 1e3:>16.2f} "
+                  f"{t_serie * 1e3:>24.2f} {t_serie_brute * 1e3:>19.2f}")
+
+if __name__ == "__main__":
+    main()
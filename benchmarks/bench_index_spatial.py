@@ -0,0 +1,60 @@
+# Mesure les requêtes par fenêtre de la grille spatiale contre un filtrage complet des boîtes,
+# sur les arrêts de bus et les pistes cyclables du dépôt multipliés par facteur (copies décalées)
+# Usage : python -m benchmarks.bench_index_spatial [--facteurs 1 10 100] [--requetes 1000]
+import argparse
+import time
+import numpy as np
+from mobilite import analyse
+from mobilite.geometrie import LignesMultiples
+from mobilite.index_spatial import GrilleSpatiale
+from benchmarks.bench_analyse import charger
+
+# Copies de boîtes décalées d'un petit déplacement aléatoire (densité multipliée par facteur)
+def multiplier(boites, facteur, generateur):
+    decalages = generateur.normal(0, 200, size=(2, facteur, 1))
+    copies = [boites[[0, 2]][:, None, :] + decalages[0][None], boites[[1, 3]][:, None, :] + decalages[1][None]]
+    return [copies[0][0].ravel(), copies[1][0].ravel(), copies[0][1].ravel(), copies[1][1].ravel()]
+
+# Fenêtres carrées de 500 m à 4 km de côté (carte zoomée sur un quartier) tirées dans l'emprise
+def fenetres(grille, nombre, generateur):
+    xmin, ymin, xmax, ymax = grille.emprise()
+    cx = generateur.uniform(xmin, xmax, nombre)
+    cy = generateur.uniform(ymin, ymax, nombre)
+    demi = generateur.uniform(250, 2000, nombre)
+    return np.stack([cx - demi, cy - demi, cx + demi, cy + demi], axis=1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--facteurs", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--requetes", type=int, default=1000)
+    args = parser.parse_args()
+
+    generateur = np.random.default_rng(0)
+    bus = analyse.analyse_data_reparation_velo_trans_comm(charger("topologie_arret_bus.json"))
+    pistes = analyse.analyse_data_reparation_velo_pistes_cyclables(charger("amenagement_cyclable.json"))
+    couches = {
+        "arrêts de bus": GrilleSpatiale.depuis_points(bus['x'], bus['y']).boites,
+        "pistes cyclables": GrilleSpatiale.depuis_lignes(LignesMultiples.depuis_dataframe(pistes)).boites,
+    }
+    print(f"{'couche':18} {'éléments':>9} {'construction (ms)':>18} {'grille (ms)':>12} {'filtrage (ms)':>14} {'gain':>6}")
+    for nom, boites in couches.items():
+        for facteur in args.facteurs:
+            xmin, ymin, xmax, ymax = multiplier(boites, facteur, generateur)
+            debut = time.perf_counter()
+            grille = GrilleSpatiale(xmin, ymin, xmax, ymax)
+            t_construction = time.perf_counter() - debut
+            requetes = fenetres(grille, args.requetes, generateur)
+
+            debut = time.perf_counter()
+            resultats = [grille.requete(*fenetre) for fenetre in requetes]
+            t_grille = (time.perf_counter() - debut) / len(requetes)
+            debut = time.perf_counter()
+            attendus = [np.flatnonzero((xmin <= x1) & (xmax >= x0) & (ymin <= y1) & (ymax >= y0)) for x0, y0, x1, y1 in requetes]
+            t_filtrage = (time.perf_counter() - debut) / len(requetes)
+            # Les deux méthodes doivent trouver exactement les mêmes éléments
+            assert all(np.array_equal(a, b) for a, b in zip(resultats, attendus)), nom
+            print(f"{nom:18} {len(grille):>9} {t_construction * 1e3:>18.1f} {t_grille * 1e3:>12.3f} "
+                  f"{t_filtrage * 1e3:>14.3f} {t_filtrage / t_grille:>5.1f}x")
+
+if __name__ == "__main__":
+    main()
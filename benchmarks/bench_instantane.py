@@ -0,0 +1,35 @@
+# Compare le démarrage à froid des jeux de données statiques : lecture JSON + analyse + projection
+# contre relecture de l'instantané colonne par colonne
+# Usage : python -m benchmarks.bench_instantane
+import json
+import tempfile
+import time
+from mobilite import analyse
+from mobilite.instantane import charger_instantane
+
+FICHIERS = {
+    "amenagement_cyclable.json": analyse.analyse_data_reparation_velo_pistes_cyclables,
+    "topologie_arret_bus.json": analyse.analyse_data_reparation_velo_trans_comm,
+    "stations-reparation-velo.json": analyse.analyse_data_reparation_velo,
+}
+
+def lire_json(chemin):
+    with open(chemin, encoding="utf-8") as fichier:
+        return json.load(fichier)
+
+def main():
+    with tempfile.TemporaryDirectory() as dossier:
+        print(f"{'fichier':32} {'JSON + analyse (ms)':>20} {'instantané (ms)':>16}")
+        for chemin, fonction in FICHIERS.items():
+            debut = time.perf_counter()
+            fonction(lire_json(chemin))
+            t_json = time.perf_counter() - debut
+            # Premier appel : écriture de l'instantané, second appel : relecture
+            charger_instantane(chemin, fonction, lire_json, dossier)
+            debut = time.perf_counter()
+            charger_instantane(chemin, fonction, lire_json, dossier)
+            t_instantane = time.perf_counter() - debut
+            print(f"{chemin:32} {t_json * 1000:>20.1f} {t_instantane * 1000:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Mesure la prévision de disponibilité des stations vélo : entraînement sur des moyennes par
+# tranche de 15 min simulées (profil hebdomadaire propre à chaque station plus un écart
+# autocorrélé), ajout d'une tranche, prévision de toutes les stations à 15-60 min en un appel,
+# et erreur moyenne sur la dernière semaine comparée à la persistance (valeur actuelle inchangée)
+# Usage : python -m benchmarks.bench_prevision [--stations 100 1000] [--semaines 4]
+import argparse
+import time
+import numpy as np
+from mobilite.prevision import HORIZONS, TRANCHE, TRANCHES_SEMAINE, ModeleDisponibilite
+
+# Séries simulées, stations x tranches : capacité, profil (deux pointes les jours ouvrés, plus
+# calme le week-end, décalé selon la station) et écart AR(1), bornées à [0, capacité]
+def simuler(stations, semaines, generateur, phi=0.9):
+    capacites = generateur.integers(10, 40, stations).astype(np.float64)
+    heures = np.arange(TRANCHES_SEMAINE) * TRANCHE / 3600 % 24
+    ouvres = np.arange(TRANCHES_SEMAINE) < 5 * TRANCHES_SEMAINE // 7
+    decalages = generateur.uniform(-1, 1, (stations, 1))
+    pointes = np.exp(-((heures - 8 - decalages) / 1.5) ** 2) - np.exp(-((heures - 18 - decalages) / 2) ** 2)
+    profils = capacites[:, None] * (0.5 + 0.35 * np.where(ouvres, 1.0, 0.3) * pointes * np.sign(decalages))
+    tranches = semaines * TRANCHES_SEMAINE
+    bruit = generateur.normal(0, 1, (stations, tranches)) * capacites[:, None] * 0.05
+    ecarts = np.zeros_like(bruit)
+    for t in range(1, tranches):
+        ecarts[:, t] = phi * ecarts[:, t - 1] + bruit[:, t]
+    return capacites, np.clip(np.tile(profils, semaines) + ecarts, 0, capacites[:, None])
+
+def mesurer(fonction, repetitions=1):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        resultat = fonction()
+    return (time.perf_counter() - debut) / repetitions, resultat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stations", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--semaines", type=int, default=4)
+    args = parser.parse_args()
+
+    # Lundi 00:00 heure de Paris (hiver)
+    origine = 19669 * 86400.0 - 3600
+    pas = np.array(HORIZONS) * 60 // TRANCHE
+    print(f"{'stations':>9} {'tranches':>9} {'entraîn. (ms)':>14} {'+1 tranche (ms)':>16} {'prévision (ms)':>15} "
+          + " ".join(f"{f'EAM {h} min':>11} {'persist.':>9}" for h in HORIZONS))
+    for stations in args.stations:
+        capacites, series = simuler(stations, args.semaines, np.random.default_rng(0))
+        cles = np.array([f"Station {i}" for i in range(stations)], dtype=object)
+        apprises = (args.semaines - 1) * TRANCHES_SEMAINE
+        debuts = origine + np.arange(series.shape[1]) * TRANCHE
+        modele = ModeleDisponibilite()
+        entrainement, _ = mesurer(lambda: modele.entrainer(np.repeat(cles, apprises), np.tile(debuts[:apprises], stations),
+                                                          series[:, :apprises].ravel()))
+        ajout, _ = mesurer(lambda: modele.entrainer(cles, np.full(stations, debuts[apprises]), series[:, apprises]))
+        prevision, _ = mesurer(lambda: modele.prevoir(cles, series[:, apprises], debuts[apprises], HORIZONS, capacites), 20)
+
+        # Dernière semaine : prévision depuis chaque tranche (sans réapprendre), comparée aux valeurs observées
+        erreurs, persistance = np.zeros(len(HORIZONS)), np.zeros(len(HORIZONS))
+        instants = range(apprises + 1, series.shape[1] - pas[-1])
+        for t in instants:
+            previsions, _ = modele.prevoir(cles, series[:, t], debuts[t], HORIZONS, capacites)
+            reelles = series[:, t + pas]
+            erreurs += np.abs(previsions - reelles).mean(axis=0)
+            persistance += np.abs(series[:, t, None] - reelles).mean(axis=0)
+        erreurs /= len(instants)
+        persistance /= len(instants)
+        print(f"{stations:>9} {apprises:>9} {entrainement * 1e3:>14.1f} {ajout * 1e3:>16.2f} {prevision * 1e3:>15.2f} "
+              + " ".join(f"{e:>11.2f} {p:>9.2f}" for e, p in zip(erreurs, persistance)))
+
+if __name__ == "__main__":
+    main()
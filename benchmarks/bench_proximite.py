@@ -0,0 +1,68 @@
+# Mesure la recherche des stations vélo les plus proches avec condition de disponibilité : arbre k-d
+# avec maximums par noeud, parcours complet des stations, et IndexProximite tel qu'utilisé (parcours
+# complet jusqu'à PARCOURS_COMPLET_MAX stations, arbre au-delà), ainsi que la construction de
+# l'index et la mise à jour des compteurs, sur des jeux de stations synthétiques à plusieurs échelles
+# Usage : python -m benchmarks.bench_proximite [--echelles 1 10 100] [--requetes 2000]
+import argparse
+import time
+import numpy as np
+from mobilite import analyse
+from mobilite.proximite import COMPTEURS_STATIONS, IndexProximite, index_stations_velo
+from benchmarks.synthetique import generer
+
+# Conditions mesurées : aucune, au moins 5 vélos, au moins 15 vélos et 5 emplacements libres
+CONDITIONS = [{}, {'nbre_de_velo_disponible': 5}, {'nbre_de_velo_disponible': 15, 'nbre_emplacement_vide': 5}]
+
+# Parcours complet : distances à toutes les stations, filtre, puis tri partiel
+def parcours_complet(x, y, compteurs, qx, qy, nombre, minimums):
+    distances = (x - qx) ** 2 + (y - qy) ** 2
+    retenus = np.ones(len(x), dtype=bool)
+    for nom, minimum in minimums.items():
+        retenus &= compteurs[nom] >= minimum
+    candidats = np.flatnonzero(retenus)
+    if len(candidats) > nombre:
+        candidats = candidats[np.argpartition(distances[candidats], nombre)[:nombre]]
+    return candidats[np.argsort(distances[candidats])]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--echelles", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--requetes", type=int, default=2000)
+    parser.add_argument("--nombre", type=int, default=3, help="stations renvoyées par requête")
+    args = parser.parse_args()
+
+    generateur = np.random.default_rng(0)
+    print(f"{'stations':>9} {'construction (ms)':>18} {'mise à jour (ms)':>17} {'condition':>28} "
+          f"{'arbre (req/s)':>14} {'complet (req/s)':>16} {'index (req/s)':>14}")
+    for echelle in args.echelles:
+        df = analyse.analyse_station_velo(generer("stations", echelle))
+        x, y = df['x'].to_numpy(), df['y'].to_numpy()
+        compteurs = {nom: df[nom].to_numpy() for nom in COMPTEURS_STATIONS}
+        debut = time.perf_counter()
+        index = index_stations_velo(df)
+        construction = time.perf_counter() - debut
+        debut = time.perf_counter()
+        index.mettre_a_jour(compteurs)
+        mise_a_jour = time.perf_counter() - debut
+        arbre_seul = IndexProximite.depuis_dataframe(df, COMPTEURS_STATIONS)
+        arbre_seul.parcours_complet = False
+        points = generateur.uniform([x.min(), y.min()], [x.max(), y.max()], size=(args.requetes, 2)).tolist()
+        for minimums in CONDITIONS:
+            debut = time.perf_counter()
+            for qx, qy in points:
+                arbre_seul.plus_proches(qx, qy, args.nombre, minimums)
+            arbre = time.perf_counter() - debut
+            debut = time.perf_counter()
+            for qx, qy in points:
+                index.plus_proches(qx, qy, args.nombre, minimums)
+            choisi = time.perf_counter() - debut
+            debut = time.perf_counter()
+            for qx, qy in points:
+                parcours_complet(x, y, compteurs, qx, qy, args.nombre, minimums)
+            complet = time.perf_counter() - debut
+            condition = ", ".join(f"{nom.split('_')[-2]}>={minimum}" for nom, minimum in minimums.items()) or "aucune"
+            print(f"{len(df):>9} {construction * 1e3:>18.2f} {mise_a_jour * 1e3:>17.2f} {condition:>28} "
+                  f"{args.requetes / arbre:>14.0f} {args.requetes / complet:>16.0f} {args.requetes / choisi:>14.0f}")
+
+if __name__ == "__main__":
+    main()
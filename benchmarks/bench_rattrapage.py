@@ -0,0 +1,50 @@
+# Mesure le débit du rattrapage de l'historique du trafic : etat-du-trafic.json est recopié en
+# autant de fichiers que demandé (relevés décalés de 5 minutes d'un fichier à l'autre, moitié
+# dans l'ancienne enveloppe, moitié au format v2.1), puis chargé avec 1 à N processus.
+# Le débit est extrapolé à une année de relevés toutes les 5 minutes.
+# Usage : python -m benchmarks.bench_rattrapage [--fichiers 48] [--processus 1 2 4]
+import argparse
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from mobilite.historique import Historique
+from mobilite.rattrapage import rattraper
+from benchmarks.bench_analyse import charger
+
+# Écrit nombre copies de l'archive dans dossier, la i-ème décalée de i * 5 minutes
+def ecrire_archives(enregistrements, dossier, nombre):
+    for i in range(nombre):
+        decalage = timedelta(minutes=5 * i)
+        copie = []
+        for enregistrement in enregistrements:
+            champs = dict(enregistrement["fields"])
+            champs["datetime"] = (datetime.fromisoformat(champs["datetime"]) + decalage).isoformat()
+            if i % 2:
+                copie.append(champs)
+            else:
+                copie.append({**enregistrement, "recordid": f"{enregistrement['recordid']}-{i}", "fields": champs})
+        with open(os.path.join(dossier, f"trafic_{i:04d}.json"), "w", encoding="utf-8") as fichier:
+            json.dump({"results": copie} if i % 2 else copie, fichier)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fichiers", type=int, default=48)
+    parser.add_argument("--processus", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    enregistrements = charger("etat-du-trafic.json")
+    annee = 365 * 24 * 12 * len(enregistrements)
+    with tempfile.TemporaryDirectory() as dossier:
+        archives = os.path.join(dossier, "archives")
+        os.makedirs(archives)
+        ecrire_archives(enregistrements, archives, args.fichiers)
+        print(f"{'processus':>9} {'enregistrements':>16} {'ajoutés':>9} {'durée (s)':>10} {'enr./s':>9} {'une année (h)':>14}")
+        for processus in args.processus:
+            with Historique(os.path.join(dossier, f"historique_{processus}.sqlite")) as historique:
+                mesures = rattraper([archives], historique, processus)
+            print(f"{processus:>9} {mesures['lus']:>16} {mesures['ajoutes']:>9} {mesures['duree']:>10.1f} "
+                  f"{mesures['debit']:>9.0f} {annee / mesures['debit'] / 3600:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Compte, sans navigateur, les éléments dessinés par les cartes (stations vélo et pistes cyclables,
+# stations de réparation, arrêts de bus, congestion du trafic, parcs relais) selon le moteur de rendu : un glyphe WebGL
+# est dessiné en un appel quel que soit son nombre d'éléments, un glyphe canvas en un tracé par
+# élément. Jeux synthétiques à plusieurs échelles, couches complètes (sans découpage selon la vue).
+# Usage : python -m benchmarks.bench_rendu [--echelles 1 10 100] [--detail]
+import argparse
+from bokeh.models import ColumnDataSource
+from bokeh.plotting import figure
+from mobilite import analyse
+from mobilite.rendu import MODES, appliquer_rendu, rapport_rendu, totaux_rendu
+from mobilite.temps_reel import carte_trafic, lignes_trafic
+from benchmarks.synthetique import generer
+
+# Les cinq cartes du tableau de bord avec les mêmes glyphes, sur les jeux à l'échelle donnée
+def cartes(echelle):
+    stations = analyse.analyse_station_velo(generer("stations", echelle))
+    pistes = analyse.analyse_data_reparation_velo_pistes_cyclables(generer("amenagement", echelle))
+    reparation = analyse.analyse_data_reparation_velo(generer("reparation", echelle))
+    bus = analyse.analyse_data_reparation_velo_trans_comm(generer("bus_metro", echelle))
+    parcs = analyse.analyse_data_reparation_velo_parc_relais(generer("parcs_relais", echelle))
+    releve_trafic = analyse.analyse_data_reparation_velo_trafic(generer("trafic", echelle))
+    lignes = lignes_trafic(releve_trafic)
+    trafic = dict(carte_trafic(releve_trafic), x=lignes.vues(0), y=lignes.vues(1))
+
+    plot_velo = figure(title="Stations vélo et pistes", x_axis_type="mercator", y_axis_type="mercator")
+    plot_velo.scatter(x="x", y="y", size=9, source=ColumnDataSource(stations))
+    plot_velo.multi_line(xs="x", ys="y", source=ColumnDataSource(dict(x=list(pistes['x']), y=list(pistes['y']))))
+    plot_reparation = figure(title="Stations de réparation", x_axis_type="mercator", y_axis_type="mercator")
+    plot_reparation.scatter(x="x", y="y", marker="triangle", size=10, source=ColumnDataSource(reparation[['x', 'y']]))
+    plot_bus = figure(title="Arrêts de bus et métro", x_axis_type="mercator", y_axis_type="mercator")
+    plot_bus.scatter(x="x", y="y", size=3, source=ColumnDataSource(bus[['x', 'y']]))
+    plot_trafic = figure(title="Congestion du trafic", x_axis_type="mercator", y_axis_type="mercator")
+    plot_trafic.multi_line(xs="x", ys="y", line_width=3, source=ColumnDataSource(trafic))
+    plot_parcs = figure(title="Parcs relais", x_axis_type="mercator", y_axis_type="mercator")
+    plot_parcs.scatter(x="x", y="y", marker="diamond", size=15, source=ColumnDataSource(parcs[['x', 'y']]))
+    return [plot_velo, plot_reparation, plot_bus, plot_trafic, plot_parcs]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--echelles", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--detail", action="store_true", help="une ligne par glyphe")
+    args = parser.parse_args()
+
+    print(f"{'échelle':>7} {'moteur':>7} {'glyphes gl':>11} {'éléments gl':>12} {'glyphes canvas':>15} "
+          f"{'éléments canvas':>16} {'appels de dessin':>17}")
+    for echelle in args.echelles:
+        figures = cartes(echelle)
+        for mode in MODES:
+            appliquer_rendu(figures, mode)
+            totaux = totaux_rendu(figures)
+            (glyphes_gl, elements_gl, appels_gl), (glyphes_canvas, elements_canvas, appels_canvas) = totaux["webgl"], totaux["canvas"]
+            print(f"{echelle:>7} {mode:>7} {glyphes_gl:>11} {elements_gl:>12} {glyphes_canvas:>15} "
+                  f"{elements_canvas:>16} {appels_gl + appels_canvas:>17}")
+            if args.detail:
+                print(rapport_rendu(figures) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Mesure le réseau des aménagements cyclables : construction du graphe, distances entre toutes les
+# paires de stations vélo (premier calcul puis rafraîchissement, positions inchangées), couverture,
+# et itinéraires entre deux stations tirées au hasard (A* contre Dijkstra sans heuristique)
+# Usage : python -m benchmarks.bench_reseau [--echelles 1 10] [--itineraires 500]
+import argparse
+import time
+import numpy as np
+from mobilite import analyse
+from mobilite.reseau import ReseauCyclable, couverture
+from benchmarks.bench_analyse import charger
+from benchmarks.synthetique import generer
+
+# Durée d'un appel de fonction() et son résultat
+def mesurer(fonction):
+    debut = time.perf_counter()
+    resultat = fonction()
+    return time.perf_counter() - debut, resultat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--echelles", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--itineraires", type=int, default=500)
+    args = parser.parse_args()
+
+    pistes = analyse.analyse_data_reparation_velo_pistes_cyclables(charger("amenagement_cyclable.json"))
+    duree, reseau = mesurer(lambda: ReseauCyclable.depuis_dataframe(pistes))
+    print(f"Réseau : {len(reseau)} noeuds, {reseau.nb_aretes} arêtes, construit en {duree * 1e3:.1f} ms\n")
+    print(f"{'stations':>9} {'paires (ms)':>12} {'rafraîch. (ms)':>15} {'couverture':>11} {'A* (ms)':>8} {'Dijkstra (ms)':>14}")
+    generateur = np.random.default_rng(0)
+    for echelle in args.echelles:
+        stations = analyse.analyse_station_velo(generer("stations", echelle))
+        x, y = stations['x'].to_numpy(), stations['y'].to_numpy()
+        paires, _ = mesurer(lambda: reseau.distances_stations(x, y))
+        rafraichissement, parts = mesurer(lambda: couverture(reseau, x, y))
+        tirages = generateur.integers(0, len(stations), size=(args.itineraires, 2))
+        # Parcours entre les noeuds de rattachement de stations reliées, arrêtés dès que la station
+        # d'arrivée est atteinte
+        noeuds, _ = reseau.rattacher(x, y)
+        tirages = [(int(noeuds[i]), int(noeuds[j])) for i, j in tirages
+                   if noeuds[i] >= 0 and noeuds[j] >= 0 and reseau.composantes[noeuds[i]] == reseau.composantes[noeuds[j]]]
+        a_etoile, _ = mesurer(lambda: [reseau._parcourir({i: 0.0}, cibles=[j], cible_xy=(reseau.x[j], reseau.y[j]))
+                                       for i, j in tirages])
+        dijkstra, _ = mesurer(lambda: [reseau._parcourir({i: 0.0}, cibles=[j]) for i, j in tirages])
+        print(f"{len(stations):>9} {paires * 1e3:>12.1f} {rafraichissement * 1e3:>15.2f} {parts.mean():>10.1%} "
+              f"{a_etoile / len(tirages) * 1e3:>8.3f} {dijkstra / len(tirages) * 1e3:>14.3f}")
+
+if __name__ == "__main__":
+    main()
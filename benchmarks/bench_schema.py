@@ -0,0 +1,39 @@
+# Mesure l'effet du schéma de types compacts (mobilite.schema) sur chaque jeu à plusieurs échelles :
+# mémoire du DataFrame analysé (profonde) et octets de sa ColumnDataSource sérialisée, sans schéma
+# (texte, int64/float64) puis avec (catégories, int16/float32, colonnes catégorielles codées et
+# valeurs distinctes envoyées une fois aux infobulles). Le gain en octets reste faible pour les jeux
+# dont les coordonnées float64 (et les géométries) font l'essentiel, le schéma n'y touchant pas
+# Usage : python -m benchmarks.bench_schema [--echelles 1 10 100]
+import argparse
+from mobilite import analyse
+from mobilite.schema import SCHEMAS, mesurer_schema
+from benchmarks.synthetique import generer
+
+# Fonction d'analyse de chaque jeu ayant un schéma
+ANALYSES = {
+    "stations": analyse.analyse_station_velo,
+    "reparation": analyse.analyse_data_reparation_velo,
+    "amenagement": analyse.analyse_data_reparation_velo_pistes_cyclables,
+    "parcs_relais": analyse.analyse_data_reparation_velo_parc_relais,
+    "bus_metro": analyse.analyse_data_reparation_velo_trans_comm,
+    "accidents": analyse.analyse_accidents,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--echelles", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--jeux", nargs="+", choices=list(SCHEMAS), default=list(SCHEMAS))
+    args = parser.parse_args()
+
+    print(f"{'jeu':14} {'échelle':>7} {'lignes':>8} {'mémoire avant':>14} {'après':>11} {'gain':>6} "
+          f"{'octets avant':>13} {'après':>11} {'gain':>6}")
+    for jeu in args.jeux:
+        for echelle in args.echelles:
+            df = ANALYSES[jeu](generer(jeu, echelle))
+            memoire_avant, memoire_apres, octets_avant, octets_apres = mesurer_schema(df, jeu)
+            print(f"{jeu:14} {echelle:>7} {len(df):>8} {memoire_avant:>14} {memoire_apres:>11} "
+                  f"{memoire_avant / memoire_apres:>5.1f}x {octets_avant:>13} {octets_apres:>11} "
+                  f"{octets_avant / octets_apres:>5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Versions d'origine des fonctions d'analyse (boucles enregistrement par enregistrement),
+# conservées uniquement comme référence pour les mesures de performance
+from datetime import datetime
+from pandas import DataFrame
+from mobilite.extraction import coor_wgs84_to_web_mercator
+
+def analyse_data_reparation_velo(data):
+    lieu = []
+    etat = []
+    gonflage = []
+    reparation = []
+    coordsx = []
+    coordsy = []
+    for station in data:
+        etat.append(station["etat"])
+        lieu.append(station["gml_id"])
+        gonflage.append(station["gonflage"])
+        reparation.append(station["reparation"])
+        lat, lon = station["geo_shape"]["geometry"]["coordinates"][0][1], station["geo_shape"]["geometry"]["coordinates"][0][0]
+        x, y = coor_wgs84_to_web_mercator(lon, lat)
+        coordsx.append(x)
+        coordsy.append(y)
+    return DataFrame({'Lieu': lieu, 'gonflage': gonflage, 'etat': etat, 'x': coordsx, 'y': coordsy, "reparation": reparation})
+
+def analyse_station_velo(data):
+    nom = []
+    total_possible = []
+    nbre_emplacement_vide = []
+    nbre_de_velo_disponible = []
+    coordsx = []
+    coordsy = []
+    for station in data:
+        nom.append(station["nom"])
+        total_possible.append(station["nombreemplacementsactuels"])
+        nbre_emplacement_vide.append(station["nombreemplacementsdisponibles"])
+        nbre_de_velo_disponible.append(station["nombrevelosdisponibles"])
+        lat, lon = station["coordonnees"]['lat'], station["coordonnees"]['lon']
+        x, y = coor_wgs84_to_web_mercator(lon, lat)
+        coordsx.append(x)
+        coordsy.append(y)
+    return DataFrame({'nom': nom, 'total_possible': total_possible, 'nbre_emplacement_vide': nbre_emplacement_vide, 'x': coordsx, 'y': coordsy, "nbre_de_velo_disponible": nbre_de_velo_disponible})
+
+def analyse_data_reparation_velo_pistes_cyclables(data):
+    type_amenagement = []
+    position = []
+    coordsx = []
+    coordsy = []
+    for station in data:
+        type_amenagement.append(station["type_amenagement"])
+        position.append(station["rive"])
+        coords = station["geo_shape"]["geometry"]["coordinates"][0]
+        c_x = []
+        c_y = []
+        for c in coords:
+            x, y = coor_wgs84_to_web_mercator(c[0], c[1])
+            c_x.append(x)
+            c_y.append(y)
+        coordsx.append(c_x)
+        coordsy.append(c_y)
+    return DataFrame({'type_amenagement': type_amenagement, 'position': position, 'x': coordsx, 'y': coordsy})
+
+def analyse_data_reparation_velo_parc_relais(data):
+    nom = []
+    place_dispo_vehicule_ordi = []
+    capacity = []
+    etat = []
+    date = []
+    place_dispo_vehicule_elec = []
+    place_dispo_covoit = []
+    place_dispo_PMR = []
+    coordsx = []
+    coordsy = []
+    for station in data:
+        nom.append(station["nom"])
+        date.append(datetime.fromisoformat(station["lastupdate"]))
+        capacity.append(station["capaciteparking"])
+        etat.append(station["etatouverture"])
+        place_dispo_vehicule_ordi.append(station["jrdinfosoliste"])
+        place_dispo_vehicule_elec.append(station["jrdinfoelectrique"])
+        place_dispo_covoit.append(station["jrdinfocovoiturage"])
+        place_dispo_PMR.append(station["jrdinfopmr"])
+        lat, lon = station["coordonnees"]['lat'], station["coordonnees"]['lon']
+        x, y = coor_wgs84_to_web_mercator(lon, lat)
+        coordsx.append(x)
+        coordsy.append(y)
+    return DataFrame({'date': date, 'etat': etat, 'nom': nom, 'place_dispo_voit_perso': place_dispo_vehicule_ordi, 'place_dispo_voit_elec': place_dispo_vehicule_elec, 'place_dispo_PMR': place_dispo_PMR, 'x': coordsx, 'y': coordsy, "place_dispo_covoit": place_dispo_covoit, 'capacity': capacity})
+
+def analyse_data_reparation_velo_trans_comm(data):
+    nom = []
+    coordsx = []
+    coordsy = []
+    for station in data:
+        nom.append(station["nom"])
+        lat, lon = station["coordonnees"]['lat'], station["coordonnees"]['lon']
+        x, y = coor_wgs84_to_web_mercator(lon, lat)
+        coordsx.append(x)
+        coordsy.append(y)
+    return DataFrame({'x': coordsx, 'y': coordsy, 'nom': nom})
+
+def analyse_data_reparation_velo_trafic(data):
+    max_averagevehiclespeed = []
+    min_averagevehiclespeed = []
+    denomination = []
+    for station in data:
+        max_averagevehiclespeed.append(station["averagevehiclespeed"])
+        min_averagevehiclespeed.append(station["averagevehiclespeed"])
+        denomination.append(station["denomination"])
+    return DataFrame({"max_averagevehiclespeed": max_averagevehiclespeed, "min_averagevehiclespeed": min_averagevehiclespeed, "denomination": denomination})
@@ -0,0 +1,63 @@
+# Rapport sur la simplification des pistes cyclables et des tronçons de trafic :
+# nombre de sommets par tolérance et taille de la page HTML avant / après
+# Usage : python -m benchmarks.rapport_simplification [--tolerances 16 4 1]
+import argparse
+import time
+from bokeh.document import Document
+from bokeh.embed import file_html
+from bokeh.events import DocumentReady
+from bokeh.models import ColumnDataSource
+from bokeh.plotting import figure
+from bokeh.resources import CDN
+from mobilite.analyse import analyse_data_reparation_velo_pistes_cyclables
+from mobilite.geometrie import LignesMultiples, source_multi_lignes
+from mobilite.simplification import TOLERANCES_PAR_DEFAUT, simplifier, source_multi_lignes_simplifiees, suivre_zoom
+from benchmarks.bench_analyse import charger
+
+# Taille en octets d'une page contenant uniquement la couche multi_line
+def taille_page(df, mode, tolerances):
+    document = Document()
+    plot = figure(x_axis_type="mercator", y_axis_type="mercator", width=1200, height=360)
+    if mode == "origine":
+        # Listes Python de sommets, comme dans l'index.html d'origine
+        source = ColumnDataSource(df.assign(x=[list(map(float, x)) for x in df['x']],
+                                            y=[list(map(float, y)) for y in df['y']]))
+    elif mode == "tampon":
+        source, remplissage = source_multi_lignes(df)
+        document.js_on_event(DocumentReady, remplissage)
+    else:
+        source, remplissage = source_multi_lignes_simplifiees(df, tolerances)
+        suivre_zoom(plot, remplissage)
+        document.js_on_event(DocumentReady, remplissage)
+    plot.multi_line(xs='x', ys='y', source=source)
+    document.add_root(plot)
+    return len(file_html(plot, CDN).encode("utf-8"))
+
+# Nombre de sommets et temps de simplification pour chaque tolérance
+def rapport_sommets(nom, lignes, tolerances):
+    print(f"{nom} : {lignes.nb_parties} parties, {lignes.nb_sommets} sommets bruts")
+    for tolerance in sorted(tolerances, reverse=True):
+        debut = time.perf_counter()
+        simplifiees = simplifier(lignes, tolerance)
+        duree = time.perf_counter() - debut
+        print(f"  tolérance {tolerance:>5g} m : {simplifiees.nb_sommets:>7} sommets "
+              f"({100 * simplifiees.nb_sommets / lignes.nb_sommets:5.1f} %) en {duree * 1000:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tolerances", type=float, nargs="+", default=list(TOLERANCES_PAR_DEFAUT))
+    args = parser.parse_args()
+
+    pistes = analyse_data_reparation_velo_pistes_cyclables(charger("amenagement_cyclable.json"))
+    rapport_sommets("Pistes cyclables", LignesMultiples.depuis_dataframe(pistes), args.tolerances)
+    trafic = [r["fields"]["geo_shape"] for r in charger("etat-du-trafic.json")]
+    rapport_sommets("Tronçons de trafic", LignesMultiples.depuis_geometries(trafic).projeter(), args.tolerances)
+
+    print("Taille de la page des pistes cyclables :")
+    for mode, libelle in (("origine", "listes de sommets (origine)"),
+                          ("tampon", "tampons à plat, sans simplification"),
+                          ("niveaux", f"niveaux de détail {sorted(args.tolerances, reverse=True)}")):
+        print(f"  {libelle:45} {taille_page(pistes, mode, args.tolerances) / 1e3:8.1f} ko")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# Suite de mesures reproductible, hors ligne : jeux synthétiques à plusieurs échelles (1x = taille des
+# jeux de Rennes), jeux en temps réel servis par un serveur local. Pour chaque échelle et chaque jeu :
+# téléchargement paginé (jeux en ligne), fonction analyse_*, agrégation des accidents, construction
+# des ColumnDataSource, puis sérialisation de la page complète (exporter_page).
+# Les résultats sont enregistrés par commit dans .cache/benchmarks/ ; --comparer signale les étapes
+# plus lentes qu'une mesure précédente (code de sortie 1 en cas de régression).
+# Usage : python -m benchmarks.suite [--echelles 1 10 100 [1000]] [--repetitions 3] [--comparer <commit ou fichier>]
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from bokeh.document import Document
+from bokeh.models import Column, ColumnDataSource
+from bokeh.plotting import figure
+from pandas import DataFrame
+from mobilite import analyse
+from mobilite.accidents import agreger_accidents
+from mobilite.cache import DOSSIER_CACHE
+from mobilite.export import exporter_page
+from mobilite.pagination import iterer_enregistrements
+from mobilite.simplification import source_multi_lignes_simplifiees
+from mobilite.telechargement import ClientHTTP
+from mobilite.temps_reel import carte_trafic, lignes_trafic
+from benchmarks.synthetique import JEUX_EN_LIGNE, ServeurFactice, generer, modeles
+
+DOSSIER_RESULTATS = os.path.join(DOSSIER_CACHE, "benchmarks")
+# Fonction d'analyse de chaque jeu
+ANALYSES = {
+    "stations": analyse.analyse_station_velo,
+    "parcs_relais": analyse.analyse_data_reparation_velo_parc_relais,
+    "trafic": analyse.analyse_data_reparation_velo_trafic,
+    "amenagement": analyse.analyse_data_reparation_velo_pistes_cyclables,
+    "bus_metro": analyse.analyse_data_reparation_velo_trans_comm,
+    "reparation": analyse.analyse_data_reparation_velo,
+    "accidents": analyse.analyse_accidents,
+}
+# Au-dessus de cette échelle, chaque étape n'est mesurée qu'une fois
+ECHELLE_UNE_REPETITION = 100
+# En dessous de cette durée (s), les écarts avec la référence sont du bruit
+DUREE_SIGNIFICATIVE = 0.005
+
+# Meilleur temps de fonction() sur repetitions essais, et son dernier résultat
+def chronometrer(fonction, repetitions):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur, resultat
+
+# Commit courant (12 caractères) et présence de modifications non enregistrées
+def version_depot():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short=12", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        modifie = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                      capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnu", False
+    return commit, modifie
+
+# Figure minimale d'un jeu, telle que le tableau de bord la construit (un glyphe par source)
+def figure_jeu(nom, source):
+    plot = figure(width=600, height=300)
+    if nom in ("amenagement", "trafic"):
+        plot.multi_line(xs="x", ys="y", source=source)
+    elif nom == "accidents":
+        plot.vbar_stack(["ntu", "nbh", "nbnh"], x="annee", width=0.5, source=source)
+    else:
+        plot.scatter(x="x", y="y", source=source)
+    return plot
+
+# Mesures d'une échelle : liste de dict(echelle, jeu, etape, lignes, duree)
+def mesurer_echelle(echelle, modeles_jeux, repetitions):
+    resultats = []
+
+    def noter(jeu, etape, lignes, duree):
+        resultats.append(dict(echelle=echelle, jeu=jeu, etape=etape, lignes=lignes, duree=duree))
+        print(f"{echelle:>7} {jeu:>13} {etape:>16} {lignes:>10} {duree * 1e3:>12.1f}", flush=True)
+
+    sources = {}
+    for nom, analyse_jeu in ANALYSES.items():
+        enregistrements = generer(nom, echelle, modeles_jeux)
+        if nom in JEUX_EN_LIGNE:
+            with ServeurFactice({nom: enregistrements}) as serveur:
+                duree, _ = chronometrer(lambda: sum(1 for _ in iterer_enregistrements(ClientHTTP(), serveur.url(nom))), repetitions)
+            noter(nom, "telechargement", len(enregistrements), duree)
+        duree, df = chronometrer(lambda: analyse_jeu(enregistrements), repetitions)
+        noter(nom, "analyse", len(df), duree)
+        del enregistrements
+        if nom == "accidents":
+            duree, df = chronometrer(lambda: agreger_accidents(df, cles=("annee",)), repetitions)
+            noter(nom, "agregation", len(df), duree)
+            df = df[["annee", "nombre", "ntu", "nbh", "nbnh"]]
+        elif nom == "trafic":
+            releve = df
+            duree, df = chronometrer(lambda: carte_trafic(releve), repetitions)
+            noter(nom, "congestion", len(df["denomination"]), duree)
+            # Sommets à part, en tampons à plat comme dans la page
+            lignes = lignes_trafic(releve)
+            df = DataFrame({**df, 'x': lignes.vues(0), 'y': lignes.vues(1)})
+        if nom in ("amenagement", "trafic"):
+            duree, (source, _) = chronometrer(lambda: source_multi_lignes_simplifiees(df), repetitions)
+        else:
+            duree, source = chronometrer(lambda: ColumnDataSource(data=df), repetitions)
+        noter(nom, "cds", len(next(iter(source.data.values()))), duree)
+        sources[nom] = source
+
+    # Page complète (sans sous-onglets différés, le document n'est pas modifié par l'export)
+    document = Document()
+    document.add_root(Column(*[figure_jeu(nom, source) for nom, source in sources.items()]))
+    with tempfile.TemporaryDirectory() as dossier:
+        duree, tailles = chronometrer(lambda: exporter_page(document, os.path.join(dossier, "index.html")), repetitions)
+    noter("page", "serialisation", tailles["index.json"], duree)
+    return resultats
+
+# Fichier de résultats d'une référence : chemin existant, ou préfixe de commit dans dossier
+def fichier_reference(reference, dossier=DOSSIER_RESULTATS):
+    if os.path.isfile(reference):
+        return reference
+    candidats = sorted(glob.glob(os.path.join(dossier, f"{reference}*.json")), key=os.path.getmtime)
+    if not candidats:
+        raise SystemExit(f"Aucun résultat enregistré pour {reference} dans {dossier}")
+    return candidats[-1]
+
+# Compare deux séries de mesures ; renvoie le nombre de régressions (rapport > seuil)
+def comparer(resultats, reference, seuil):
+    references = {(r["echelle"], r["jeu"], r["etape"]): r["duree"] for r in reference["resultats"]}
+    regressions = 0
+    print(f"\nComparaison avec {reference['commit']}{' (modifié)' if reference['modifie'] else ''} du {reference['date']}")
+    print(f"{'échelle':>7} {'jeu':>13} {'étape':>16} {'réf. (ms)':>10} {'durée (ms)':>11} {'rapport':>8}")
+    for r in resultats:
+        ancienne = references.get((r["echelle"], r["jeu"], r["etape"]))
+        if ancienne is None:
+            continue
+        rapport = r["duree"] / ancienne if ancienne else float("inf")
+        regression = rapport > seuil and r["duree"] > DUREE_SIGNIFICATIVE
+        regressions += regression
+        print(f"{r['echelle']:>7} {r['jeu']:>13} {r['etape']:>16} {ancienne * 1e3:>10.1f} {r['duree'] * 1e3:>11.1f} "
+              f"{rapport:>7.2f}x{'  RÉGRESSION' if regression else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--echelles", type=int, nargs="+", default=[1, 10, 100],
+                        help="multiples de la taille des jeux de Rennes (1000 : plusieurs Go de mémoire)")
+    parser.add_argument("--repetitions", type=int, default=3, help="meilleur de n essais (un seul au-delà de 100x)")
+    parser.add_argument("--sortie", default=None, help="fichier de résultats (par défaut .cache/benchmarks/<commit>.json)")
+    parser.add_argument("--comparer", default=None, help="commit (préfixe) ou fichier de résultats de référence")
+    parser.add_argument("--seuil", type=float, default=1.25, help="rapport de durée au-delà duquel une étape a régressé")
+    args = parser.parse_args()
+
+    # La référence est lue avant d'écrire les nouveaux résultats (même commit possible)
+    reference = None
+    if args.comparer:
+        with open(fichier_reference(args.comparer), encoding="utf-8") as fichier:
+            reference = json.load(fichier)
+    modeles_jeux = modeles()
+    print(f"{'échelle':>7} {'jeu':>13} {'étape':>16} {'lignes':>10} {'durée (ms)':>12}")
+    resultats = []
+    for echelle in args.echelles:
+        repetitions = args.repetitions if echelle < ECHELLE_UNE_REPETITION else 1
+        resultats += mesurer_echelle(echelle, modeles_jeux, repetitions)
+
+    commit, modifie = version_depot()
+    sortie = args.sortie or os.path.join(DOSSIER_RESULTATS, f"{commit}{'-modifie' if modifie else ''}.json")
+    os.makedirs(os.path.dirname(sortie) or ".", exist_ok=True)
+    with open(sortie, "w", encoding="utf-8") as fichier:
+        json.dump(dict(commit=commit, modifie=modifie, date=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                       python=platform.python_version(), machine=platform.platform(), processeurs=os.cpu_count(),
+                       echelles=args.echelles, resultats=resultats), fichier, indent=1)
+    print(f"Résultats enregistrés dans {sortie}")
+    if reference is not None and comparer(resultats, reference, args.seuil):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
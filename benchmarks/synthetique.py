@@ -0,0 +1,152 @@
+# Jeux de données synthétiques à l'échelle 1x, 10x, 100x, 1000x... dans les formats lus par le
+# tableau de bord : enregistrements v2.1 à plat (stations vélo, parcs relais, trafic) servis en pages
+# {"total_count", "results"} ou en export JSON Lines par un serveur local, et listes à plat des
+# fichiers statiques (aménagements cyclables, arrêts de bus, stations de réparation, accidents).
+# Les modèles sont les fichiers du dépôt, recopiés avec un décalage de position par copie.
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from benchmarks.bench_analyse import charger, stations_velo_synthetiques
+
+# Nombre d'enregistrements à l'échelle 1 (ordre de grandeur des jeux de Rennes)
+TAILLES_UNITE = {
+    "stations": 110,
+    "parcs_relais": 8,
+    "trafic": 1431,
+    "amenagement": 1872,
+    "bus_metro": 1795,
+    "reparation": 38,
+    "accidents": 5000,
+}
+# Jeux servis par le serveur local, nom -> identifiant du jeu dans l'URL
+JEUX_EN_LIGNE = {
+    "stations": "etat-des-stations-le-velo-star-en-temps-reel",
+    "parcs_relais": "tco-parcsrelais-star-etat-tr",
+    "trafic": "etat-du-trafic-en-temps-reel",
+}
+# Écart-type (degrés) du décalage appliqué à chaque copie des modèles
+DECALAGE = 0.05
+
+# Modèles tirés des fichiers du dépôt, nom -> enregistrements
+def modeles():
+    bus = charger("topologie_arret_bus.json")
+    return {
+        "stations": stations_velo_synthetiques(bus),
+        "parcs_relais": charger("etat-des-parcs-relais.json"),
+        "trafic": [r["fields"] for r in charger("etat-du-trafic.json") if r["fields"].get("insee") == 35238],
+        "amenagement": charger("amenagement_cyclable.json"),
+        "bus_metro": bus,
+        "reparation": charger("stations-reparation-velo.json"),
+    }
+
+# Décalages (lon, lat) de chaque enregistrement : la copie k des modèles est déplacée d'un même vecteur
+def _decalages(nombre, nombre_modeles, generateur):
+    copies = generateur.normal(0, DECALAGE, size=(nombre // nombre_modeles + 1, 2))
+    copies[0] = 0
+    return copies[np.arange(nombre) // nombre_modeles]
+
+# Copie d'un enregistrement avec ses coordonnées {"lon", "lat"} déplacées
+def _point(enregistrement, cle, dlon, dlat):
+    coordonnees = enregistrement[cle]
+    return {**enregistrement, cle: {"lon": coordonnees["lon"] + dlon, "lat": coordonnees["lat"] + dlat}}
+
+# Accidents corporels (format de accidents_corporels.json), absents du dépôt : tirés au hasard
+def accidents(nombre, generateur):
+    secondes = generateur.integers(1262304000, 1704067200, nombre)
+    dates = np.datetime_as_string(secondes.astype("datetime64[s]"), unit="s")
+    lons = -1.68 + generateur.normal(0, 0.05, nombre)
+    lats = 48.11 + generateur.normal(0, 0.03, nombre)
+    gravite = generateur.poisson((0.05, 0.4, 0.9), size=(nombre, 3))
+    return [{"wms_time": f"{date}+00:00", "ntu": int(g[0]), "nbh": int(g[1]), "nbnh": int(g[2]),
+             "geo_point_2d": {"lon": float(lon), "lat": float(lat)}}
+            for date, g, lon, lat in zip(dates, gravite, lons, lats)]
+
+# Fonction pour générer le jeu nom à l'échelle donnée (liste d'enregistrements)
+def generer(nom, echelle, modeles_jeux=None, graine=0):
+    generateur = np.random.default_rng(graine)
+    nombre = TAILLES_UNITE[nom] * echelle
+    if nom == "accidents":
+        return accidents(nombre, generateur)
+    modeles_jeu = (modeles_jeux or modeles())[nom]
+    decalages = _decalages(nombre, len(modeles_jeu), generateur).tolist()
+    resultat = []
+    for i, (dlon, dlat) in enumerate(decalages):
+        modele = modeles_jeu[i % len(modeles_jeu)]
+        copie = i // len(modeles_jeu)
+        if nom in ("stations", "parcs_relais", "bus_metro"):
+            enregistrement = _point(modele, "coordonnees", dlon, dlat)
+            enregistrement["nom"] = f"{modele['nom']} {copie}" if copie else modele["nom"]
+        elif nom == "trafic":
+            # Tronçons distincts d'une copie à l'autre, dénominations partagées
+            enregistrement = {**modele, "predefinedlocationreference": f"{modele['predefinedlocationreference']}.{copie}"}
+        elif nom == "reparation":
+            lon, lat = modele["geo_shape"]["geometry"]["coordinates"][0]
+            enregistrement = {**modele, "geo_shape": {**modele["geo_shape"], "geometry": {
+                "coordinates": [[lon + dlon, lat + dlat]], "type": "MultiPoint"}}}
+        else:
+            # Aménagements : la géométrie (listes imbriquées) est partagée entre les copies pour
+            # limiter la mémoire, seul le point de référence est déplacé
+            enregistrement = _point(modele, "geo_point_2d", dlon, dlat)
+        resultat.append(enregistrement)
+    return resultat
+
+# Serveur HTTP local imitant l'API Explore v2.1 : /catalog/datasets/<jeu>/records (pages limit/offset
+# avec total_count) et /catalog/datasets/<jeu>/exports/jsonl, envoyé par morceaux au fil de l'écriture.
+# jeux : nom du jeu dans le tableau de bord -> enregistrements. Les filtres (where...) sont ignorés.
+class ServeurFactice:
+    LIGNES_PAR_MORCEAU = 1000
+
+    def __init__(self, jeux):
+        self.jeux = {JEUX_EN_LIGNE[nom]: enregistrements for nom, enregistrements in jeux.items()}
+        serveur = self
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                morceaux = urlsplit(self.path)
+                parties = morceaux.path.rstrip("/").split("/")
+                enregistrements = serveur.jeux.get(parties[-2] if parties[-1] == "records" else parties[-3])
+                if enregistrements is None:
+                    self.send_error(404)
+                    return
+                if parties[-1] == "jsonl":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/jsonl")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for debut in range(0, len(enregistrements), serveur.LIGNES_PAR_MORCEAU):
+                        morceau = "".join(json.dumps(e) + "\n" for e in enregistrements[debut:debut + serveur.LIGNES_PAR_MORCEAU]).encode()
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(morceau), morceau))
+                    self.wfile.write(b"0\r\n\r\n")
+                    return
+                requete = parse_qs(morceaux.query)
+                offset = int(requete.get("offset", ["0"])[0])
+                limit = int(requete.get("limit", ["10"])[0])
+                corps = json.dumps({"total_count": len(enregistrements),
+                                    "results": enregistrements[offset:offset + limit]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def log_message(self, *args):
+                pass
+
+        self._serveur = ThreadingHTTPServer(("127.0.0.1", 0), Gestionnaire)
+        self.adresse = f"http://127.0.0.1:{self._serveur.server_port}"
+
+    # URL /records d'un jeu servi (nom du jeu dans le tableau de bord)
+    def url(self, nom):
+        return f"{self.adresse}/api/explore/v2.1/catalog/datasets/{JEUX_EN_LIGNE[nom]}/records"
+
+    def __enter__(self):
+        threading.Thread(target=self._serveur.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._serveur.shutdown()
+        self._serveur.server_close()
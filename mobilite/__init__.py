@@ -0,0 +1 @@
+# Paquet regroupant les traitements de données de Mobilité_Urbaine_Rennes.py
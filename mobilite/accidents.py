@@ -0,0 +1,105 @@
+# Bilans des accidents corporels : toutes les sommes, moyennes et nombres d'accidents d'un
+# regroupement sont calculés en un seul passage (un np.bincount par mesure) sur un numéro de
+# groupe entier, formé à partir de clés quelconques : année, mois, commune, cellule de grille...
+# Ajouter une clé ne relit pas les données, elle ne fait qu'affiner le numéro de groupe.
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from mobilite.extraction import projeter_colonnes
+
+# Mesures additionnées par défaut : tués, blessés hospitalisés, blessés non hospitalisés
+MESURES = ('ntu', 'nbh', 'nbnh')
+# Côté des cellules de la clé "cellule" (mètres Web Mercator)
+TAILLE_CELLULE = 1000.0
+# Au-delà de ce nombre de combinaisons, les groupes vides ne sont pas alloués (np.unique)
+GROUPES_DENSES_MAX = 1 << 24
+
+# Codes entiers (0..n-1) et valeurs de chaque code pour une clé de regroupement.
+# Renvoie une liste de (nom de colonne, codes, valeurs) : la clé "cellule" donne deux colonnes.
+def _codes(df, cle, taille_cellule):
+    if cle in ('annee', 'mois'):
+        dates = df['date']
+        if isinstance(dates.dtype, pd.DatetimeTZDtype):
+            dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+        # Mois écoulés depuis janvier 1970 : année et mois s'en déduisent sans passer par .dt
+        mois = dates.to_numpy(dtype="datetime64[M]").view(np.int64)
+        if cle == 'mois':
+            return [(cle, mois % 12, np.arange(1, 13))]
+        annees = mois // 12
+        premiere, derniere = (annees.min(), annees.max()) if len(annees) else (0, 0)
+        return [(cle, annees - premiere, np.arange(premiere, derniere + 1) + 1970)]
+    if cle == 'cellule':
+        resultat = []
+        for axe in ('x', 'y'):
+            indices = np.floor(df[axe].to_numpy(dtype=np.float64) / taille_cellule).astype(np.int64)
+            premier, dernier = (indices.min(), indices.max()) if len(indices) else (0, 0)
+            centres = (np.arange(premier, dernier + 1) + 0.5) * taille_cellule
+            resultat.append((axe, indices - premier, centres))
+        return resultat
+    codes, valeurs = pd.factorize(df[cle], sort=True)
+    return [(cle, codes, np.asarray(valeurs))]
+
+# Fonction pour agréger les accidents selon cles (colonnes de df ou "annee", "mois", "cellule").
+# Renvoie un DataFrame trié par clés : une ligne par groupe non vide avec les colonnes des clés
+# (x et y, centres des cellules, pour "cellule"), nombre d'accidents et, pour chaque mesure, somme,
+# nombre d'accidents où elle est renseignée (<mesure>_nombre) et moyenne sur ceux-ci (<mesure>_moyenne).
+def agreger_accidents(df, cles=('annee',), mesures=MESURES, taille_cellule=TAILLE_CELLULE):
+    # Les accidents sans coordonnées n'appartiennent à aucune cellule, ceux sans date à aucune année
+    if 'cellule' in cles:
+        df = df[np.isfinite(df['x'].to_numpy(dtype=np.float64)) & np.isfinite(df['y'].to_numpy(dtype=np.float64))]
+    if 'annee' in cles or 'mois' in cles:
+        df = df[df['date'].notna().to_numpy()]
+    colonnes = [colonne for cle in cles for colonne in _codes(df, cle, taille_cellule)]
+    tailles = tuple(len(valeurs) for _, _, valeurs in colonnes)
+    groupes = np.ravel_multi_index([codes for _, codes, _ in colonnes], tailles) if colonnes else np.zeros(len(df), dtype=np.int64)
+    if np.prod(tailles, dtype=np.float64) <= GROUPES_DENSES_MAX:
+        nombre = np.bincount(groupes, minlength=int(np.prod(tailles)))
+        presents = np.flatnonzero(nombre)
+        rang = groupes
+    else:
+        presents, rang = np.unique(groupes, return_inverse=True)
+        nombre = np.bincount(rang)
+    resultat = {}
+    for (nom, _, valeurs), codes in zip(colonnes, np.unravel_index(presents, tailles)):
+        resultat[nom] = valeurs[codes]
+    resultat['nombre'] = nombre[presents] if len(nombre) != len(presents) else nombre
+    for mesure in mesures:
+        valeurs = df[mesure].to_numpy()
+        # Un compte manquant (NaN) est écarté de la somme et de la moyenne, comme avec pandas
+        poids = valeurs.astype(np.float64, copy=False)
+        renseignes = ~np.isnan(poids)
+        sommes = np.bincount(rang, weights=np.where(renseignes, poids, 0.0), minlength=len(nombre))
+        comptes = np.bincount(rang, weights=renseignes, minlength=len(nombre)).astype(np.int64)
+        if len(sommes) != len(presents):
+            sommes, comptes = sommes[presents], comptes[presents]
+        # Les comptes de victimes restent entiers (sommes exactes en double jusqu'à 2**53)
+        if np.issubdtype(valeurs.dtype, np.integer):
+            sommes = sommes.astype(np.int64)
+        resultat[mesure] = sommes
+        resultat[f"{mesure}_nombre"] = comptes
+        resultat[f"{mesure}_moyenne"] = np.divide(sommes, comptes, out=np.full(len(comptes), np.nan), where=comptes > 0)
+    return DataFrame(resultat)
+
+# Fonction pour lire le fichier national des accidents (BAAC, data.gouv.fr) : fichier des
+# caractéristiques (une ligne par accident) et fichier des usagers (gravité par victime), au format
+# CSV séparé par des points-virgules. Renvoie le même schéma qu'analyse_accidents, plus la commune.
+def lire_baac(caracteristiques, usagers):
+    accidents = pd.read_csv(caracteristiques, sep=";", dtype=str, encoding="latin-1" if caracteristiques.endswith("latin1.csv") else "utf-8")
+    victimes = pd.read_csv(usagers, sep=";", usecols=lambda nom: nom in ("Num_Acc", "Accident_Id", "grav"), dtype=str)
+    identifiant = "Accident_Id" if "Accident_Id" in accidents else "Num_Acc"
+    victimes = victimes.rename(columns={"Accident_Id": identifiant, "Num_Acc": identifiant})
+    # Gravité : 2 tué, 3 blessé hospitalisé, 4 blessé léger (1 indemne)
+    gravite = pd.to_numeric(victimes['grav'], errors="coerce")
+    bilan = pd.DataFrame({identifiant: victimes[identifiant], 'ntu': gravite == 2, 'nbh': gravite == 3, 'nbnh': gravite == 4})
+    bilan = bilan.groupby(identifiant, sort=False).sum()
+    annee = pd.to_numeric(accidents['an'], errors="coerce")
+    annee = annee.where(annee >= 100, annee + 2000)
+    dates = pd.to_datetime(DataFrame({'year': annee, 'month': pd.to_numeric(accidents['mois'], errors="coerce"),
+                                      'day': pd.to_numeric(accidents['jour'], errors="coerce")}), errors="coerce", utc=True)
+    # Les coordonnées utilisent la virgule décimale à partir de 2019
+    colonnes = {nom: pd.to_numeric(accidents[champ].str.replace(",", ".", regex=False), errors="coerce").to_numpy()
+                for nom, champ in (('lon', "long"), ('lat', "lat"))}
+    projeter_colonnes(colonnes)
+    compte = bilan.reindex(accidents[identifiant]).fillna(0).astype(np.int32).to_numpy()
+    return DataFrame({'date': dates, 'ntu': compte[:, 0], 'nbh': compte[:, 1], 'nbnh': compte[:, 2],
+                      'x': colonnes['x'], 'y': colonnes['y'], 'commune': accidents['com'].to_numpy()})
@@ -0,0 +1,183 @@
+# Regroupement des points denses (arrêts de bus, stations vélo) en amas sur une grille carrée
+# alignée sur les multiples de la taille de cellule en Web Mercator, à plusieurs niveaux.
+# Vue d'ensemble : un cercle par amas (nombre de points et sommes des valeurs) ; vue rapprochée :
+# les points bruts. Le nombre de glyphes dessinés ne dépend plus de la taille du jeu de données.
+import numpy as np
+from pandas import DataFrame, concat
+from bokeh.models import ColumnDataSource, CustomJS
+
+# Côtés des cellules (mètres Web Mercator), du niveau le plus grossier au plus fin
+TAILLES_PAR_DEFAUT = (4000.0, 1000.0, 250.0)
+# Largeur minimale d'une cellule à l'écran : on prend le niveau le plus fin qui la respecte
+PIXELS_MIN = 40
+# En dessous de cette échelle (mètres par pixel), les points bruts sont affichés
+SEUIL_POINTS = 4.0
+
+# Diamètre à l'écran (pixels) d'un amas de nombre points
+def diametre_amas(nombre):
+    return np.minimum(12 + 3 * np.sqrt(nombre), 48)
+
+# Fonction pour regrouper des points sur la grille de côté taille : un amas par cellule occupée,
+# placé au barycentre de ses points, avec le nombre de points et la somme de chaque valeur
+def agreger(x, y, taille, valeurs=None):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    i = np.floor(x / taille).astype(np.int64)
+    j = np.floor(y / taille).astype(np.int64)
+    # Numéro de cellule unique (les colonnes et lignes sont ramenées à partir de 0)
+    j -= j.min(initial=0)
+    cellules = (i - i.min(initial=0)) * (j.max(initial=0) + 1) + j
+    _, amas = np.unique(cellules, return_inverse=True)
+    nombre = np.bincount(amas)
+    colonnes = {'x': np.bincount(amas, weights=x) / nombre, 'y': np.bincount(amas, weights=y) / nombre, 'nombre': nombre}
+    for nom, valeur in (valeurs or {}).items():
+        colonnes[nom] = np.bincount(amas, weights=np.nan_to_num(np.asarray(valeur, dtype=np.float64)), minlength=len(nombre))
+    return colonnes
+
+# Amas de tous les niveaux dans un seul DataFrame (colonne niveau = indice dans tailles)
+def niveaux_agregation(x, y, tailles=TAILLES_PAR_DEFAUT, valeurs=None):
+    niveaux = []
+    for niveau, taille in enumerate(tailles):
+        colonnes = agreger(x, y, taille, valeurs)
+        niveaux.append(DataFrame({'niveau': np.full(len(colonnes['nombre']), niveau, dtype=np.int32), **colonnes}))
+    df = concat(niveaux, ignore_index=True)
+    df['diametre'] = diametre_amas(df['nombre'])
+    df['etiquette'] = df['nombre'].astype(str)
+    return df
+
+# Code exécuté dans le navigateur : choix du niveau selon l'échelle, puis bascule entre points bruts
+# et amas. Sans précalcul, les amas sont calculés ici à partir de la source des points (données en
+# temps réel) avec la même grille qu'agreger, et recalculés à chaque modification de cette source.
+# L'abonnement à la source est pris dans le navigateur : un js_on_change posé depuis Python
+# ferait entrer la figure entière dans le document principal avec la source.
+JS_AMAS = """
+    if (plot == null) {
+        return;
+    }
+    const source = points.data_source;
+    const basculer = (donnees_changees) => {
+        if (donnees_changees) {
+            for (const cle of Object.keys(cache)) {
+                delete cache[cle];
+            }
+        }
+        const metres_par_pixel = (plot.x_range.end - plot.x_range.start) / plot.width;
+        let niveau = -1;
+        if (metres_par_pixel > seuil_points) {
+            niveau = 0;
+            for (let i = tailles.length - 1; i >= 0; i--) {
+                if (tailles[i] / metres_par_pixel >= pixels_min) {
+                    niveau = i;
+                    break;
+                }
+            }
+        }
+        if (cache.niveau === niveau) {
+            return;
+        }
+        cache.niveau = niveau;
+        points.visible = niveau < 0;
+        for (const renderer of renderers) {
+            renderer.visible = niveau >= 0;
+        }
+        if (niveau < 0) {
+            return;
+        }
+        if (cache[niveau] === undefined) {
+            cache[niveau] = precalcul !== null ? extraire(niveau) : agreger(tailles[niveau]);
+        }
+        amas.data = cache[niveau];
+    };
+    // Amas d'un niveau précalculé par niveaux_agregation
+    const extraire = (niveau) => {
+        const donnees = precalcul.data;
+        const colonnes = {x: [], y: [], nombre: [], diametre: [], etiquette: []};
+        for (const nom of valeurs) {
+            colonnes[nom] = [];
+        }
+        for (let k = 0; k < donnees.niveau.length; k++) {
+            if (donnees.niveau[k] === niveau) {
+                for (const nom in colonnes) {
+                    colonnes[nom].push(donnees[nom][k]);
+                }
+            }
+        }
+        return colonnes;
+    };
+    // Même calcul qu'agreger, sur les données courantes de la source des points
+    const agreger = (taille) => {
+        const donnees = source.data;
+        const colonnes = {x: [], y: [], nombre: [], diametre: [], etiquette: []};
+        for (const nom of valeurs) {
+            colonnes[nom] = [];
+        }
+        const indices = new Map();
+        for (let k = 0; k < donnees[colonne_x].length; k++) {
+            const x = donnees[colonne_x][k];
+            const y = donnees[colonne_y][k];
+            const cle = Math.floor(x / taille) + ":" + Math.floor(y / taille);
+            let a = indices.get(cle);
+            if (a === undefined) {
+                a = colonnes.nombre.length;
+                indices.set(cle, a);
+                colonnes.x.push(0);
+                colonnes.y.push(0);
+                colonnes.nombre.push(0);
+                for (const nom of valeurs) {
+                    colonnes[nom].push(0);
+                }
+            }
+            colonnes.x[a] += x;
+            colonnes.y[a] += y;
+            colonnes.nombre[a] += 1;
+            for (const nom of valeurs) {
+                colonnes[nom][a] += Number(donnees[nom][k]) || 0;
+            }
+        }
+        for (let a = 0; a < colonnes.nombre.length; a++) {
+            colonnes.x[a] /= colonnes.nombre[a];
+            colonnes.y[a] /= colonnes.nombre[a];
+            colonnes.diametre.push(Math.min(12 + 3 * Math.sqrt(colonnes.nombre[a]), 48));
+            colonnes.etiquette.push(String(colonnes.nombre[a]));
+        }
+        return colonnes;
+    };
+    // Sans précalcul, branchement (une seule fois) sur les modifications de la source des points :
+    // remplacement des données ou patch du rafraîchissement en temps réel
+    if (precalcul === null && !branche.fait) {
+        branche.fait = true;
+        source.connect(source.properties.data.change, () => basculer(true));
+        source.connect(source.patching, () => basculer(true));
+    }
+    basculer(false);
+"""
+
+# Fonction pour créer la source des amas d'une couche de points.
+# points : renderer des points bruts ; valeurs : colonnes à additionner dans chaque amas.
+# Si df est donné (données statiques), les amas de tous les niveaux sont calculés ici ;
+# sinon ils sont calculés dans le navigateur à partir de points.data_source, et suivent
+# ses modifications (remplacement des données ou patch du mode de rafraîchissement).
+# Renvoie (source des amas, CustomJS de bascule) ; les glyphes des amas sont branchés avec suivre_amas.
+def source_amas(points, tailles=TAILLES_PAR_DEFAUT, valeurs=(), df=None, x='x', y='y',
+                pixels_min=PIXELS_MIN, seuil_points=SEUIL_POINTS):
+    colonnes = ['x', 'y', 'nombre', 'diametre', 'etiquette', *valeurs]
+    amas = ColumnDataSource({nom: [] for nom in colonnes})
+    precalcul = None
+    if df is not None:
+        niveaux = niveaux_agregation(df[x], df[y], tailles, {nom: df[nom] for nom in valeurs})
+        precalcul = ColumnDataSource(niveaux[['niveau', *colonnes]])
+    bascule = CustomJS(args=dict(plot=None, points=points, renderers=[], amas=amas, precalcul=precalcul,
+                                 tailles=[float(t) for t in tailles], valeurs=list(valeurs),
+                                 colonne_x=x, colonne_y=y, pixels_min=pixels_min, seuil_points=seuil_points,
+                                 cache={}, branche={}), code=JS_AMAS)
+    return amas, bascule
+
+# Branche la bascule points / amas sur les déplacements et zooms de la figure ;
+# renderers : glyphes dessinant la source des amas
+def suivre_amas(plot, bascule, renderers):
+    bascule.args["plot"] = plot
+    bascule.args["renderers"] = list(renderers)
+    for renderer in renderers:
+        renderer.visible = False
+    plot.x_range.js_on_change("start", bascule)
+    plot.x_range.js_on_change("end", bascule)
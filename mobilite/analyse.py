@@ -0,0 +1,121 @@
+# Analyse des jeux de données : chaque fonction renvoie un DataFrame prêt pour Bokeh, aux types
+# compacts du schéma de son jeu (mobilite.schema)
+import pandas as pd
+from pandas import DataFrame
+import numpy as np
+from mobilite.extraction import extraire_colonnes, projeter_colonnes
+from mobilite.geometrie import LignesMultiples
+from mobilite.schema import appliquer_schema
+
+# Les coordonnées sont toujours lues directement en float64
+COORDONNEES = {'lon': np.float64, 'lat': np.float64}
+# Champs du trafic absents des anciens exports quand ils sont nuls ; les valeurs numériques sont
+# lues directement en float64 (NaN si absentes)
+CHAMPS_TRAFIC_FACULTATIFS = {'vitesse_maxi': np.nan, 'traveltime': np.nan, 'traveltimereliability': np.nan, 'geometrie': None}
+TYPES_TRAFIC = {'vitesse_maxi': np.float64, 'traveltime': np.float64, 'traveltimereliability': np.float64}
+
+# Fonction pour analyser les données des stations
+def analyse_data_reparation_velo(data):
+    colonnes = extraire_colonnes(data, {
+        'Lieu': "gml_id",
+        'gonflage': "gonflage",
+        'etat': "etat",
+        'reparation': "reparation",
+        'lon': "geo_shape.geometry.coordinates[0][0]",
+        'lat': "geo_shape.geometry.coordinates[0][1]",
+    }, types=COORDONNEES)
+    # Convertit toutes les coordonnées WGS 84 en Web Mercator en un seul appel
+    projeter_colonnes(colonnes)
+    return appliquer_schema(DataFrame(colonnes, columns=['Lieu', 'gonflage', 'etat', 'x', 'y', 'reparation']), "reparation")
+
+# Fonction pour analyser les données sur les stations velos
+def analyse_station_velo(data):
+    colonnes = extraire_colonnes(data, {
+        'nom': "nom",  # Noms des stations de vélos
+        'total_possible': "nombreemplacementsactuels",  # Nombre total d'emplacements
+        'nbre_emplacement_vide': "nombreemplacementsdisponibles",  # Nombre d'emplacements vides
+        'nbre_de_velo_disponible': "nombrevelosdisponibles",  # Nombre de vélos disponibles
+        'lon': "coordonnees.lon",
+        'lat': "coordonnees.lat",
+    }, types=COORDONNEES)
+    projeter_colonnes(colonnes)
+    return appliquer_schema(DataFrame(colonnes, columns=['nom', 'total_possible', 'nbre_emplacement_vide', 'x', 'y', 'nbre_de_velo_disponible']), "stations")
+
+# Fonction pour analyser les données des aménagements de pistes cyclables
+# (une ligne par partie de MultiLineString, sommets projetés en une seule opération)
+def analyse_data_reparation_velo_pistes_cyclables(data):
+    colonnes = extraire_colonnes(data, {
+        'type_amenagement': "type_amenagement",  # Type d'aménagement (bande, piste cyclable...)
+        'position': "rive",
+        'geometrie': "geo_shape.geometry",
+    })
+    lignes = LignesMultiples.depuis_geometries(colonnes.pop('geometrie')).projeter()
+    return appliquer_schema(lignes.dataframe(colonnes), "amenagement")
+
+# Fonction pour analyser les données des parcs relais
+def analyse_data_reparation_velo_parc_relais(data):
+    colonnes = extraire_colonnes(data, {
+        'date': "lastupdate",
+        'etat': "etatouverture",
+        'nom': "nom",
+        'place_dispo_voit_perso': "jrdinfosoliste",
+        'place_dispo_voit_elec': "jrdinfoelectrique",
+        'place_dispo_PMR': "jrdinfopmr",
+        'place_dispo_covoit': "jrdinfocovoiturage",
+        'capacity': "capaciteparking",
+        'lon': "coordonnees.lon",
+        'lat': "coordonnees.lat",
+    }, types=COORDONNEES)
+    # Conversion de toutes les dates ISO 8601 en une fois
+    colonnes['date'] = pd.to_datetime(colonnes['date'], format="ISO8601")
+    projeter_colonnes(colonnes)
+    return appliquer_schema(DataFrame(colonnes, columns=['date', 'etat', 'nom', 'place_dispo_voit_perso', 'place_dispo_voit_elec', 'place_dispo_PMR', 'x', 'y', 'place_dispo_covoit', 'capacity']), "parcs_relais")
+
+# Analyse les données relatives aux stations de transports en commun
+def analyse_data_reparation_velo_trans_comm(data):
+    colonnes = extraire_colonnes(data, {
+        'nom': "nom",
+        'lon': "coordonnees.lon",
+        'lat': "coordonnees.lat",
+    }, types=COORDONNEES)
+    projeter_colonnes(colonnes)
+    return appliquer_schema(DataFrame(colonnes, columns=['x', 'y', 'nom']), "bus_metro")
+
+# Analyse les données relatives au trafic : une ligne par tronçon et par relevé.
+# Un relevé ne donne qu'une vitesse moyenne par tronçon ; les vitesses maximales et minimales
+# sont calculées ensuite, entre tronçons (grouper_trafic) ou dans le temps (historique).
+# La vitesse autorisée, le temps de parcours, sa fiabilité et la géométrie du tronçon servent
+# à l'indice de congestion (mobilite.trafic). La date de chaque relevé n'est pas lue : aucun
+# panneau ne s'en sert, l'historique date le relevé entier.
+def analyse_data_reparation_velo_trafic(data):
+    colonnes = extraire_colonnes(data, {
+        'troncon': "predefinedlocationreference",  # Identifiant du tronçon
+        'averagevehiclespeed': "averagevehiclespeed",  # Vitesse moyenne des véhicules
+        'denomination': "denomination",  # Dénominations des tronçons
+        'vitesse_maxi': "vitesse_maxi",  # Vitesse autorisée (km/h)
+        'traveltime': "traveltime",  # Temps de parcours du tronçon (s)
+        'traveltimereliability': "traveltimereliability",  # Fiabilité du temps de parcours (%)
+        'geometrie': "geo_shape",
+    }, types=TYPES_TRAFIC, defauts=CHAMPS_TRAFIC_FACULTATIFS)
+    return DataFrame(colonnes, columns=['troncon', 'averagevehiclespeed', 'denomination', 'vitesse_maxi',
+                                        'traveltime', 'traveltimereliability', 'geometrie'])
+
+# Comptes de victimes des accidents, lus en flottants : un compte nul ou absent devient NaN et
+# appliquer_schema les ramène ensuite en int16 quand aucun ne manque
+COMPTES_ACCIDENTS = ('ntu', 'nbh', 'nbnh')
+
+# Analyse les données des accidents corporels : date, nombre de tués (ntu), de blessés
+# hospitalisés (nbh) et non hospitalisés (nbnh), position projetée (NaN si l'accident n'est pas localisé)
+def analyse_accidents(data):
+    colonnes = extraire_colonnes(data, {
+        'date': "wms_time",
+        'ntu': "ntu",
+        'nbh': "nbh",
+        'nbnh': "nbnh",
+        'lon': "geo_point_2d.lon",
+        'lat': "geo_point_2d.lat",
+    }, types={**COORDONNEES, **dict.fromkeys(COMPTES_ACCIDENTS, np.float64)},
+       defauts=dict.fromkeys([*COMPTES_ACCIDENTS, 'lon', 'lat'], np.nan))
+    colonnes['date'] = pd.to_datetime(colonnes['date'], format="ISO8601", utc=True)
+    projeter_colonnes(colonnes)
+    return appliquer_schema(DataFrame(colonnes, columns=['date', 'ntu', 'nbh', 'nbnh', 'x', 'y']), "accidents")
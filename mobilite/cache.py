@@ -0,0 +1,201 @@
+# Cache sur disque des téléchargements (validateurs ETag / Last-Modified, durée de vie par jeu
+# de données, dernière copie valide utilisée hors ligne) et des fichiers JSON déjà analysés
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+from mobilite.telechargement import ErreurTelechargement
+
+logger = logging.getLogger(__name__)
+
+# Dossier du cache par défaut (à la racine du dépôt, ignoré par git)
+DOSSIER_CACHE = ".cache"
+
+# Identifiant du jeu de données dans une URL de l'API Explore (.../datasets/<id>/...)
+def identifiant_jeu(url):
+    trouve = re.search(r"/datasets/([^/?]+)", url)
+    return trouve.group(1) if trouve else url
+
+# Nom de fichier temporaire propre au processus et au thread
+def nom_temporaire(chemin):
+    return f"{chemin}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+# Écrit un fichier d'un coup (fichier temporaire puis renommage) pour ne jamais laisser de copie tronquée
+def ecrire_atomique(chemin, contenu):
+    temporaire = nom_temporaire(chemin)
+    with open(temporaire, "wb") as fichier:
+        fichier.write(contenu)
+    os.replace(temporaire, chemin)
+
+# Cache HTTP : s'utilise à la place du ClientHTTP qu'il enveloppe (get, get_json, lignes).
+# ttl associe un identifiant de jeu de données à une durée de vie en secondes ; pendant
+# cette durée la copie locale est utilisée sans requête, ensuite une requête conditionnelle
+# est envoyée et un 304 prolonge la copie. En cas d'échec réseau, la dernière copie est renvoyée.
+class CacheHTTP:
+    def __init__(self, client, ttl=None, ttl_par_defaut=0, dossier=os.path.join(DOSSIER_CACHE, "http")):
+        self.client = client
+        self.ttl = ttl or {}
+        self.ttl_par_defaut = ttl_par_defaut
+        self.dossier = dossier
+        os.makedirs(dossier, exist_ok=True)
+
+    def __getattr__(self, nom):
+        # en_parallele, rapport_latences... sont ceux du client
+        return getattr(self.client, nom)
+
+    def _chemins(self, url):
+        cle = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.dossier, cle)
+        return base + ".json", base + ".corps"
+
+    def _lire_meta(self, url):
+        chemin_meta, chemin_corps = self._chemins(url)
+        try:
+            with open(chemin_meta, encoding="utf-8") as fichier:
+                meta = json.load(fichier)
+        except (OSError, ValueError):
+            return None
+        return meta if os.path.exists(chemin_corps) else None
+
+    def _ecrire_meta(self, url, meta):
+        chemin_meta, _ = self._chemins(url)
+        ecrire_atomique(chemin_meta, json.dumps(meta).encode("utf-8"))
+
+    # En-têtes conditionnels à partir des validateurs enregistrés
+    @staticmethod
+    def _entetes_conditionnels(meta):
+        entetes = {}
+        if meta and meta.get("etag"):
+            entetes["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            entetes["If-Modified-Since"] = meta["last_modified"]
+        return entetes
+
+    def _est_frais(self, url, meta):
+        ttl = self.ttl.get(identifiant_jeu(url), self.ttl_par_defaut)
+        return meta is not None and time.time() - meta["verifie"] < ttl
+
+    @staticmethod
+    def _nouvelle_meta(url, entetes):
+        return {"url": url, "etag": entetes.get("ETag"), "last_modified": entetes.get("Last-Modified"),
+                "verifie": time.time()}
+
+    # Corps de la réponse, depuis le cache si possible
+    def get_corps(self, url):
+        meta = self._lire_meta(url)
+        chemin_corps = self._chemins(url)[1]
+        if not self._est_frais(url, meta):
+            try:
+                reponse = self.client.get(url, self._entetes_conditionnels(meta))
+            except (ErreurTelechargement, OSError) as erreur:
+                if meta is None:
+                    raise
+                logger.warning("Hors ligne, dernière copie utilisée pour %s (%s)", url, erreur)
+            else:
+                if reponse.statut == 304 and meta is not None:
+                    meta["verifie"] = time.time()
+                    self._ecrire_meta(url, meta)
+                else:
+                    ecrire_atomique(chemin_corps, reponse.corps)
+                    self._ecrire_meta(url, self._nouvelle_meta(url, reponse.entetes))
+                    return reponse.corps
+        with open(chemin_corps, "rb") as fichier:
+            return fichier.read()
+
+    def get_json(self, url, entetes=None):
+        return json.loads(self.get_corps(url))
+
+    # Lecture ligne par ligne : une réponse 200 est recopiée dans le cache au fil de la lecture
+    def lignes(self, url, entetes=None):
+        meta = self._lire_meta(url)
+        chemin_corps = self._chemins(url)[1]
+        if not self._est_frais(url, meta):
+            try:
+                flux = self.client.flux(url, self._entetes_conditionnels(meta))
+            except (ErreurTelechargement, OSError) as erreur:
+                if meta is None:
+                    raise
+                logger.warning("Hors ligne, dernière copie utilisée pour %s (%s)", url, erreur)
+            else:
+                if flux.statut != 304 or meta is None:
+                    yield from self._recopier(url, flux, chemin_corps)
+                    return
+                meta["verifie"] = time.time()
+                self._ecrire_meta(url, meta)
+        with open(chemin_corps, "rb") as fichier:
+            for ligne in fichier:
+                if ligne.strip():
+                    yield ligne
+
+    def _recopier(self, url, flux, chemin_corps):
+        temporaire = nom_temporaire(chemin_corps)
+        try:
+            with open(temporaire, "wb") as copie:
+                for ligne in flux.lignes:
+                    copie.write(ligne if ligne.endswith(b"\n") else ligne + b"\n")
+                    yield ligne
+        except BaseException:
+            # Lecture interrompue : la copie incomplète n'est pas gardée
+            os.remove(temporaire)
+            raise
+        os.replace(temporaire, chemin_corps)
+        self._ecrire_meta(url, self._nouvelle_meta(url, flux.entetes))
+
+# Cache des fichiers JSON statiques déjà analysés : copie en mémoire (processus de longue durée)
+# et copie pickle sur disque, valables tant que la taille et la date de modification du fichier
+# source n'ont pas changé. Pendant la durée de vie (ttl, en secondes, par nom de fichier),
+# le fichier source n'est même pas consulté. Chaque lecteur a sa propre copie d'un même fichier.
+class CacheFichiers:
+    def __init__(self, ttl=None, ttl_par_defaut=0, dossier=os.path.join(DOSSIER_CACHE, "json")):
+        self.ttl = ttl or {}
+        self.ttl_par_defaut = ttl_par_defaut
+        self.dossier = dossier
+        self._memoire = {}
+        self._verrou = threading.Lock()
+        os.makedirs(dossier, exist_ok=True)
+
+    @staticmethod
+    def _signature(chemin):
+        etat = os.stat(chemin)
+        return [etat.st_size, etat.st_mtime_ns]
+
+    # Clé d'un fichier lu par un lecteur : chemin absolu et nom qualifié du lecteur
+    @staticmethod
+    def _cle(chemin, lecteur):
+        return (chemin, f"{getattr(lecteur, '__module__', '')}.{getattr(lecteur, '__qualname__', repr(lecteur))}")
+
+    def charger(self, chemin, lecteur=json.load):
+        chemin = os.path.abspath(chemin)
+        ttl = self.ttl.get(os.path.basename(chemin), self.ttl_par_defaut)
+        cle = self._cle(chemin, lecteur)
+        with self._verrou:
+            en_memoire = self._memoire.get(cle)
+        if en_memoire is not None and time.time() - en_memoire[0] < ttl:
+            return en_memoire[2]
+        signature = self._signature(chemin)
+        if en_memoire is not None and en_memoire[1] == signature:
+            data = en_memoire[2]
+        else:
+            data = self._charger_disque(cle, signature, lecteur)
+        with self._verrou:
+            self._memoire[cle] = (time.time(), signature, data)
+        return data
+
+    def _charger_disque(self, cle, signature, lecteur):
+        chemin = cle[0]
+        copie = os.path.join(self.dossier, hashlib.sha256("\0".join(cle).encode("utf-8")).hexdigest() + ".pickle")
+        try:
+            with open(copie, "rb") as fichier:
+                signature_copie, data = pickle.load(fichier)
+            if signature_copie == signature:
+                return data
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+        with open(chemin, encoding="utf-8") as fichier:
+            data = lecteur(fichier)
+        ecrire_atomique(copie, pickle.dumps((signature, data), protocol=pickle.HIGHEST_PROTOCOL))
+        return data
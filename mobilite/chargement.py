@@ -0,0 +1,47 @@
+# Chargement simultané de toutes les sources de la page (jeux en ligne et fichiers statiques) :
+# chaque source est chargée dans son propre fil d'exécution, une source lente ne retarde que
+# les panneaux qui en dépendent et une source en erreur n'interrompt pas les autres.
+# La durée et l'éventuelle erreur de chaque source sont conservées pour le rapport de chargement.
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from mobilite.profil import etape
+
+logger = logging.getLogger(__name__)
+
+# Résultat du chargement d'une source : valeur (None en cas d'erreur), durée en secondes, erreur
+Chargement = namedtuple("Chargement", "nom valeur duree erreur")
+
+# Exécute une tâche en mesurant sa durée ; une exception est conservée au lieu d'être propagée
+def _charger(nom, tache):
+    debut = time.perf_counter()
+    try:
+        with etape(nom):
+            valeur = tache()
+    except Exception as erreur:
+        logger.warning("Source %s indisponible : %s", nom, erreur)
+        return Chargement(nom, None, time.perf_counter() - debut, erreur)
+    return Chargement(nom, valeur, time.perf_counter() - debut, None)
+
+# Fonction pour charger simultanément plusieurs sources (nom -> fonction sans argument).
+# Renvoie nom -> Chargement, dans l'ordre des tâches ; la durée totale est celle de la source la plus lente.
+def charger_sources(taches, fils=None):
+    with ThreadPoolExecutor(max_workers=fils or max(1, len(taches))) as executeur:
+        futurs = {nom: executeur.submit(_charger, nom, tache) for nom, tache in taches.items()}
+        return {nom: futur.result() for nom, futur in futurs.items()}
+
+# Valeurs des sources chargées sans erreur, nom -> valeur
+def sources_disponibles(chargements):
+    return {nom: chargement.valeur for nom, chargement in chargements.items() if chargement.erreur is None}
+
+# Tableau des durées de chargement, une ligne par source
+def rapport_chargement(chargements):
+    lignes = [f"{'durée (ms)':>11} {'état':>6}  source"]
+    for chargement in chargements.values():
+        etat = "ok" if chargement.erreur is None else "ERR"
+        ligne = f"{chargement.duree * 1000:>11.1f} {etat:>6}  {chargement.nom}"
+        if chargement.erreur is not None:
+            ligne += f" ({type(chargement.erreur).__name__} : {chargement.erreur})"
+        lignes.append(ligne)
+    return "\n".join(lignes)
@@ -0,0 +1,230 @@
+# Construction de la page hors du script principal, avec le même résultat (mobilite.export.exporter_page) :
+# les données sont chargées une fois (sources en ligne et statiques, historique, prévisions), les
+# panneaux (mobilite.panneaux) dont l'empreinte des entrées (données, code du paquet, version de
+# Bokeh) a changé sont construits par un pool de processus et gardés sérialisés sous leur empreinte
+# dans .cache/panneaux/<panneau>.<empreinte>.json ; les autres sont repris de ce cache. Tous sont
+# réunis dans un seul document qui partage fond de carte et feuille de style, avec un seul suivi des
+# fichiers de python -m mobilite.temps_reel, puis la page est exportée une fois (document dans
+# <page>.json, sous-onglets dans <page>.<i>.json, copies .gz/.br). Si aucune empreinte n'a changé
+# depuis la construction précédente (moteur de rendu compris), la page existante est gardée. Les
+# empreintes sont écrites dans <page>.construction.json.
+# Usage : python -m mobilite.construction [--sortie index.html] [--processus 4] [--forcer] [--rendu canvas]
+import argparse
+import glob
+import hashlib
+import json
+import os
+import pickle
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import bokeh
+from bokeh.document import Document
+from bokeh.events import DocumentReady
+from bokeh.models import Column, Div, Row, TabPanel, Tabs
+from mobilite import profil, rendu
+from mobilite.analyse import (analyse_data_reparation_velo, analyse_data_reparation_velo_pistes_cyclables,
+                              analyse_data_reparation_velo_trans_comm, analyse_accidents)
+from mobilite.cache import DOSSIER_CACHE, CacheHTTP, CacheFichiers, ecrire_atomique
+from mobilite.chargement import charger_sources, sources_disponibles, rapport_chargement
+from mobilite.export import au_chargement, deserialiser_fragment, exporter_page, serialiser_fragment
+from mobilite.historique import FICHIER_PAR_DEFAUT, Historique
+from mobilite.instantane import charger_instantane
+from mobilite.panneaux import (ENTETE, LOGO, ONGLETS, PREFIXE_TITRE_PARCS, ModelesCommuns, Panneau,
+                               construire_panneau, entrees_panneaux)
+from mobilite.prevision import Prevision
+from mobilite.reseau import ReseauCyclable
+from mobilite.telechargement import ClientHTTP
+from mobilite.temps_reel import TTL_EN_LIGNE, JEUX_TEMPS_REEL, JEUX_PREVUS, charger_jeu, donnees_sources, suivre_temps_reel
+
+# Dossier des panneaux sérialisés, un fichier par panneau et par empreinte
+DOSSIER_PANNEAUX = os.path.join(DOSSIER_CACHE, "panneaux")
+
+# Durée de vie par fichier statique : le fichier n'est relu que s'il a changé
+TTL_FICHIERS = {
+    "topologie_arret_bus.json": 7 * 24 * 3600,
+    "amenagement_cyclable.json": 24 * 3600,
+    "stations-reparation-velo.json": 24 * 3600,
+}
+
+# Fichiers statiques de la page et leur analyse
+FICHIERS_STATIQUES = {
+    "amenagement": ("amenagement_cyclable.json", analyse_data_reparation_velo_pistes_cyclables),
+    "reparation": ("stations-reparation-velo.json", analyse_data_reparation_velo),
+    "accidents": ("accidents_corporels.json", analyse_accidents),
+    "bus_metro": ("topologie_arret_bus.json", analyse_data_reparation_velo_trans_comm),
+}
+
+# Données de la page : chargements (nom -> Chargement), sources chargées sans erreur (nom -> valeur),
+# colonnes des sources en temps réel (donnees_sources) et réseau cyclable (None sans stations ou aménagements)
+Donnees = namedtuple("Donnees", "chargements sources en_ligne reseau")
+
+# Fonction pour charger toutes les données de la page. Les sources en ligne et statiques sont
+# chargées simultanément (une source en erreur ne remplace que les panneaux qui en dépendent), les
+# fichiers statiques depuis leur instantané tant qu'ils n'ont pas changé ; le relevé est conservé
+# dans l'historique, qui donne aussi les vitesses du trafic sur la dernière heure et les prévisions.
+def charger_donnees(client_http, cache_fichiers, fichier_historique=FICHIER_PAR_DEFAUT):
+    profil.marquer("chargement")
+    chargements = charger_sources({
+        **{nom: partial(charger_jeu, client_http, nom) for nom in JEUX_TEMPS_REEL},
+        **{nom: partial(charger_instantane, chemin, analyse, lecteur=cache_fichiers.charger)
+           for nom, (chemin, analyse) in FICHIERS_STATIQUES.items()},
+    })
+    print(rapport_chargement(chargements))
+    print(client_http.rapport_latences())
+    sources = sources_disponibles(chargements)
+    tables_en_ligne = {nom: sources[nom] for nom in JEUX_TEMPS_REEL if nom in sources}
+
+    profil.marquer("reseau")
+    # Réseau des aménagements cyclables : couverture de chaque station vélo (part des autres stations
+    # joignables par un itinéraire cyclable), recalculée aussi par la boucle de rafraîchissement
+    reseau = ReseauCyclable.depuis_dataframe(sources["amenagement"]) if "stations" in sources and "amenagement" in sources else None
+
+    profil.marquer("historique")
+    with Historique(fichier_historique) as historique:
+        horodatage_releve = time.time()
+        historique.ajouter_tables(tables_en_ligne, horodatage_releve)
+        en_ligne = donnees_sources(tables_en_ligne, historique, reseau,
+                                   {jeu: Prevision(jeu) for jeu in JEUX_PREVUS}, horodatage_releve)
+    return Donnees(chargements, sources, en_ligne, reseau)
+
+# Empreinte du code qui construit les panneaux : sources du paquet et version de Bokeh
+def version_code():
+    empreinte = hashlib.sha256(bokeh.__version__.encode("utf-8"))
+    for chemin in sorted(glob.glob(os.path.join(os.path.dirname(__file__), "*.py"))):
+        with open(chemin, "rb") as fichier:
+            empreinte.update(fichier.read())
+    return empreinte.hexdigest()
+
+# Empreinte des entrées d'un panneau (pickle déterministe des DataFrames et colonnes)
+def empreinte_panneau(nom, entrees, version):
+    return hashlib.sha256(pickle.dumps((nom, entrees, version), protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+# Tâche d'un processus du pool : construit un panneau (avec ses propres modèles communs) et l'écrit
+# sérialisé dans chemin. Renvoie (nom, durée en secondes).
+def construire_fragment(nom, entrees, chemin):
+    debut = time.perf_counter()
+    commun = ModelesCommuns()
+    panneau = construire_panneau(nom, entrees, commun)
+    fragment = serialiser_fragment(list(panneau), nom, commun.modeles())
+    ecrire_atomique(chemin, json.dumps(fragment, separators=(",", ":")).encode("utf-8"))
+    return nom, time.perf_counter() - debut
+
+# Fonction pour assembler les panneaux (nom -> Panneau, construits avec les mêmes ModelesCommuns)
+# dans document : entête, onglets et sous-onglets de ONGLETS, un seul suivi des fichiers du temps
+# réel pour toutes les sources, moteur de rendu des cartes. Le contenu des sous-onglets est placé
+# dans un espace réservé, chargé à la première ouverture (exporter_page) ; les rappels des panneaux
+# s'exécutent à l'arrivée de leur contenu. Renvoie les espaces réservés, à passer à exporter_page.
+def assembler_document(document, panneaux, mode=rendu.MODE_PAR_DEFAUT):
+    onglets = []
+    sous_onglets = []
+    for titre_onglet, noms in ONGLETS:
+        if len(noms) == 1 and noms[0][1] is None:
+            onglets.append(TabPanel(child=panneaux[noms[0][0]].contenu, title=titre_onglet))
+            continue
+        sub_tabs = []
+        for nom, titre_panneau in noms:
+            espace = Column(panneaux[nom].contenu)
+            for rappel in panneaux[nom].rappels:
+                au_chargement(espace, rappel)
+            sous_onglets.append(espace)
+            sub_tabs.append(TabPanel(child=espace, title=titre_panneau))
+        onglets.append(TabPanel(child=Tabs(tabs=sub_tabs), title=titre_onglet))
+
+    # Mise à jour des stations, parcs relais et trafic à partir des fichiers écrits par
+    # python -m mobilite.temps_reel (servis à côté de la page), sans recharger les couches statiques.
+    # Seules les sources présentes dans la page sont mises à jour.
+    sources_temps_reel = {jeu: source for panneau in panneaux.values() for jeu, source in panneau.temps_reel.items()}
+    titre_parcs = next((panneau.titre for panneau in panneaux.values() if panneau.titre is not None), None)
+    document.js_on_event(DocumentReady, suivre_temps_reel(sources_temps_reel, titre_parcs, PREFIXE_TITRE_PARCS))
+    # Cartes en WebGL (retour au canvas dans le navigateur si WebGL est indisponible)
+    rendu.appliquer_rendu([carte for panneau in panneaux.values() for carte in panneau.cartes], mode)
+    document.add_root(Column(Row(Div(text=LOGO), Div(text=ENTETE)), Tabs(tabs=onglets)))
+    return sous_onglets
+
+# Fonction pour construire la page dans chemin à partir des données chargées, comme le script
+# principal (exporter_page). Les panneaux dont l'empreinte est absente du cache (tous avec forcer)
+# sont construits par un pool de processus (dans le processus courant avec processus=1), les autres
+# relus du cache. Si aucune empreinte n'a changé depuis la construction précédente (et sans forcer),
+# les fichiers existants sont gardés tels quels.
+# Renvoie (panneau -> (état, durée en secondes), nom du fichier -> taille, vide si la page est gardée).
+def construire_page(donnees, chemin="index.html", processus=None, forcer=False, mode=rendu.MODE_PAR_DEFAUT):
+    dossier = os.path.dirname(chemin)
+    nom_base = os.path.splitext(os.path.basename(chemin))[0]
+    fichier_empreintes = os.path.join(dossier, f"{nom_base}.construction.json")
+    try:
+        with open(fichier_empreintes, encoding="utf-8") as fichier:
+            anciennes = json.load(fichier)
+    except (OSError, ValueError):
+        anciennes = {}
+
+    version = version_code()
+    entrees = entrees_panneaux(donnees.sources, donnees.chargements, donnees.en_ligne, donnees.reseau)
+    empreintes = {nom: empreinte_panneau(nom, valeurs, version) for nom, valeurs in entrees.items()}
+    empreintes["rendu"] = mode
+    modifies = {nom for nom in empreintes if anciennes.get(nom) != empreintes[nom]}
+    existants = all(os.path.exists(os.path.join(dossier, nom)) for nom in (os.path.basename(chemin), f"{nom_base}.json"))
+    if not forcer and not modifies and existants:
+        return {nom: ("inchangé", 0.0) for nom in entrees}, {}
+
+    os.makedirs(DOSSIER_PANNEAUX, exist_ok=True)
+    fichiers = {nom: os.path.join(DOSSIER_PANNEAUX, f"{nom}.{empreintes[nom]}.json") for nom in entrees}
+    etats = {nom: ("repris", 0.0) for nom in entrees if not forcer and os.path.exists(fichiers[nom])}
+    a_construire = [nom for nom in entrees if nom not in etats]
+    processus = max(1, min(processus or os.cpu_count() or 1, len(a_construire) or 1))
+    if processus == 1:
+        termines = [construire_fragment(nom, entrees[nom], fichiers[nom]) for nom in a_construire]
+    else:
+        with ProcessPoolExecutor(max_workers=processus) as pool:
+            futurs = [pool.submit(construire_fragment, nom, entrees[nom], fichiers[nom]) for nom in a_construire]
+            termines = [futur.result() for futur in futurs]
+    for nom, duree in termines:
+        etats[nom] = ("modifié" if nom in anciennes else "construit", duree)
+        # Versions précédentes du panneau, remplacées par celle-ci
+        for ancien in glob.glob(os.path.join(DOSSIER_PANNEAUX, f"{glob.escape(nom)}.*.json")):
+            if ancien != fichiers[nom]:
+                os.remove(ancien)
+
+    # Les panneaux sont réunis dans le même document : modèles communs relus une seule fois,
+    # identifiants distincts d'un panneau à l'autre (serialiser_fragment)
+    communs = {}
+    panneaux = {}
+    for nom in entrees:
+        with open(fichiers[nom], encoding="utf-8") as fichier:
+            panneaux[nom] = Panneau(*deserialiser_fragment(json.load(fichier), communs))
+    document = Document()
+    sous_onglets = assembler_document(document, panneaux, mode)
+    tailles = exporter_page(document, chemin, differes=sous_onglets)
+    ecrire_atomique(fichier_empreintes, json.dumps(empreintes, indent=1).encode("utf-8"))
+    return {nom: etats[nom] for nom in entrees}, tailles
+
+# Tableau de la construction : une ligne par panneau, puis une par fichier écrit
+def rapport_construction(etats, tailles):
+    lignes = [f"{'panneau':14} {'état':>10} {'durée (ms)':>11}"]
+    for nom, (etat, duree) in etats.items():
+        lignes.append(f"{nom:14} {etat:>10} {duree * 1e3:>11.0f}")
+    for nom_fichier, taille in tailles.items():
+        lignes.append(f"{nom_fichier:24} {taille:>10} octets")
+    if not tailles:
+        lignes.append("aucun panneau modifié, page gardée")
+    return "\n".join(lignes)
+
+def main():
+    parser = argparse.ArgumentParser(description="Construction de la page, gardée si ses entrées n'ont pas changé")
+    parser.add_argument("--sortie", default="index.html", help="chemin de la page HTML")
+    parser.add_argument("--processus", type=int, default=None, help="taille du pool (nombre de processeurs par défaut)")
+    parser.add_argument("--forcer", action="store_true", help="reconstruire tous les panneaux même si rien n'a changé")
+    parser.add_argument("--rendu", choices=rendu.MODES, default=None, help="moteur de rendu des cartes")
+    parser.add_argument("--historique", default=FICHIER_PAR_DEFAUT, help="base SQLite de l'historique des relevés")
+    args = parser.parse_args()
+    debut = time.perf_counter()
+    client_http = CacheHTTP(ClientHTTP(delai=15, tentatives=3), TTL_EN_LIGNE)
+    donnees = charger_donnees(client_http, CacheFichiers(TTL_FICHIERS), args.historique)
+    chargement = time.perf_counter() - debut
+    etats, tailles = construire_page(donnees, args.sortie, args.processus, args.forcer, rendu.options(["--rendu", args.rendu] if args.rendu else []))
+    print(rapport_construction(etats, tailles))
+    print(f"données {chargement * 1e3:.0f} ms, total {(time.perf_counter() - debut) * 1e3:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# Export de la page : BokehJS chargé depuis le CDN (mis en cache par le navigateur d'une page
+# à l'autre), document Bokeh écrit dans un fichier JSON à part, accompagné de copies
+# précompressées (.gz, et .br si le module brotli est installé), et répartition des octets par modèle.
+# Le contenu des panneaux différés (sous-onglets) part dans un fichier JSON par panneau, chargé
+# à la première ouverture de l'onglet. Des modèles construits dans un autre processus (ou gardés
+# d'une construction à l'autre) sont transmis sous forme de fragments JSON (serialiser_fragment).
+import gzip
+import json
+import os
+from collections import defaultdict
+from html import escape
+from bokeh.core.json_encoder import serialize_json
+from bokeh.core.serialization import Deserializer, Serializer
+from bokeh.embed.util import standalone_docs_json_and_render_items
+from bokeh.events import DocumentReady
+from bokeh.model.util import collect_models
+from bokeh.models import CustomJS, Tabs
+from bokeh.resources import CDN
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PAGE = """<!DOCTYPE html>
+<html lang="fr">
+  <head>
+    <meta charset="utf-8">
+    <title>{titre}</title>
+    <style>
+      html, body {{
+        box-sizing: border-box;
+        display: flow-root;
+        height: 100%;
+        margin: 0;
+        padding: 0;
+      }}
+    </style>
+    {ressources}
+    <link rel="preload" href="{donnees}" as="fetch" crossorigin="anonymous">
+  </head>
+  <body>
+    {racines}
+    <script type="text/javascript">
+      fetch("{donnees}")
+        .then((reponse) => reponse.json())
+        .then((docs_json) => Bokeh.embed.embed_items(docs_json, {elements}));
+    </script>
+  </body>
+</html>
+"""
+
+# Écrit un fichier et ses copies précompressées ; renvoie extension -> taille en octets
+def ecrire_compresse(chemin, contenu):
+    tailles = {"": len(contenu)}
+    copies = {".gz": gzip.compress(contenu, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        copies[".br"] = brotli.compress(contenu, quality=11)
+    with open(chemin, "wb") as fichier:
+        fichier.write(contenu)
+    for extension, compresse in copies.items():
+        with open(chemin + extension, "wb") as fichier:
+            fichier.write(compresse)
+        tailles[extension] = len(compresse)
+    return tailles
+
+JS_CHARGEMENT = """
+    for (const panneau of differes) {
+        if (panneau.etat !== undefined || !panneau.chemin.every(([onglets, i]) => onglets.active === i)) {
+            continue;
+        }
+        panneau.etat = "chargement";
+        fetch(panneau.fichier)
+            .then((reponse) => {
+                if (!reponse.ok) {
+                    throw new Error(panneau.fichier + " : HTTP " + reponse.status);
+                }
+                return reponse.json();
+            })
+            .then((patch) => {
+                panneau.modele.document.apply_json_patch(patch);
+                panneau.etat = "charge";
+            })
+            .catch((erreur) => {
+                panneau.etat = undefined;
+                console.warn("Chargement du panneau impossible", erreur);
+            });
+    }
+"""
+
+# Fonction pour exécuter un CustomJS une fois le contenu d'un panneau différé arrivé dans le navigateur
+# (remplace document_ready pour les callbacks qui portent sur ce contenu)
+def au_chargement(panneau, rappel):
+    panneau.js_on_change("children", rappel)
+
+# Suite d'onglets (Tabs, indice) à activer pour que cible soit visible, None si cible n'est pas sous modele
+def _chemin_onglets(modele, cible):
+    if modele is cible:
+        return []
+    if isinstance(modele, Tabs):
+        enfants = [(onglet.child, (modele, i)) for i, onglet in enumerate(modele.tabs)]
+    else:
+        enfants = [(enfant, None) for enfant in getattr(modele, "children", [])]
+    for enfant, etape in enfants:
+        enfant = enfant[0] if isinstance(enfant, tuple) else enfant
+        chemin = _chemin_onglets(enfant, cible)
+        if chemin is not None:
+            return ([list(etape)] if etape else []) + chemin
+    return None
+
+# Détache le contenu des panneaux différés du document et renvoie, par panneau, le patch JSON
+# (événements ModelChanged au format de Document.apply_json_patch) qui le rattache dans le navigateur.
+# Les modèles encore atteignables depuis la page, ou partagés entre plusieurs panneaux, restent
+# dans le document principal et ne sont envoyés que par référence.
+def _differer(document, panneaux, nom_base):
+    contenus = []
+    for panneau in panneaux:
+        contenus.append((panneau, list(panneau.children), dict(panneau.js_property_callbacks)))
+        panneau.children = []
+        panneau.js_property_callbacks = {}
+    racines = [*document.roots, *(rappel for rappels in document.callbacks.js_event_callbacks.values() for rappel in rappels)]
+    principaux = {id(modele) for modele in collect_models(*racines)}
+    vus = {}
+    for _, enfants, rappels in contenus:
+        for modele in collect_models(enfants, rappels):
+            if id(modele) not in principaux:
+                vus[id(modele)] = (modele, vus.get(id(modele), (None, 0))[1] + 1)
+    partages = [modele for modele, nombre in vus.values() if nombre > 1]
+
+    differes = []
+    for i, (panneau, _, _) in enumerate(contenus):
+        chemin = [etape for racine in document.roots for etape in (_chemin_onglets(racine, panneau) or [])]
+        differes.append(dict(modele=panneau, chemin=chemin, fichier=f"{nom_base}.{i}.json"))
+    chargement = CustomJS(args=dict(differes=differes, partages=partages), code=JS_CHARGEMENT)
+    for onglets in {id(onglets): onglets for panneau in differes for onglets, _ in panneau["chemin"]}.values():
+        onglets.js_on_change("active", chargement)
+    document.js_on_event(DocumentReady, chargement)
+
+    principaux = set(collect_models(*racines, chargement))
+    patches = []
+    for panneau, enfants, rappels in contenus:
+        serialiseur = Serializer(references=principaux, deferred=False)
+        evenements = []
+        if rappels:
+            evenements.append({"kind": "ModelChanged", "model": panneau.ref, "attr": "js_property_callbacks",
+                               "new": serialiseur.encode(rappels)})
+        evenements.append({"kind": "ModelChanged", "model": panneau.ref, "attr": "children",
+                           "new": serialiseur.encode(enfants)})
+        patches.append({"events": evenements})
+    return patches
+
+# Fonction pour exporter un document Bokeh : la page HTML (chemin) ne contient que les balises
+# du CDN et un script qui charge le document depuis <nom de la page>.json.
+# Le contenu de chaque panneau de differes (Column, Row...) n'est chargé qu'à la première ouverture
+# de l'onglet qui le contient ; le document est alors modifié, exporter_page est la dernière étape.
+# La page doit être servie en HTTP (GitHub Pages, python -m http.server), fetch refusant file://.
+# Renvoie nom du fichier -> taille en octets (compressée pour les copies .gz/.br).
+def exporter_page(document, chemin="index.html", titre="Mobilité urbaine à Rennes", differes=()):
+    dossier = os.path.dirname(chemin)
+    nom_base = os.path.splitext(os.path.basename(chemin))[0]
+    tailles = {}
+    for i, patch in enumerate(_differer(document, differes, nom_base) if differes else []):
+        nom_panneau = f"{nom_base}.{i}.json"
+        for extension, taille in ecrire_compresse(os.path.join(dossier, nom_panneau), serialize_json(patch).encode("utf-8")).items():
+            tailles[nom_panneau + extension] = taille
+
+    docs_json, elements = standalone_docs_json_and_render_items(document)
+    nom_donnees = f"{nom_base}.json"
+    for extension, taille in ecrire_compresse(os.path.join(dossier, nom_donnees), serialize_json(docs_json).encode("utf-8")).items():
+        tailles[nom_donnees + extension] = taille
+
+    racines = "\n    ".join(f'<div id="{element_id}" data-root-id="{racine}" style="display: contents;"></div>'
+                           for element in elements for racine, element_id in element.roots.to_json().items())
+    page = PAGE.format(titre=escape(titre), ressources=CDN.render_js(), donnees=nom_donnees, racines=racines,
+                       elements=json.dumps([element.to_json() for element in elements]))
+    for extension, taille in ecrire_compresse(chemin, page.encode("utf-8")).items():
+        tailles[os.path.basename(chemin) + extension] = taille
+    return tailles
+
+# Identifiants des modèles définis ({"type": "object", "id": ...}) dans une représentation JSON,
+# dans l'ordre de leur définition
+def _definis(valeur, identifiants):
+    if isinstance(valeur, (list, tuple)):
+        for element in valeur:
+            _definis(element, identifiants)
+    elif isinstance(valeur, dict):
+        if valeur.get("type") == "object" and "id" in valeur:
+            identifiants.append(valeur["id"])
+        for element in valeur.values():
+            _definis(element, identifiants)
+    return identifiants
+
+# Identifiants des modèles (définitions {"type": "object", "id": ...} et références {"id": ...})
+# d'une représentation JSON remplacés selon noms (ancien -> nouveau)
+def _renommer(valeur, noms):
+    if isinstance(valeur, (list, tuple)):
+        return [_renommer(element, noms) for element in valeur]
+    if not isinstance(valeur, dict):
+        return valeur
+    valeur = {cle: _renommer(element, noms) for cle, element in valeur.items()}
+    if "id" in valeur and (len(valeur) == 1 or valeur.get("type") == "object"):
+        valeur["id"] = noms.get(valeur["id"], valeur["id"])
+    return valeur
+
+# Fonction pour sérialiser une valeur (listes, dictionnaires, modèles) construite dans un autre
+# processus : les modèles sont renommés <prefixe>.<k>, dans l'ordre de leur définition, donc distincts
+# d'un préfixe à l'autre quel que soit le processus qui les a créés ; les modèles de communs
+# (nom -> modèle, partagés par plusieurs fragments) sont définis à part sous commun.<nom>.
+# Renvoie un dictionnaire sérialisable en JSON, relu par deserialiser_fragment.
+def serialiser_fragment(valeur, prefixe, communs=None):
+    communs = communs or {}
+    serialiseur = Serializer(deferred=False)
+    definitions = serialiseur.encode(list(communs.values()))
+    contenu = serialiseur.encode(valeur)
+    noms = {modele.id: f"commun.{nom}" for nom, modele in communs.items()}
+    noms.update((identifiant, f"{prefixe}.{k}") for k, identifiant in enumerate(_definis(contenu, [])))
+    return {"communs": _renommer(definitions, noms), "contenu": _renommer(contenu, noms)}
+
+# Fonction pour reconstruire la valeur d'un fragment (serialiser_fragment). communs (identifiant ->
+# modèle) reçoit les modèles communs que les fragments précédents n'ont pas définis ; les autres
+# sont repris tels quels, si bien que tous les fragments d'un même document les partagent.
+def deserialiser_fragment(fragment, communs):
+    for definition in fragment["communs"]:
+        if definition["id"] not in communs:
+            communs[definition["id"]] = Deserializer(list(communs.values())).decode(definition)
+    return Deserializer(list(communs.values())).decode(fragment["contenu"])
+
+# Taille en octets (JSON) de chaque modèle du document, les modèles qu'il référence
+# n'étant comptés que chez eux. Renvoie une liste de (taille, type, id, nom), la plus grosse en tête.
+def octets_par_modele(document):
+    modeles = list(document.models)
+    serialiseur = Serializer(references=set(modeles), deferred=False)
+    tailles = []
+    for modele in modeles:
+        attributs = {nom: serialiseur.encode(valeur)
+                     for nom, valeur in modele.properties_with_values(include_defaults=False).items()}
+        taille = len(json.dumps({"type": "object", "name": modele.__qualified_model__, "id": modele.id,
+                                 "attributes": attributs}, separators=(",", ":")))
+        tailles.append((taille, modele.__qualified_model__, modele.id, modele.name))
+    return sorted(tailles, reverse=True)
+
+# Rapport texte : total par type de modèle puis les modèles les plus lourds
+def rapport_octets(document, premiers=15):
+    tailles = octets_par_modele(document)
+    par_type = defaultdict(lambda: [0, 0])
+    for taille, type_modele, _, _ in tailles:
+        par_type[type_modele][0] += 1
+        par_type[type_modele][1] += taille
+    total = sum(taille for taille, _, _, _ in tailles)
+    lignes = [f"{'type':32} {'modèles':>8} {'octets':>10} {'part':>6}"]
+    for type_modele, (nombre, octets) in sorted(par_type.items(), key=lambda item: -item[1][1]):
+        lignes.append(f"{type_modele:32} {nombre:>8} {octets:>10} {octets / total:>6.1%}")
+    lignes.append(f"{'total':32} {len(tailles):>8} {total:>10}")
+    lignes.append("")
+    lignes.append(f"{'modèle':32} {'id':>8} {'octets':>10}  nom")
+    for taille, type_modele, identifiant, nom in tailles[:premiers]:
+        lignes.append(f"{type_modele:32} {identifiant:>8} {taille:>10}  {nom or ''}")
+    return "\n".join(lignes)
@@ -0,0 +1,110 @@
+# Extraction colonne par colonne des enregistrements JSON
+import re
+from itertools import islice, repeat
+from operator import itemgetter
+import numpy as np
+from mobilite.profil import etape
+
+# Rayon de la Terre utilisé par la projection Web Mercator
+RAYON_TERRE = 6378137
+
+# Fonction pour convertir les coordonnées en Web Mercator (scalaires ou tableaux NumPy)
+def coor_wgs84_to_web_mercator(lon, lat):
+    k = RAYON_TERRE
+    x = lon * (k * np.pi/180.0)
+    y = np.log(np.tan((90 + lat) * np.pi/360.0)) * k
+    return (x, y)
+
+# Découpe un chemin du type "geo_shape.geometry.coordinates[0][1]" en une suite de clés
+def decouper_chemin(chemin):
+    cles = []
+    for nom, indice in re.findall(r"([^.\[\]]+)|\[(-?\d+)\]", chemin):
+        cles.append(int(indice) if indice else nom)
+    if not cles:
+        raise ValueError(f"Chemin vide ou invalide : {chemin!r}")
+    return tuple(cles)
+
+# Nombre d'enregistrements lus à la fois quand les données arrivent par un générateur
+TAILLE_LOT = 10000
+
+# Fonction pour extraire plusieurs champs d'une liste (ou d'un générateur) d'enregistrements.
+# colonnes associe un nom de colonne à un chemin, types associe éventuellement
+# un nom de colonne à un dtype NumPy, defauts à la valeur d'un champ facultatif (clé du chemin
+# absente, comme dans les anciens exports qui omettent les champs nuls, ou valeur nulle d'une
+# colonne typée). Un générateur est consommé par lots de TAILLE_LOT enregistrements : seuls les
+# tableaux de colonnes sont conservés, pas les dictionnaires.
+def extraire_colonnes(data, colonnes, types=None, defauts=None):
+    types = types or {}
+    defauts = defauts or {}
+    if isinstance(data, list):
+        return _extraire_lot(data, colonnes, types, defauts)
+    iterateur = iter(data)
+    lots = []
+    while True:
+        lot = list(islice(iterateur, TAILLE_LOT))
+        if not lot and lots:
+            break
+        lots.append(_extraire_lot(lot, colonnes, types, defauts))
+        if len(lot) < TAILLE_LOT:
+            break
+    if len(lots) == 1:
+        return lots[0]
+    return {nom: np.concatenate([lot[nom] for lot in lots]) for nom in colonnes}
+
+# Extraction d'une liste d'enregistrements. Les boucles sont faites par map/itemgetter (en C)
+# et les préfixes communs (ex. "coordonnees" pour lat et lon) ne sont parcourus qu'une fois.
+def _extraire_lot(data, colonnes, types, defauts):
+    niveaux = {(): data}
+
+    # Valeurs de tous les enregistrements pour un préfixe de chemin
+    def valeurs(cles):
+        if cles not in niveaux:
+            niveaux[cles] = list(map(itemgetter(cles[-1]), valeurs(cles[:-1])))
+        return niveaux[cles]
+
+    resultat = {}
+    for nom, chemin in colonnes.items():
+        cles = decouper_chemin(chemin)
+        dtype = types.get(nom)
+        if nom in defauts:
+            try:
+                liste = map(dict.get, valeurs(cles[:-1]), repeat(cles[-1]), repeat(defauts[nom]))
+                resultat[nom] = np.fromiter(liste, dtype=dtype, count=len(data)) if dtype is not None else _tableau(list(liste))
+            except (KeyError, IndexError, TypeError, ValueError):
+                # Préfixe absent ou nul, ou valeur nulle : parcours tolérant, plus lent, du lot
+                liste = [_valeur_facultative(enregistrement, cles, defauts[nom]) for enregistrement in data]
+                resultat[nom] = np.array(liste, dtype=dtype) if dtype is not None else _tableau(liste)
+            continue
+        if dtype is not None:
+            resultat[nom] = np.fromiter(map(itemgetter(cles[-1]), valeurs(cles[:-1])), dtype=dtype, count=len(data))
+            continue
+        resultat[nom] = _tableau(valeurs(cles))
+    return resultat
+
+# Valeur d'un champ facultatif d'un enregistrement : le défaut si une étape du chemin manque
+# ou si la valeur est nulle
+def _valeur_facultative(enregistrement, cles, defaut):
+    valeur = enregistrement
+    for cle in cles:
+        try:
+            valeur = valeur[cle]
+        except (KeyError, IndexError, TypeError):
+            return defaut
+    return defaut if valeur is None else valeur
+
+# Tableau NumPy des valeurs d'une colonne
+def _tableau(liste):
+    if liste and type(liste[0]) in (int, float, bool):
+        return np.asarray(liste)
+    # Les chaînes restent des objets Python, comme dans les DataFrame d'origine
+    tableau = np.empty(len(liste), dtype=object)
+    tableau[:] = liste
+    return tableau
+
+# Remplace les colonnes lon/lat par les colonnes x/y projetées en un seul appel vectorisé
+def projeter_colonnes(colonnes, lon="lon", lat="lat", x="x", y="y"):
+    with etape("projection"):
+        lons = np.asarray(colonnes.pop(lon), dtype=np.float64)
+        lats = np.asarray(colonnes.pop(lat), dtype=np.float64)
+        colonnes[x], colonnes[y] = coor_wgs84_to_web_mercator(lons, lats)
+    return colonnes
@@ -0,0 +1,102 @@
+# Géométries multi-lignes stockées à plat : tous les sommets dans un seul tampon float64
+# et un tableau de décalages qui délimite chaque partie (ligne) dans ce tampon
+from itertools import chain
+import numpy as np
+from pandas import DataFrame
+from bokeh.models import ColumnDataSource, CustomJS
+from mobilite.extraction import coor_wgs84_to_web_mercator
+
+class LignesMultiples:
+    # sommets : tableau (2, n) float64, ligne 0 = x (ou lon), ligne 1 = y (ou lat)
+    # decalages : tableau (p + 1) int64, la partie i occupe sommets[:, decalages[i]:decalages[i + 1]]
+    # entites : tableau (p) int64, indice de l'enregistrement d'origine de chaque partie
+    def __init__(self, sommets, decalages, entites):
+        self.sommets = np.ascontiguousarray(sommets, dtype=np.float64)
+        self.decalages = np.asarray(decalages, dtype=np.int64)
+        self.entites = np.asarray(entites, dtype=np.int64)
+
+    # Construit les lignes à partir d'une suite de géométries GeoJSON (LineString ou MultiLineString).
+    # Toutes les parties d'une MultiLineString sont conservées, une géométrie absente n'en donne aucune.
+    @classmethod
+    def depuis_geometries(cls, geometries):
+        parties = []
+        entites = []
+        for i, geometrie in enumerate(geometries):
+            if not geometrie:
+                continue
+            if geometrie["type"] == "LineString":
+                morceaux = [geometrie["coordinates"]]
+            elif geometrie["type"] == "MultiLineString":
+                morceaux = geometrie["coordinates"]
+            else:
+                raise ValueError(f"Type de géométrie non géré : {geometrie['type']}")
+            parties.extend(morceaux)
+            entites.extend([i] * len(morceaux))
+        decalages = np.zeros(len(parties) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, parties), dtype=np.int64, count=len(parties)), out=decalages[1:])
+        nb_sommets = int(decalages[-1])
+        # Aplatissement des coordonnées sans créer d'objet Python par sommet
+        plat = np.fromiter(chain.from_iterable(chain.from_iterable(parties)), dtype=np.float64, count=2 * nb_sommets)
+        return cls(plat.reshape(nb_sommets, 2).T, decalages, entites)
+
+    # Reconstruit le tampon à partir d'un DataFrame à une ligne par partie (colonnes x et y de tableaux)
+    @classmethod
+    def depuis_dataframe(cls, df, x='x', y='y'):
+        longueurs = np.fromiter(map(len, df[x]), dtype=np.int64, count=len(df))
+        decalages = np.zeros(len(df) + 1, dtype=np.int64)
+        np.cumsum(longueurs, out=decalages[1:])
+        if len(df):
+            sommets = np.stack([np.concatenate(df[x].tolist()), np.concatenate(df[y].tolist())])
+        else:
+            sommets = np.zeros((2, 0))
+        return cls(sommets, decalages, np.arange(len(df)))
+
+    @property
+    def nb_parties(self):
+        return len(self.decalages) - 1
+
+    @property
+    def nb_sommets(self):
+        return self.sommets.shape[1]
+
+    # Convertit tous les sommets WGS 84 en Web Mercator en une seule opération
+    def projeter(self):
+        x, y = coor_wgs84_to_web_mercator(self.sommets[0], self.sommets[1])
+        return LignesMultiples(np.stack([x, y]), self.decalages, self.entites)
+
+    # Découpe une ligne du tampon en une vue NumPy par partie (aucune copie)
+    def vues(self, axe):
+        return np.split(self.sommets[axe], self.decalages[1:-1])
+
+    # DataFrame à une ligne par partie : les attributs de l'enregistrement d'origine sont répétés,
+    # les colonnes x et y contiennent les vues sur le tampon (format attendu par multi_line)
+    def dataframe(self, attributs):
+        colonnes = {nom: np.asarray(valeurs)[self.entites] for nom, valeurs in attributs.items()}
+        colonnes['x'] = self.vues(0)
+        colonnes['y'] = self.vues(1)
+        return DataFrame(colonnes)
+
+# Code exécuté dans le navigateur : découpe les tampons à plat en une vue (subarray) par partie
+JS_DECOUPAGE = """
+    const xs = [];
+    const ys = [];
+    for (let i = 0; i < decalages.length - 1; i++) {
+        xs.push(x.subarray(decalages[i], decalages[i + 1]));
+        ys.push(y.subarray(decalages[i], decalages[i + 1]));
+    }
+    source.data = Object.assign({}, source.data, {[colonne_x]: xs, [colonne_y]: ys});
+"""
+
+# Fonction pour créer la ColumnDataSource d'un multi_line à partir d'un DataFrame de lignes.
+# Les sommets ne sont pas sérialisés partie par partie : ils partent dans deux tampons float64
+# (un par axe) avec les décalages, et le CustomJS renvoyé les redécoupe au chargement de la page
+# (à attacher à l'événement document_ready du document).
+def source_multi_lignes(df, x='x', y='y'):
+    lignes = LignesMultiples.depuis_dataframe(df, x, y)
+    source = ColumnDataSource(df.drop(columns=[x, y]))
+    source.data[x] = [[] for _ in range(len(df))]
+    source.data[y] = [[] for _ in range(len(df))]
+    remplissage = CustomJS(args=dict(source=source, x=lignes.sommets[0], y=lignes.sommets[1],
+                                     decalages=lignes.decalages.astype(np.int32),
+                                     colonne_x=x, colonne_y=y), code=JS_DECOUPAGE)
+    return source, remplissage
@@ -0,0 +1,306 @@
+# Historique des relevés en temps réel (stations vélo, parcs relais, trafic) dans une base SQLite
+# locale en ajout seul : par jeu, une table des relevés (releves_<jeu>, une ligne par horodatage et
+# clé) et une table des agrégats (agregats_<jeu>, une ligne par fenêtre, clé et tranche), avec des
+# colonnes par mesure. Un relevé déjà présent est écarté par la clé primaire (INSERT OR IGNORE),
+# sans relire la base. À chaque relevé, des agrégats par tranches de 15 min, 1 h et 1 jour
+# (nombre, somme, min, max, 95e centile) sont calculés sur le lot ajouté puis fusionnés sur place ;
+# les centiles d'une tranche qui reçoit un second lot sont recalculés une fois, à sa clôture. Les
+# graphiques interrogent ces agrégats au lieu de relire tout l'historique.
+import os
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from mobilite.cache import DOSSIER_CACHE
+
+FICHIER_PAR_DEFAUT = os.path.join(DOSSIER_CACHE, "historique.sqlite")
+
+# Tranches d'agrégation : nom -> durée en secondes (alignées sur l'époque, donc en UTC)
+FENETRES = {"15min": 900, "1h": 3600, "1j": 86400}
+
+# Par jeu de données : colonne servant de clé, colonne de regroupement (ou None), mesures conservées
+# (une mesure absente d'un relevé est ignorée)
+MESURES = {
+    "stations": ("nom", None, ["nbre_de_velo_disponible", "nbre_emplacement_vide"]),
+    "parcs_relais": ("nom", None, ["place_dispo_voit_perso", "place_dispo_voit_elec", "place_dispo_PMR", "place_dispo_covoit"]),
+    "trafic": ("troncon", "denomination", ["averagevehiclespeed", "traveltime", "traveltimereliability"]),
+}
+
+# Durée maximale d'historique relue d'un coup pour calculer les centiles des tranches closes
+BLOC_CLOTURE = 86400
+
+# Statistiques conservées par mesure dans les agrégats (colonnes <mesure>_<statistique>)
+STATISTIQUES = ["nombre", "somme", "minimum", "maximum", "p95"]
+
+# Tables d'un jeu. Relevés : clé primaire dans l'ordre du temps, les relevés arrivant dans l'ordre
+# du temps s'ajoutent en fin d'arbre B (pas d'index secondaire à tenir à jour). Agrégats : centiles
+# vaut 0 tant que les centiles de la tranche sont à recalculer (index partiel des seules tranches
+# concernées, retrouvées à la clôture sans parcourir la table).
+SCHEMA_JEU = """
+    CREATE TABLE IF NOT EXISTS releves_{jeu} (
+        horodatage REAL, cle TEXT, {releves},
+        PRIMARY KEY (horodatage, cle)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS agregats_{jeu} (
+        fenetre INTEGER, cle TEXT, debut REAL, centiles INTEGER, {agregats},
+        PRIMARY KEY (fenetre, cle, debut)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS agregats_{jeu}_a_clore ON agregats_{jeu} (fenetre, debut) WHERE centiles = 0;
+"""
+
+# Colonnes des agrégats d'un jeu, dans l'ordre de la table
+def _colonnes_agregats(mesures):
+    return [f"{mesure}_{statistique}" for mesure in mesures for statistique in STATISTIQUES]
+
+SCHEMA = "".join(SCHEMA_JEU.format(jeu=jeu, releves=", ".join(f"{mesure} REAL" for mesure in mesures),
+                                   agregats=", ".join(f"{colonne} {'INTEGER' if colonne.endswith('_nombre') else 'REAL'}"
+                                                      for colonne in _colonnes_agregats(mesures)))
+                 for jeu, (_, _, mesures) in MESURES.items()) + """
+    CREATE TABLE IF NOT EXISTS instantanes (jeu TEXT, horodatage REAL, PRIMARY KEY (jeu, horodatage));
+    CREATE TABLE IF NOT EXISTS groupes (jeu TEXT, cle TEXT, groupe TEXT, PRIMARY KEY (jeu, cle)) WITHOUT ROWID;
+"""
+
+# Agrégats d'un lot de relevés fusionnés dans ceux déjà enregistrés (une valeur manquante ne
+# compte pas). Les centiles d'une tranche nouvelle sont ceux du lot ; une tranche qui existait déjà
+# repasse à centiles = 0 et sera recalculée à sa clôture : un centile d'une tranche à centiles = 1
+# est toujours exact pour le contenu de sa tranche.
+def _mise_a_jour(jeu, mesures):
+    colonnes = ["fenetre", "cle", "debut", "centiles", *_colonnes_agregats(mesures)]
+    fusions = []
+    for mesure in mesures:
+        fusions += [f"{mesure}_nombre = {mesure}_nombre + excluded.{mesure}_nombre",
+                    f"{mesure}_somme = coalesce({mesure}_somme + excluded.{mesure}_somme, {mesure}_somme, excluded.{mesure}_somme)",
+                    f"{mesure}_minimum = coalesce(min({mesure}_minimum, excluded.{mesure}_minimum), {mesure}_minimum, excluded.{mesure}_minimum)",
+                    f"{mesure}_maximum = coalesce(max({mesure}_maximum, excluded.{mesure}_maximum), {mesure}_maximum, excluded.{mesure}_maximum)",
+                    f"{mesure}_p95 = NULL"]
+    return (f"INSERT INTO agregats_{jeu} ({', '.join(colonnes)}) VALUES ({', '.join('?' * len(colonnes))})"
+            f" ON CONFLICT (fenetre, cle, debut) DO UPDATE SET centiles = 0, {', '.join(fusions)}")
+
+# 95e centile par groupe (codes 0..nombre-1) des valeurs non manquantes, avec l'interpolation
+# linéaire de pandas (quantile), en un tri pour tous les groupes ; NaN pour un groupe sans valeur
+def _p95(codes, valeurs, nombre):
+    presentes = ~np.isnan(valeurs)
+    codes, valeurs = codes[presentes], valeurs[presentes]
+    ordre = np.lexsort((valeurs, codes))
+    valeurs = valeurs[ordre]
+    effectifs = np.bincount(codes, minlength=nombre)
+    debuts = np.cumsum(effectifs) - effectifs
+    position = np.maximum(effectifs - 1, 0) * 0.95
+    bas = np.floor(position).astype(np.int64)
+    haut = np.minimum(bas + 1, np.maximum(effectifs - 1, 0))
+    resultat = np.full(nombre, np.nan)
+    remplis = effectifs > 0
+    inferieur, superieur = valeurs[(debuts + bas)[remplis]], valeurs[(debuts + haut)[remplis]]
+    resultat[remplis] = inferieur + (superieur - inferieur) * (position - bas)[remplis]
+    return resultat
+
+# Centiles par (clé, tranche) de chaque mesure : DataFrame indexé comme groupby(['cle', 'debut'])
+def _centiles_groupes(tranches, mesures):
+    groupes = tranches.groupby(['cle', 'debut'])
+    codes = groupes.ngroup().to_numpy()
+    index = groupes.size().index
+    return pd.DataFrame({mesure: _p95(codes, tranches[mesure].to_numpy(dtype=np.float64), len(index)) for mesure in mesures},
+                        index=index)
+
+# Nom d'une mesure d'un jeu, vérifié avant d'entrer dans une requête
+def _mesure(jeu, mesure):
+    if mesure not in MESURES[jeu][2]:
+        raise ValueError(f"Mesure inconnue pour {jeu} : {mesure}")
+    return mesure
+
+class Historique:
+    def __init__(self, chemin=FICHIER_PAR_DEFAUT, fenetres=FENETRES):
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        self.fenetres = dict(fenetres)
+        # Le processus de rafraîchissement et la génération de la page peuvent écrire en même temps
+        self.connexion = sqlite3.connect(chemin, timeout=30)
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        # En WAL, une coupure ne peut perdre que les dernières transactions, jamais corrompre la base
+        self.connexion.execute("PRAGMA synchronous=NORMAL")
+        self.connexion.executescript(SCHEMA)
+
+    def fermer(self):
+        self.connexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erreur):
+        self.fermer()
+
+    # Ajoute le relevé d'un jeu de données (DataFrame analysé) pris à horodatage (secondes depuis
+    # l'époque, maintenant par défaut). Un même (jeu, horodatage) n'est enregistré qu'une fois.
+    # Renvoie le nombre de relevés (lignes) ajoutés.
+    def ajouter(self, jeu, df, horodatage=None):
+        horodatage = time.time() if horodatage is None else float(horodatage)
+        with self.connexion:
+            if not self.connexion.execute("INSERT OR IGNORE INTO instantanes VALUES (?, ?)", (jeu, horodatage)).rowcount:
+                return 0
+            ajoutes = self._charger(jeu, df.assign(horodatage=horodatage))
+            self._clore(jeu, horodatage)
+        return ajoutes
+
+    # Ajoute les tables des jeux en temps réel (jeu -> DataFrame), toutes au même horodatage
+    def ajouter_tables(self, tables, horodatage=None):
+        horodatage = time.time() if horodatage is None else horodatage
+        return {jeu: self.ajouter(jeu, df, horodatage) for jeu, df in tables.items() if jeu in MESURES}
+
+    # Ajout en masse de relevés horodatés chacun (rattrapage d'archives) : df contient la colonne clé
+    # du jeu, horodatage (secondes depuis l'époque), les mesures et éventuellement la colonne de
+    # regroupement. Les relevés déjà présents (même clé et même horodatage) sont ignorés.
+    # Renvoie le nombre de relevés ajoutés.
+    def ajouter_lot(self, jeu, df):
+        with self.connexion:
+            horodatages = pd.unique(df["horodatage"].dropna())
+            self.connexion.executemany("INSERT OR IGNORE INTO instantanes VALUES (?, ?)", ((jeu, float(h)) for h in horodatages))
+            ajoutes = self._charger(jeu, df)
+            self._clore(jeu, time.time())
+        return ajoutes
+
+    # Écrit des relevés (une ligne par clé et horodatage) et met à jour les agrégats de toutes les
+    # fenêtres, calculés ici sur les relevés ajoutés. Appelé dans une transaction ouverte.
+    def _charger(self, jeu, df):
+        colonne_cle, colonne_groupe, mesures = MESURES[jeu]
+        if colonne_groupe is not None and colonne_groupe in df:
+            paires = df[[colonne_cle, colonne_groupe]].dropna().drop_duplicates(colonne_cle, keep="last")
+            self.connexion.executemany("INSERT OR REPLACE INTO groupes VALUES (?, ?, ?)",
+                                       ((jeu, str(cle), str(groupe)) for cle, groupe in paires.itertuples(index=False)))
+        lignes = pd.DataFrame({"horodatage": df["horodatage"].astype(np.float64), "cle": df[colonne_cle].astype(str),
+                               **{mesure: pd.to_numeric(df[mesure], errors="coerce").astype(np.float64) if mesure in df
+                                  else np.nan for mesure in mesures}})
+        lignes = lignes[lignes[mesures].notna().any(axis=1)].drop_duplicates(["horodatage", "cle"])
+        if lignes.empty:
+            return 0
+        # Insertion dans l'ordre de la clé primaire
+        lignes = lignes.sort_values(["horodatage", "cle"], ignore_index=True)
+        lignes = self._inserer(jeu, lignes, mesures)
+        mise_a_jour = _mise_a_jour(jeu, mesures)
+        for fenetre in self.fenetres.values():
+            tranches = lignes.assign(debut=np.floor(lignes["horodatage"] / fenetre) * fenetre)
+            if tranches.duplicated(["cle", "debut"]).any():
+                groupes = tranches.groupby(["cle", "debut"])[mesures]
+                agregats = pd.concat({"nombre": groupes.count(), "somme": groupes.sum(min_count=1), "minimum": groupes.min(),
+                                      "maximum": groupes.max(), "p95": _centiles_groupes(tranches, mesures)}, axis=1)
+                colonnes = [agregats[statistique, mesure] for mesure in mesures for statistique in STATISTIQUES]
+                cles, debuts = agregats.index.get_level_values(0), agregats.index.get_level_values(1)
+            else:
+                # Une valeur par tranche (relevé en temps réel) : pas de regroupement à faire
+                colonnes = []
+                for mesure in mesures:
+                    valeur = tranches[mesure]
+                    colonnes += [valeur.notna().astype(np.int64), valeur, valeur, valeur, valeur]
+                cles, debuts = tranches["cle"], tranches["debut"]
+            self.connexion.executemany(mise_a_jour, zip([fenetre] * len(cles), cles.tolist(), debuts.tolist(), [1] * len(cles),
+                                                        *(colonne.tolist() for colonne in colonnes)))
+        return len(lignes)
+
+    # Insère les relevés avec INSERT OR IGNORE et renvoie ceux qui ont été ajoutés. Le nombre de
+    # lignes ajoutées (total_changes) suffit d'ordinaire : s'il manque des lignes (archive rechargée,
+    # ou recouvrant l'historique en temps réel), l'insertion est annulée puis refaite ligne à ligne
+    # pour savoir lesquelles existaient déjà (changes() de chaque INSERT).
+    def _inserer(self, jeu, lignes, mesures):
+        requete = (f"INSERT OR IGNORE INTO releves_{jeu} (horodatage, cle, {', '.join(mesures)})"
+                   f" VALUES ({', '.join('?' * (len(mesures) + 2))})")
+        valeurs = list(zip(*(lignes[nom].tolist() for nom in ["horodatage", "cle", *mesures])))
+        self.connexion.execute("SAVEPOINT releves")
+        avant = self.connexion.total_changes
+        self.connexion.executemany(requete, valeurs)
+        if self.connexion.total_changes - avant == len(valeurs):
+            self.connexion.execute("RELEASE releves")
+            return lignes
+        self.connexion.execute("ROLLBACK TO releves")
+        curseur = self.connexion.cursor()
+        ajoutees = [curseur.execute(requete, ligne).rowcount > 0 for ligne in valeurs]
+        self.connexion.execute("RELEASE releves")
+        return lignes[ajoutees]
+
+    # Calcule les centiles des tranches terminées avant horodatage qui sont à recalculer,
+    # en relisant l'historique par blocs d'au plus BLOC_CLOTURE secondes (ou d'une tranche)
+    def _clore(self, jeu, horodatage):
+        mesures = MESURES[jeu][2]
+        mise_a_jour = (f"UPDATE agregats_{jeu} SET centiles = 1, {', '.join(f'{mesure}_p95 = ?' for mesure in mesures)}"
+                       " WHERE fenetre = ? AND cle = ? AND debut = ? AND centiles = 0")
+        for fenetre in self.fenetres.values():
+            limites = self.connexion.execute(
+                f"SELECT min(debut), max(debut) FROM agregats_{jeu} WHERE fenetre = ? AND centiles = 0 AND debut + ? <= ?",
+                (fenetre, fenetre, horodatage)).fetchone()
+            if limites[0] is None:
+                continue
+            pas = fenetre * max(1, BLOC_CLOTURE // fenetre)
+            for debut in np.arange(limites[0], limites[1] + fenetre, pas):
+                releves = pd.read_sql_query(
+                    f"SELECT cle, horodatage, {', '.join(mesures)} FROM releves_{jeu} WHERE horodatage >= ? AND horodatage < ?",
+                    self.connexion, params=(float(debut), float(min(debut + pas, limites[1] + fenetre))))
+                releves['debut'] = np.floor(releves['horodatage'] / fenetre) * fenetre
+                centiles = _centiles_groupes(releves, mesures).reset_index()
+                self.connexion.executemany(mise_a_jour, zip(*(centiles[mesure].tolist() for mesure in mesures), [fenetre] * len(centiles),
+                                                            centiles['cle'].tolist(), centiles['debut'].tolist()))
+
+    # Agrégats d'une mesure par tranche de fenetre ("15min", "1h", "1j") entre debut et fin
+    # (secondes depuis l'époque). Renvoie un DataFrame cle, debut, nombre, moyenne, minimum,
+    # maximum, p95 ; le centile de la tranche en cours est calculé à la demande sur ses relevés.
+    def agregats(self, jeu, mesure, fenetre, debut=None, fin=None):
+        duree = self.fenetres[fenetre]
+        mesure = _mesure(jeu, mesure)
+        df = pd.read_sql_query(
+            f"SELECT cle, debut, {mesure}_nombre AS nombre, {mesure}_somme / {mesure}_nombre AS moyenne,"
+            f" {mesure}_minimum AS minimum, {mesure}_maximum AS maximum, {mesure}_p95 AS p95, centiles FROM agregats_{jeu}"
+            f" WHERE fenetre = ? AND {mesure}_nombre > 0 AND debut >= ? AND debut < ? ORDER BY cle, debut",
+            self.connexion, params=(duree, -np.inf if debut is None else np.floor(debut / duree) * duree,
+                                    np.inf if fin is None else fin))
+        en_cours = df.pop('centiles') == 0
+        if en_cours.any():
+            releves = pd.read_sql_query(
+                f"SELECT cle, horodatage, {mesure} FROM releves_{jeu} WHERE horodatage >= ?",
+                self.connexion, params=(df.loc[en_cours, 'debut'].min(),))
+            releves['debut'] = np.floor(releves['horodatage'] / duree) * duree
+            centiles = _centiles_groupes(releves, [mesure])[mesure]
+            df.loc[en_cours, 'p95'] = centiles.reindex(pd.MultiIndex.from_frame(df.loc[en_cours, ['cle', 'debut']])).to_numpy()
+        return df
+
+    # Fenêtre glissante des duree dernières secondes avant fin (maintenant par défaut), reconstituée
+    # à partir des tranches les plus fines (précision d'une tranche) : nombre, moyenne, minimum,
+    # maximum et 95e centile par clé, ou par groupe (dénomination des tronçons de trafic) si
+    # par_groupe. Le centile ne se déduit pas de ceux des tranches : il est calculé sur les relevés
+    # de ces mêmes tranches, sauf si centile est faux (colonne p95 absente).
+    def glissant(self, jeu, mesure, duree, fin=None, par_groupe=False, centile=True):
+        fin = time.time() if fin is None else fin
+        fenetre = min(self.fenetres.values())
+        mesure = _mesure(jeu, mesure)
+        debut = np.floor((fin - duree) / fenetre) * fenetre
+        cle = "coalesce(g.groupe, a.cle)" if par_groupe else "a.cle"
+        df = pd.read_sql_query(
+            f"SELECT {cle} AS cle, sum(a.{mesure}_nombre) AS nombre, sum(a.{mesure}_somme) / sum(a.{mesure}_nombre) AS moyenne,"
+            f" min(a.{mesure}_minimum) AS minimum, max(a.{mesure}_maximum) AS maximum"
+            f" FROM agregats_{jeu} a LEFT JOIN groupes g ON g.jeu = ? AND g.cle = a.cle"
+            f" WHERE a.fenetre = ? AND a.{mesure}_nombre > 0 AND a.debut >= ? AND a.debut < ?"
+            f" GROUP BY {cle} ORDER BY 1",
+            self.connexion, params=(jeu, fenetre, debut, fin))
+        if not centile:
+            return df
+        # Relevés des tranches commençant avant fin, donc jusqu'à la fin de la dernière
+        releves = pd.DataFrame(self.connexion.execute(
+            f"SELECT cle, {mesure} FROM releves_{jeu} WHERE {mesure} IS NOT NULL AND horodatage >= ? AND horodatage < ?",
+            (debut, np.ceil(fin / fenetre) * fenetre)).fetchall(), columns=['cle', 'valeur'])
+        cles = releves['cle']
+        if par_groupe:
+            groupes = dict(self.connexion.execute("SELECT cle, groupe FROM groupes WHERE jeu = ?", (jeu,)).fetchall())
+            cles = cles.map(groupes).fillna(cles)
+        codes = pd.Categorical(cles, categories=df['cle']).codes.astype(np.int64)
+        connus = codes >= 0
+        df['p95'] = _p95(codes[connus], releves['valeur'].to_numpy(dtype=np.float64)[connus], len(df))
+        return df
+
+    # Relevés bruts d'une mesure (pour les graphiques détaillés ou les recalculs)
+    def releves(self, jeu, mesure, debut=None, fin=None):
+        return pd.read_sql_query(
+            f"SELECT cle, horodatage, {_mesure(jeu, mesure)} AS valeur FROM releves_{jeu}"
+            f" WHERE {mesure} IS NOT NULL AND horodatage >= ? AND horodatage < ? ORDER BY horodatage, cle",
+            self.connexion, params=(-np.inf if debut is None else debut, np.inf if fin is None else fin))
+
+    # Vue d'ensemble : nombre de relevés et période couverte par jeu de données
+    def resume(self):
+        return pd.read_sql_query("SELECT jeu, count(*) AS releves, min(horodatage) AS debut, max(horodatage) AS fin"
+                                 " FROM instantanes GROUP BY jeu ORDER BY jeu", self.connexion)
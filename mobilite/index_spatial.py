@@ -0,0 +1,199 @@
+# Index spatial en grille régulière sur les coordonnées Web Mercator : chaque élément (point ou
+# boîte englobante d'une ligne) est rangé dans les cellules qu'il touche, au format CSR
+# (éléments triés par cellule + décalages). La même structure sert aux requêtes par fenêtre
+# en Python et, envoyée en tampons, au découpage de la vue dans le navigateur : seules les
+# lignes de la fenêtre affichée sont recopiées dans la ColumnDataSource dessinée.
+import numpy as np
+from bokeh.models import ColumnDataSource, CustomJS, Range1d
+
+# Nombre moyen d'éléments visé par cellule quand la taille des cellules n'est pas donnée
+ELEMENTS_PAR_CELLULE = 4
+
+class GrilleSpatiale:
+    # xmin, ymin, xmax, ymax : boîte englobante de chaque élément (xmax = xmin pour un point)
+    def __init__(self, xmin, ymin, xmax, ymax, taille_cellule=None):
+        self.boites = np.stack([np.asarray(v, dtype=np.float64) for v in (xmin, ymin, xmax, ymax)])
+        n = self.boites.shape[1]
+        if n:
+            self.origine = (float(self.boites[0].min()), float(self.boites[1].min()))
+            etendue = max(float(self.boites[2].max()) - self.origine[0], float(self.boites[3].max()) - self.origine[1])
+        else:
+            self.origine = (0.0, 0.0)
+            etendue = 0.0
+        if taille_cellule is None:
+            taille_cellule = etendue / max(1.0, np.ceil(np.sqrt(n / ELEMENTS_PAR_CELLULE)))
+        self.taille_cellule = float(taille_cellule) or 1.0
+        self.colonnes = int((self.boites[2].max() - self.origine[0]) // self.taille_cellule) + 1 if n else 1
+        self.lignes = int((self.boites[3].max() - self.origine[1]) // self.taille_cellule) + 1 if n else 1
+
+        # Cellules couvertes par chaque boîte, puis éléments triés par numéro de cellule
+        i0, j0 = self._cellules(self.boites[0], self.boites[1])
+        i1, j1 = self._cellules(self.boites[2], self.boites[3])
+        largeurs = i1 - i0 + 1
+        hauteurs = j1 - j0 + 1
+        repetitions = largeurs * hauteurs
+        elements = np.repeat(np.arange(n), repetitions)
+        rang = np.arange(len(elements)) - np.repeat(np.cumsum(repetitions) - repetitions, repetitions)
+        i = np.repeat(i0, repetitions) + rang % np.repeat(largeurs, repetitions)
+        j = np.repeat(j0, repetitions) + rang // np.repeat(largeurs, repetitions)
+        cellules = j * self.colonnes + i
+        ordre = np.argsort(cellules, kind="stable")
+        self.elements = elements[ordre]
+        self.decalages = np.searchsorted(cellules[ordre], np.arange(self.colonnes * self.lignes + 1))
+        # Pour chaque occurrence : sa cellule, la première cellule de l'élément (pour ne le
+        # renvoyer qu'une fois) et sa boîte, rangées dans l'ordre des cellules
+        self._i = i[ordre]
+        self._j = j[ordre]
+        self._premiere_i = np.repeat(i0, repetitions)[ordre]
+        self._premiere_j = np.repeat(j0, repetitions)[ordre]
+        self._boites_triees = self.boites[:, self.elements]
+
+    @classmethod
+    def depuis_points(cls, x, y, taille_cellule=None):
+        return cls(x, y, x, y, taille_cellule)
+
+    # Une boîte par partie d'un LignesMultiples (les parties vides sont placées à l'origine)
+    @classmethod
+    def depuis_lignes(cls, lignes, taille_cellule=None):
+        debuts = lignes.decalages[:-1]
+        pleines = lignes.decalages[1:] > debuts
+        boites = np.zeros((4, lignes.nb_parties))
+        if lignes.nb_sommets:
+            indices = debuts[pleines]
+            for axe in (0, 1):
+                boites[axe, pleines] = np.minimum.reduceat(lignes.sommets[axe], indices)
+                boites[axe + 2, pleines] = np.maximum.reduceat(lignes.sommets[axe], indices)
+        return cls(*boites, taille_cellule)
+
+    def __len__(self):
+        return self.boites.shape[1]
+
+    # Colonne et ligne de la cellule contenant chaque point (bornées à la grille)
+    def _cellules(self, x, y):
+        i = np.clip(((np.asarray(x) - self.origine[0]) // self.taille_cellule).astype(np.int64), 0, self.colonnes - 1)
+        j = np.clip(((np.asarray(y) - self.origine[1]) // self.taille_cellule).astype(np.int64), 0, self.lignes - 1)
+        return i, j
+
+    # Emprise de tous les éléments : (xmin, ymin, xmax, ymax)
+    def emprise(self):
+        if not len(self):
+            return (0.0, 0.0, 0.0, 0.0)
+        return (float(self.boites[0].min()), float(self.boites[1].min()),
+                float(self.boites[2].max()), float(self.boites[3].max()))
+
+    # Indices triés des éléments dont la boîte coupe la fenêtre [xmin, xmax] x [ymin, ymax]
+    def requete(self, xmin, ymin, xmax, ymax):
+        if not len(self):
+            return np.zeros(0, dtype=np.int64)
+        (i0, i1), (j0, j1) = self._cellules([xmin, xmax], [ymin, ymax])
+        # Dans chaque rangée de cellules, les occurrences des colonnes i0 à i1 sont contiguës
+        rangees = np.arange(j0, j1 + 1) * self.colonnes
+        debuts = self.decalages[rangees + i0]
+        longueurs = self.decalages[rangees + i1 + 1] - debuts
+        positions = np.arange(longueurs.sum()) + np.repeat(debuts - (np.cumsum(longueurs) - longueurs), longueurs)
+        # Un élément présent dans plusieurs cellules n'est gardé que dans la première cellule
+        # de la fenêtre qu'il touche ; seules les cellules du bord demandent un test exact
+        garder = ((self._i[positions] == np.maximum(self._premiere_i[positions], i0))
+                  & (self._j[positions] == np.maximum(self._premiere_j[positions], j0)))
+        positions = positions[garder]
+        bord = (self._i[positions] == i0) | (self._i[positions] == i1) | (self._j[positions] == j0) | (self._j[positions] == j1)
+        a_tester = positions[bord]
+        boites = self._boites_triees[:, a_tester]
+        dedans = (boites[0] <= xmax) & (boites[2] >= xmin) & (boites[1] <= ymax) & (boites[3] >= ymin)
+        return np.sort(np.concatenate([self.elements[positions[~bord]], self.elements[a_tester[dedans]]]))
+
+# Code exécuté dans le navigateur : même requête que GrilleSpatiale.requete sur la fenêtre
+# de la figure, puis recopie des lignes trouvées de la source complète vers la source dessinée
+JS_VUE = """
+    if (plot == null) {
+        return;
+    }
+    const donnees = complet.data;
+    if (cache.donnees !== donnees) {
+        // Boîtes englobantes recalculées à chaque nouveau contenu (niveau de détail des lignes)
+        const xs = donnees[colonne_x];
+        const ys = donnees[colonne_y];
+        if (xs.length === 0 || typeof xs[0] === "number") {
+            cache.boites = [xs, ys, xs, ys];
+        } else {
+            const boites = [new Float64Array(xs.length), new Float64Array(xs.length), new Float64Array(xs.length), new Float64Array(xs.length)];
+            for (let e = 0; e < xs.length; e++) {
+                boites[0][e] = Math.min(...xs[e]);
+                boites[1][e] = Math.min(...ys[e]);
+                boites[2][e] = Math.max(...xs[e]);
+                boites[3][e] = Math.max(...ys[e]);
+            }
+            cache.boites = boites;
+        }
+        cache.indices = undefined;
+    }
+    const [bx0, by0, bx1, by1] = cache.boites;
+    const x0 = Math.min(plot.x_range.start, plot.x_range.end);
+    const x1 = Math.max(plot.x_range.start, plot.x_range.end);
+    const y0 = Math.min(plot.y_range.start, plot.y_range.end);
+    const y1 = Math.max(plot.y_range.start, plot.y_range.end);
+    const cellule = (v, origine, nombre) => Math.min(nombre - 1, Math.max(0, Math.floor((v - origine) / taille_cellule)));
+    const i0 = cellule(x0, origine[0], colonnes);
+    const i1 = cellule(x1, origine[0], colonnes);
+    const j0 = cellule(y0, origine[1], lignes);
+    const j1 = cellule(y1, origine[1], lignes);
+    const vus = new Uint8Array(bx0.length);
+    const indices = [];
+    for (let j = j0; j <= j1; j++) {
+        for (let i = i0; i <= i1; i++) {
+            const c = j * colonnes + i;
+            for (let k = decalages[c]; k < decalages[c + 1]; k++) {
+                const e = elements[k];
+                if (vus[e] === 0 && bx0[e] <= x1 && bx1[e] >= x0 && by0[e] <= y1 && by1[e] >= y0) {
+                    vus[e] = 1;
+                    indices.push(e);
+                }
+            }
+        }
+    }
+    indices.sort((a, b) => a - b);
+    if (cache.indices !== undefined && cache.indices.length === indices.length && cache.indices.every((v, k) => v === indices[k])) {
+        return;
+    }
+    cache.donnees = donnees;
+    cache.indices = indices;
+    const visibles = {};
+    for (const nom in donnees) {
+        const colonne = donnees[nom];
+        visibles[nom] = indices.map((k) => colonne[k]);
+    }
+    visible.data = visibles;
+"""
+
+# Fonction pour créer la source dessinée d'une couche découpée selon la vue.
+# complet : ColumnDataSource de toutes les lignes (jamais dessinée), grille : index de ces lignes,
+# x et y : colonnes des coordonnées (nombres pour des points, tableaux pour un multi_line).
+# Les boîtes ne sont pas envoyées, le navigateur les recalcule à partir de la source complète.
+# Renvoie (source dessinée vide, CustomJS de découpage) ; le CustomJS est à lancer au chargement
+# et branché sur la figure avec suivre_vue.
+def source_decoupee(complet, grille, x='x', y='y'):
+    visible = ColumnDataSource({nom: [] for nom in complet.data})
+    decoupage = CustomJS(args=dict(complet=complet, visible=visible, plot=None,
+                                   colonne_x=x, colonne_y=y, origine=list(grille.origine),
+                                   taille_cellule=grille.taille_cellule, colonnes=grille.colonnes, lignes=grille.lignes,
+                                   elements=grille.elements.astype(np.int32), decalages=grille.decalages.astype(np.int32),
+                                   cache={}), code=JS_VUE)
+    # Un nouveau contenu de la source complète (niveau de détail par exemple) est redécoupé
+    complet.js_on_change("data", decoupage)
+    return visible, decoupage
+
+# Fixe la fenêtre initiale de la figure sur l'emprise des grilles (la source dessinée étant vide
+# au départ, l'ajustement automatique aux données ne peut pas servir) et branche le découpage
+# sur les déplacements et zooms
+def suivre_vue(plot, decoupage, *grilles, marge=0.05):
+    emprises = np.array([grille.emprise() for grille in grilles])
+    xmin, ymin = emprises[:, :2].min(axis=0)
+    xmax, ymax = emprises[:, 2:].max(axis=0)
+    dx = (xmax - xmin) * marge
+    dy = (ymax - ymin) * marge
+    plot.x_range = Range1d(xmin - dx, xmax + dx)
+    plot.y_range = Range1d(ymin - dy, ymax + dy)
+    decoupage.args["plot"] = plot
+    for plage in (plot.x_range, plot.y_range):
+        plage.js_on_change("start", decoupage)
+        plage.js_on_change("end", decoupage)
@@ -0,0 +1,117 @@
+# Instantanés colonne par colonne des jeux de données statiques déjà analysés et projetés :
+# un dossier par jeu de données, un fichier .npy par colonne (lisible par projection mémoire)
+# et un fichier meta.json contenant l'empreinte SHA-256 du fichier source
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from mobilite.cache import DOSSIER_CACHE, nom_temporaire
+from mobilite.profil import etape
+
+VERSION_FORMAT = 2
+DOSSIER_INSTANTANES = os.path.join(DOSSIER_CACHE, "instantanes")
+
+# Empreinte SHA-256 du contenu d'un fichier
+def empreinte_fichier(chemin, taille_bloc=1 << 20):
+    hachage = hashlib.sha256()
+    with open(chemin, "rb") as fichier:
+        for bloc in iter(lambda: fichier.read(taille_bloc), b""):
+            hachage.update(bloc)
+    return hachage.hexdigest()
+
+# Une colonne de tableaux (sommets d'un multi_line) ?
+def _est_colonne_de_tableaux(serie):
+    return len(serie) > 0 and isinstance(serie.iloc[0], (np.ndarray, list))
+
+# Fonction pour écrire un DataFrame sous forme d'instantané. Les colonnes de texte sont codées
+# par dictionnaire (indices int32 + valeurs distinctes dans meta.json), les catégories aussi en
+# gardant leurs codes (relues en catégories), les colonnes de sommets
+# sont stockées à plat avec leurs décalages, les dates en entiers UTC dans leur unité d'origine.
+def ecrire_instantane(df, dossier, empreinte):
+    temporaire = nom_temporaire(dossier.rstrip(os.sep))
+    os.makedirs(temporaire)
+    colonnes = []
+    for i, nom in enumerate(df.columns):
+        serie = df[nom]
+        fichier = f"{i}.npy"
+        if isinstance(serie.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_any_dtype(serie):
+            fuseau = str(serie.dt.tz) if serie.dt.tz is not None else None
+            valeurs = serie.dt.tz_convert("UTC") if fuseau else serie
+            unite = serie.dt.unit
+            np.save(os.path.join(temporaire, fichier), valeurs.to_numpy(dtype=f"datetime64[{unite}]").view(np.int64))
+            colonnes.append({"nom": nom, "type": "date", "fichier": fichier, "fuseau": fuseau, "unite": unite})
+        elif _est_colonne_de_tableaux(serie):
+            longueurs = np.fromiter(map(len, serie), dtype=np.int64, count=len(serie))
+            decalages = np.concatenate([[0], np.cumsum(longueurs)])
+            np.save(os.path.join(temporaire, fichier), np.concatenate([np.asarray(v, dtype=np.float64) for v in serie]))
+            np.save(os.path.join(temporaire, f"{i}.decalages.npy"), decalages)
+            colonnes.append({"nom": nom, "type": "tableaux", "fichier": fichier, "decalages": f"{i}.decalages.npy"})
+        elif isinstance(serie.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(temporaire, fichier), serie.cat.codes.to_numpy())
+            colonnes.append({"nom": nom, "type": "categorie", "fichier": fichier, "valeurs": serie.cat.categories.tolist()})
+        elif serie.dtype.kind in "biuf":
+            np.save(os.path.join(temporaire, fichier), serie.to_numpy())
+            colonnes.append({"nom": nom, "type": "nombre", "fichier": fichier})
+        else:
+            codes, valeurs = pd.factorize(serie, use_na_sentinel=False)
+            np.save(os.path.join(temporaire, fichier), codes.astype(np.int32))
+            valeurs = [None if pd.isna(v) else v for v in valeurs]
+            colonnes.append({"nom": nom, "type": "texte", "fichier": fichier, "valeurs": valeurs})
+    meta = {"version": VERSION_FORMAT, "empreinte": empreinte, "lignes": len(df), "colonnes": colonnes}
+    with open(os.path.join(temporaire, "meta.json"), "w", encoding="utf-8") as fichier:
+        json.dump(meta, fichier, ensure_ascii=False)
+    # Remplacement de l'ancien instantané par le nouveau
+    if os.path.exists(dossier):
+        shutil.rmtree(dossier)
+    os.replace(temporaire, dossier)
+
+# Fonction pour relire un instantané ; renvoie None s'il n'existe pas ou ne correspond pas à l'empreinte
+def lire_instantane(dossier, empreinte=None):
+    try:
+        with open(os.path.join(dossier, "meta.json"), encoding="utf-8") as fichier:
+            meta = json.load(fichier)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != VERSION_FORMAT or (empreinte is not None and meta["empreinte"] != empreinte):
+        return None
+    colonnes = {}
+    for colonne in meta["colonnes"]:
+        # Projection en mémoire : les pages ne sont lues qu'à l'utilisation
+        tableau = np.load(os.path.join(dossier, colonne["fichier"]), mmap_mode="r")
+        if colonne["type"] == "date":
+            valeurs = pd.to_datetime(np.asarray(tableau).view(f"datetime64[{colonne['unite']}]"), utc=colonne["fuseau"] is not None)
+            colonnes[colonne["nom"]] = valeurs.tz_convert(colonne["fuseau"]) if colonne["fuseau"] else valeurs
+        elif colonne["type"] == "tableaux":
+            decalages = np.load(os.path.join(dossier, colonne["decalages"]))
+            colonnes[colonne["nom"]] = np.split(tableau, decalages[1:-1])
+        elif colonne["type"] == "categorie":
+            colonnes[colonne["nom"]] = pd.Categorical.from_codes(np.asarray(tableau), categories=colonne["valeurs"])
+        elif colonne["type"] == "texte":
+            valeurs = np.empty(len(colonne["valeurs"]), dtype=object)
+            valeurs[:] = colonne["valeurs"]
+            colonnes[colonne["nom"]] = valeurs[tableau]
+        else:
+            colonnes[colonne["nom"]] = tableau
+    return DataFrame(colonnes, index=pd.RangeIndex(meta["lignes"]), copy=False)
+
+# Fonction pour obtenir le DataFrame analysé d'un fichier JSON statique : l'instantané est utilisé
+# s'il correspond encore au contenu du fichier source, sinon le fichier est lu (par lecteur),
+# analysé (par analyse) et l'instantané est réécrit
+def charger_instantane(chemin, analyse, lecteur, dossier=DOSSIER_INSTANTANES):
+    with etape("empreinte"):
+        empreinte = empreinte_fichier(chemin)
+    dossier_jeu = os.path.join(dossier, f"{os.path.basename(chemin)}.{analyse.__name__}")
+    with etape("instantane"):
+        df = lire_instantane(dossier_jeu, empreinte)
+    if df is None:
+        with etape("json"):
+            data = lecteur(chemin)
+        with etape("analyse"):
+            df = analyse(data)
+        os.makedirs(dossier, exist_ok=True)
+        with etape("ecriture"):
+            ecrire_instantane(df, dossier_jeu, empreinte)
+    return df
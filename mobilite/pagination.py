@@ -0,0 +1,45 @@
+# Lecture paginée de l'API Explore v2.1 de data.rennesmetropole.fr : les enregistrements sont
+# produits page par page (générateur), la mémoire utilisée dépend de la taille d'une page
+# et non de celle du jeu de données
+import json
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Taille maximale d'une page sur le point d'accès /records
+TAILLE_PAGE_MAX = 100
+# Au-delà de offset + limit = 10 000, /records refuse la requête : on passe par /exports/jsonl
+FENETRE_MAX = 10000
+
+# Remplace (ou ajoute) des paramètres dans l'URL ; un paramètre à None est retiré
+def modifier_url(url, **parametres):
+    morceaux = urlsplit(url)
+    requete = [(cle, valeur) for cle, valeur in parse_qsl(morceaux.query) if cle not in parametres]
+    requete += [(cle, str(valeur)) for cle, valeur in parametres.items() if valeur is not None]
+    return urlunsplit(morceaux._replace(query=urlencode(requete)))
+
+# URL d'export JSON Lines correspondant à une URL /records (mêmes filtres)
+def url_export(url):
+    morceaux = urlsplit(modifier_url(url, limit=None, offset=None))
+    if not morceaux.path.endswith("/records"):
+        raise ValueError(f"URL /records attendue : {url}")
+    return urlunsplit(morceaux._replace(path=morceaux.path[:-len("/records")] + "/exports/jsonl"))
+
+# Fonction pour parcourir tous les enregistrements d'un jeu de données.
+# Les paramètres limit/offset éventuellement présents dans l'URL sont ignorés : toutes les pages
+# sont lues tant que l'API en renvoie. Si le jeu dépasse la fenêtre de pagination, les
+# enregistrements sont lus en flux depuis l'export JSON Lines, une ligne à la fois.
+def iterer_enregistrements(client, url, taille_page=TAILLE_PAGE_MAX):
+    taille_page = min(taille_page, TAILLE_PAGE_MAX)
+    page = client.get_json(modifier_url(url, limit=taille_page, offset=0))
+    total = page.get("total_count")
+    if total is not None and total > FENETRE_MAX:
+        for ligne in client.lignes(url_export(url)):
+            yield json.loads(ligne)
+        return
+    offset = 0
+    while True:
+        resultats = page["results"]
+        yield from resultats
+        offset += len(resultats)
+        if len(resultats) < taille_page or (total is not None and offset >= total):
+            return
+        page = client.get_json(modifier_url(url, limit=taille_page, offset=offset))
@@ -0,0 +1,464 @@
+# Panneaux du tableau de bord : un constructeur par panneau (présentation, stations vélo et pistes
+# cyclables, stations de réparation, arrêts de bus et métro, trafic, accidents, parcs relais), qui
+# ne dépend que de ses entrées (entrees_panneaux) : python -m mobilite.construction construit chaque
+# panneau dans un processus du pool et le reçoit sérialisé (mobilite.export.serialiser_fragment).
+# Les panneaux sont assemblés en onglets dans un seul document (mobilite.construction.assembler_document),
+# par le script principal ou par python -m mobilite.construction.
+import html
+from collections import namedtuple
+from bokeh.models import CustomJS, Column, Row, Div, HoverTool, ColumnDataSource, BoxZoomTool, PanTool, ResetTool, Select, InlineStyleSheet, ColorBar
+from bokeh.plotting import figure
+from bokeh.transform import linear_cmap
+from bokeh.palettes import Blues3
+from pandas import DataFrame
+from mobilite.accidents import agreger_accidents
+from mobilite.simplification import source_multi_lignes_simplifiees, suivre_zoom
+from mobilite.geometrie import LignesMultiples
+from mobilite.index_spatial import GrilleSpatiale, source_decoupee, suivre_vue
+from mobilite.agregation import source_amas, suivre_amas
+from mobilite.schema import colonnes_codees, source_codee, infobulles
+from mobilite.temps_reel import date_parcs_relais, lignes_trafic
+from mobilite.trafic import PALETTE_CONGESTION, COULEUR_INCONNUE
+
+# Tolérances de simplification des pistes cyclables (mètres Web Mercator), du plus grossier au plus fin
+TOLERANCES_PISTES_CYCLABLES = (16.0, 4.0, 1.0)
+# Niveaux de détail des tronçons de trafic (rapport_simplification : 35 % des sommets à 16 m, 58 % à 1 m)
+TOLERANCES_TRAFIC = (16.0, 4.0, 1.0)
+
+# Début du titre de la carte des parcs relais, complété par la date du relevé
+PREFIXE_TITRE_PARCS = "Etat des Parcs Relais STAR le "
+
+# Sources dont dépend chaque panneau, dans l'ordre des onglets
+SOURCES_PANNEAUX = {
+    "presentation": (),
+    "stations": ("stations", "amenagement"),
+    "reparation": ("reparation",),
+    "bus_metro": ("bus_metro",),
+    "trafic": ("trafic",),
+    "accidents": ("accidents",),
+    "parcs_relais": ("parcs_relais",),
+}
+
+# Onglets de la page : (titre, [(panneau, titre du sous-onglet)]) ; un onglet à un seul panneau
+# sans titre n'a pas de sous-onglets
+ONGLETS = [
+    ("Présentation de la page web", [("presentation", None)]),
+    ("Informations sur les stations vélo en libre service", [("stations", "Stations de Vélos et Pistes cyclables"),
+                                                             ("reparation", "Stations de reparation de Vélos")]),
+    ("Informations sur les transports en commun", [("bus_metro", "Emplacement de arrêts de Bus et Metro"),
+                                                   ("trafic", "Etat du trafic par voies")]),
+    ("Informations sur les autres types de transport", [("accidents", "Fréquence des accidents"),
+                                                        ("parcs_relais", "Emplacement des parcs relais STAR")]),
+]
+
+# Entête de la page
+ENTETE = """<h1>MOBILITE URBAINE A RENNES</h1>"""
+LOGO = """<img src="https://www.aft-dev.com/sites/default/files/styles/actualites_intro/public/actualites/mobilite.jpeg?itok=I4mwEkRZ" width=100>"""
+
+# Panneau construit : contenu (modèle Bokeh à placer dans l'onglet), cartes (figures dont le moteur
+# de rendu est choisi à la fin, mobilite.rendu), rappels (CustomJS à exécuter une fois le contenu
+# arrivé dans le navigateur), sources en temps réel (jeu -> ColumnDataSource) et titre à mettre à
+# jour avec la date des parcs relais (None pour les autres panneaux)
+Panneau = namedtuple("Panneau", "contenu cartes rappels temps_reel titre")
+
+# Modèles partagés par les panneaux d'un même document (feuille de style des textes d'information,
+# fond de carte), créés au premier usage : écrits une seule fois dans la page
+class ModelesCommuns:
+    def __init__(self):
+        self._style = None
+        self._tuiles = None
+
+    def style(self):
+        if self._style is None:
+            self._style = InlineStyleSheet(css="""
+    .spacer {
+        margin-bottom: 20px; /* Espacement entre les éléments */
+    }
+    .information-text {
+        font-size: 18px; /* Taille de police pour le texte d'information */
+    }
+    .custom-text {
+        font-size: 14px; /* Taille de police pour le texte de commentaire */
+        font-style: italic; /* Police en italique pour le texte de commentaire */
+    }
+""")
+        return self._style
+
+    # Ajoute le fond de carte commun à une figure
+    def fond_de_carte(self, plot):
+        if self._tuiles is None:
+            self._tuiles = plot.add_tile('CartoDB Positron').tile_source
+        else:
+            plot.add_tile(self._tuiles)
+
+    # Modèles communs déjà créés, nom -> modèle
+    def modeles(self):
+        return {nom: modele for nom, modele in (("style", self._style), ("tuiles", self._tuiles)) if modele is not None}
+
+# Fonction pour créer le bloc "Information" placé sous chaque graphique
+def div_information(commun, texte):
+    return Div(stylesheets=[commun.style()], text=f"""
+    <div style="text-align: left;">
+        <p class="information-text"><strong>Information</strong></p>
+        <p class="custom-text">{texte}</p>
+    </div>
+""")
+
+# Fonction pour créer le panneau affiché à la place d'un graphique dont une source est indisponible
+# (indisponibles : nom de la source -> message d'erreur)
+def panneau_indisponible(commun, titre, indisponibles):
+    erreurs = "".join(f"<li>{nom} : {html.escape(erreur)}</li>" for nom, erreur in indisponibles.items())
+    return Div(stylesheets=[commun.style()], text=f"""
+    <div style="text-align: left;">
+        <p class="information-text"><strong>{titre}</strong></p>
+        <p class="custom-text">Les données suivantes n'ont pas pu être chargées :</p>
+        <ul class="custom-text">{erreurs}</ul>
+    </div>
+""")
+
+# Entrées de chaque panneau (panneau -> dictionnaire) à partir des sources chargées (nom -> valeur),
+# des chargements (pour les erreurs), des colonnes des sources en temps réel (donnees_sources) et
+# du réseau cyclable. Seules des valeurs sont transmises (DataFrames, colonnes, textes) : les
+# entrées se transmettent à un autre processus et leur empreinte suffit à savoir si le panneau a changé.
+def entrees_panneaux(sources, chargements, donnees_en_ligne, reseau=None):
+    entrees = {
+        "presentation": {},
+        "stations": {"stations": donnees_en_ligne.get("stations"), "amenagement": sources.get("amenagement"),
+                     "couverture": reseau is not None},
+        "reparation": {"reparation": sources.get("reparation")},
+        "bus_metro": {"bus_metro": sources.get("bus_metro")},
+        "trafic": {"trafic": donnees_en_ligne.get("trafic"),
+                   "lignes": lignes_trafic(sources["trafic"]) if "trafic" in sources else None},
+        "accidents": {"accidents": sources.get("accidents")},
+        "parcs_relais": {"parcs_relais": donnees_en_ligne.get("parcs_relais"),
+                         "date": date_parcs_relais(sources["parcs_relais"]) if "parcs_relais" in sources else None},
+    }
+    for nom, noms_sources in SOURCES_PANNEAUX.items():
+        entrees[nom]["indisponibles"] = {source: str(chargements[source].erreur)
+                                         for source in noms_sources if source not in sources}
+    return entrees
+
+# Page de présentation
+def panneau_presentation(entrees, commun):
+    div1_1=Div(stylesheets=[commun.style()], text="""
+    <h2>Gyldano DADJEDJI - Marc TANO - Kwami NOUCHET</h2>
+    <p>La ville de Rennes, capitale bretonne est une ville en pleine expansion. Pour répondre aux défis de la congestion routière et de la pollution, la mobilité urbaine est au cœur des préoccupations.</p>
+    <p class="spacer">Malgré ces options de transport en commun, les voitures restent un moyen de déplacement prédominant pour de nombreux habitants de Rennes. La mobilité urbaine représente donc un aspect crucial pour le développement de la ville.</p>
+    <p class="spacer"><strong>OBJECTIF:</strong> Ce projet vise à explorer et visualiser les données relatives à la dynamique de la mobilité urbaine à Rennes. De façon plus précise, il consiste à comprendre et accéder aux données du trafic, notamment la fréquentation, les performances des lignes de transport en commun, ainsi que les flux de circulation des voitures, pour mieux comprendre le fonctionnement du système et améliorer l'expérience des usagers, qu'ils soient résidents ou nouveaux arrivants à Rennes.</p>
+    <p>Ci-dessous, une présentation visuelle des différents modes de transport considérés dans le cadre de ce projet:</p>
+""")
+
+    div1_2=Div(text="""
+    <div style="text-align: center;">
+        <h2>Stations vélos</h2>  <img src="https://www.star.fr/fileadmin/_processed_/9/3/csm_Station_VLS-_Nicolas_Joubard_c5ddddaea2.jpg" width=250>
+    </div>
+""")
+    div1_3=Div(text="""
+    <div style="text-align: center;">
+        <h2>Transports en commun</h2>  <img src="https://www.mce-info.org/wp-content/uploads/2024/03/bus_et_metro_rennes_resultat.webp" width=225>
+    </div>
+""")
+    div1_4=Div(text="""
+    <div style="text-align: center;">
+        <h2>Autres types de transports</h2>   <img src="https://images.caradisiac.com/images/9/1/0/5/189105/S0-faut-il-interdire-la-moto-dans-les-bouchons-668061.jpg" width=340>
+    </div>
+""")
+    div_1_5=Div(text="""
+    <div>
+    <p><b>Remarque : Pour chaque onglet en déhors de la présentation, vous avez le choix entre deux sous-onglets pour explorer cette page web.</b></p>
+    </div>
+""")
+    return Panneau(Column(div1_1, Row(div1_2,div1_3,div1_4), div_1_5), [], [], {}, None)
+
+# Graphique des stations velo avec les pistes cyclables
+def panneau_stations(entrees, commun):
+    donnees_stations, amenagement_df = entrees["stations"], entrees["amenagement"]
+    rappels, temps_reel = [], {}
+    if donnees_stations is None and amenagement_df is None:
+        return Panneau(panneau_indisponible(commun, "Stations de vélos et pistes cyclables", entrees["indisponibles"]), [], [], {}, None)
+
+    plot_sub_tabs_station_velo = figure(x_axis_type="mercator", y_axis_type="mercator",title="Stations de Vélos Graph",
+                        active_scroll="wheel_zoom", width=1200, height=360)
+    commun.fond_de_carte(plot_sub_tabs_station_velo)
+
+    if donnees_stations is not None:
+        source1 = ColumnDataSource(data=donnees_stations)
+        temps_reel["stations"] = source1
+        stations_circle = plot_sub_tabs_station_velo.scatter(x="x", y="y", size=9, fill_color="orange", line_color="green", fill_alpha=0.8, source=source1,legend_label="Emplacement des stations de vélos")
+
+    if amenagement_df is not None:
+        # Les sommets sont simplifiés à plusieurs niveaux de détail et envoyés sous forme de tampons à plat,
+        # le niveau affiché est choisi dans le navigateur en fonction du zoom ; type de voie et sens
+        # partent codés, décodés par les infobulles
+        pistes_codees, valeurs_pistes = colonnes_codees(amenagement_df)
+        source2, remplissage_source2 = source_multi_lignes_simplifiees(pistes_codees, TOLERANCES_PISTES_CYCLABLES)
+        # Index spatial des pistes : seules les parties dans la fenêtre affichée sont dessinées
+        grille_pistes = GrilleSpatiale.depuis_lignes(LignesMultiples.depuis_dataframe(amenagement_df))
+        source2_visible, decoupage_source2 = source_decoupee(source2, grille_pistes)
+        amenagements_lines = plot_sub_tabs_station_velo.multi_line(xs='x', ys='y', source=source2_visible, color="green", line_width=2, legend_label="Pistes cyclables")
+        suivre_vue(plot_sub_tabs_station_velo, decoupage_source2, grille_pistes)
+        suivre_zoom(plot_sub_tabs_station_velo, remplissage_source2)
+        # Reconstitution des géométries des pistes cyclables côté navigateur (découpées dès leur remplissage)
+        rappels.append(remplissage_source2)
+
+    # Vue d'ensemble : stations regroupées en amas (vélos disponibles additionnés, recalculés à chaque
+    # rafraîchissement des données en temps réel), stations une à une en vue rapprochée
+    if donnees_stations is not None:
+        source_amas_stations, bascule_stations = source_amas(stations_circle, valeurs=('nbre_de_velo_disponible', 'nbre_emplacement_vide'))
+        amas_stations = plot_sub_tabs_station_velo.scatter(x="x", y="y", size="diametre", fill_color="orange", line_color="green", fill_alpha=0.6, source=source_amas_stations)
+        etiquettes_stations = plot_sub_tabs_station_velo.text(x="x", y="y", text="etiquette", text_align="center", text_baseline="middle", text_font_size="9pt", source=source_amas_stations)
+        suivre_amas(plot_sub_tabs_station_velo, bascule_stations, [amas_stations, etiquettes_stations])
+        # Choix entre amas et points selon le zoom initial
+        rappels.append(bascule_stations)
+
+        # Outils de survol
+        infos_stations = [('Nom de station', '@nom'),
+                          ('Total vélos disponibles', '@total_possible'),
+                          ('Emplacement vide actuelle', '@nbre_emplacement_vide'),
+                          ('Nombre de vélos disponibles', '@nbre_de_velo_disponible')]
+        if entrees["couverture"]:
+            infos_stations.append(('Stations joignables par piste', '@couverture{0%}'))
+        infos_stations += [('Vélos disponibles dans 30 min (prévision)', '@nbre_de_velo_disponible_30min{0}'),
+                           ('Emplacements vides dans 30 min (prévision)', '@nbre_emplacement_vide_30min{0}')]
+        hover_tool_stations = HoverTool(tooltips=infos_stations, renderers=[stations_circle])
+        plot_sub_tabs_station_velo.add_tools(hover_tool_stations)
+
+        hover_tool_amas_stations = HoverTool(tooltips=[('Nombre de stations', '@nombre'),
+                                                       ('Emplacements vides', '@nbre_emplacement_vide'),
+                                                       ('Vélos disponibles', '@nbre_de_velo_disponible')],
+                                             renderers=[amas_stations])
+        plot_sub_tabs_station_velo.add_tools(hover_tool_amas_stations)
+
+    if amenagement_df is not None:
+        hover_tool_amenagements = HoverTool(**infobulles([('Type de voie', '@type_amenagement'),
+                                                          ('Sens possibles', '@position')], valeurs_pistes),
+                                           renderers=[amenagements_lines])
+        plot_sub_tabs_station_velo.add_tools(hover_tool_amenagements)
+
+    # Ajout d'autres outils de navigation
+    plot_sub_tabs_station_velo.add_tools(BoxZoomTool())
+    plot_sub_tabs_station_velo.add_tools(PanTool())
+    plot_sub_tabs_station_velo.add_tools(ResetTool())
+
+    # Ajout de legende
+    plot_sub_tabs_station_velo.legend.location = "top_right"
+    plot_sub_tabs_station_velo.legend.click_policy="hide"
+    plot_sub_tabs_station_velo.title.text = "Station velo en libre service et pistes cyclables"
+    plot_sub_tabs_station_velo.title.align = "center"
+
+    # Affichage (la carte reste affichée si une seule des deux couches est disponible)
+    div_station_velo = div_information(commun, """Explorez le graphique ci-dessous pour accéder aux données concernant les vélos en libre-service et les pistes cyclables en Bretagne. En cliquant sur la légende "Pistes cyclables" du graphique, découvrez les directions disponibles en fonction du type de voie et les sens possibles, tandis qu'en sélectionnant la légende "Emplacement des stations vélos", vous obtiendrez des informations en temps réel sur l'état de la station : nom de la station, disponibilité des vélos, places de stationnement, etc.""")
+    plot_station_velo = Column(plot_sub_tabs_station_velo, div_station_velo)
+    if entrees["indisponibles"]:
+        plot_station_velo.children.append(panneau_indisponible(commun, "Stations de vélos et pistes cyclables", entrees["indisponibles"]))
+    return Panneau(plot_station_velo, [plot_sub_tabs_station_velo], rappels, temps_reel, None)
+
+# Graphique des stations de réparation de velos
+def panneau_reparation(entrees, commun):
+    reparation = entrees["reparation"]
+    if reparation is None:
+        return Panneau(panneau_indisponible(commun, "Stations de réparation de vélo", entrees["indisponibles"]), [], [], {}, None)
+    source, valeurs_reparation = source_codee(reparation)
+    grille_reparation = GrilleSpatiale.depuis_points(reparation['x'], reparation['y'])
+    source_reparation_visible, decoupage_reparation = source_decoupee(source, grille_reparation)
+
+    plot_sub_tabs_reparation_velo= figure(x_axis_type="mercator", y_axis_type="mercator",
+               active_scroll="wheel_zoom", width=1200, height=365)
+    commun.fond_de_carte(plot_sub_tabs_reparation_velo)
+
+    plot_sub_tabs_reparation_velo.scatter(x="x", y="y", marker="triangle", size=10, fill_color="blue", fill_alpha=0.8, source=source_reparation_visible)
+    suivre_vue(plot_sub_tabs_reparation_velo, decoupage_reparation, grille_reparation)
+
+    hover_tool = HoverTool(**infobulles([('Lieu', '@Lieu'),
+                                         ('Etat', '@etat'),
+                                         ('Propose des services de gonflage', '@gonflage'),
+                                         ('Propose des services de réparation', '@reparation')], valeurs_reparation))
+    plot_sub_tabs_reparation_velo.add_tools(hover_tool)
+
+    plot_sub_tabs_reparation_velo.add_tools(BoxZoomTool())
+    plot_sub_tabs_reparation_velo.add_tools(PanTool())
+    plot_sub_tabs_reparation_velo.add_tools(ResetTool())
+
+    # Titre
+    plot_sub_tabs_reparation_velo.title.text = "Stations de réparation de vélo"
+    plot_sub_tabs_reparation_velo.title.align = "center"
+
+    # Affichage ; premier découpage de la couche indexée à l'arrivée du panneau
+    div_reparation_velo = div_information(commun, """Découvrez les stations de réparation de vélos en Bretagne en explorant le graphique ci-dessous. En cliquant sur une station, accédez aux services offerts, tels que les options de réparation, de gonflage de pneus, etc.""")
+    return Panneau(Column(plot_sub_tabs_reparation_velo, div_reparation_velo), [plot_sub_tabs_reparation_velo],
+                   [decoupage_reparation], {}, None)
+
+# Graphique pour les arrêts de bus et métro
+def panneau_bus_metro(entrees, commun):
+    noms_bus = entrees["bus_metro"]
+    if noms_bus is None:
+        return Panneau(panneau_indisponible(commun, "Arrêts de bus et métro", entrees["indisponibles"]), [], [], {}, None)
+    #Conversion en format Bokeh (noms des arrêts codés, décodés par les infobulles)
+    source_bus_metro, valeurs_bus_metro = source_codee(noms_bus)
+    grille_bus_metro = GrilleSpatiale.depuis_points(noms_bus['x'], noms_bus['y'])
+    source_bus_metro_visible, decoupage_bus_metro = source_decoupee(source_bus_metro, grille_bus_metro)
+
+    plot_bus_metro= figure(x_axis_type="mercator", y_axis_type="mercator",
+               active_scroll="wheel_zoom", width=1200, height=360)
+    commun.fond_de_carte(plot_bus_metro)
+
+    arrets_bus_metro = plot_bus_metro.scatter(x="x", y="y", size=3, fill_color="red", fill_alpha=0.8, source=source_bus_metro_visible)
+    suivre_vue(plot_bus_metro, decoupage_bus_metro, grille_bus_metro)
+
+    # Arrêts regroupés en amas précalculés (un cercle par cellule de grille) tant que la carte est dézoomée
+    source_amas_bus_metro, bascule_bus_metro = source_amas(arrets_bus_metro, df=noms_bus)
+    amas_bus_metro = plot_bus_metro.scatter(x="x", y="y", size="diametre", fill_color="red", fill_alpha=0.5, source=source_amas_bus_metro)
+    etiquettes_bus_metro = plot_bus_metro.text(x="x", y="y", text="etiquette", text_align="center", text_baseline="middle", text_font_size="8pt", source=source_amas_bus_metro)
+    suivre_amas(plot_bus_metro, bascule_bus_metro, [amas_bus_metro, etiquettes_bus_metro])
+
+    hover_tool_arret_bus = HoverTool(**infobulles([('Nom de station', '@nom')], valeurs_bus_metro), renderers=[arrets_bus_metro])
+    plot_bus_metro.add_tools(hover_tool_arret_bus)
+    plot_bus_metro.add_tools(HoverTool(tooltips=[("Nombre d'arrêts", '@nombre')], renderers=[amas_bus_metro]))
+
+    plot_bus_metro.title.text = "Visualisation des arrêts de Bus et Metro"
+    plot_bus_metro.title.align = "center"
+
+    div_arret_busmetro = div_information(commun, """Explorez la carte ci-dessous pour découvrir l'ensemble des arrêts de bus et de métro de la métropole bretonne. Veuillez noter que les données disponibles sur le site de Rennes Métropole sont limitées et ne fournissent pas une représentation exhaustive des arrêts de transport en commun, permettant de visualiser l'ensemble des bus et métros disponibles pour chaque arrêt. Cependant, vous pouvez zoomer pour obtenir un aperçu des points de transport disponibles dans votre commune ou votre quartier. Cliquez sur un arrêt pour afficher son nom, avec la possibilité de voir la position de l'arrêt dans les deux sens de circulation.""")
+    # Premier découpage et choix entre amas et points selon le zoom initial à l'arrivée du panneau
+    return Panneau(Column(plot_bus_metro, div_arret_busmetro), [plot_bus_metro],
+                   [decoupage_bus_metro, bascule_bus_metro], {}, None)
+
+# Carte de l'état du trafic en temps réel : tronçons colorés selon l'indice de congestion de leur
+# route (moyenne pondérée par la longueur) ou leur propre indice
+def panneau_trafic(entrees, commun):
+    if entrees["trafic"] is None:
+        return Panneau(panneau_indisponible(commun, "Etat du trafic", entrees["indisponibles"]), [], [], {}, None)
+    # Une ligne par partie de tronçon : indices de congestion du tronçon et de sa route, vitesses
+    # moyennes maximale et minimale de la route sur la dernière heure (donnees_sources). Les sommets
+    # partent en tampons à plat simplifiés à plusieurs niveaux de détail, comme les pistes cyclables ;
+    # le rafraîchissement ne touche qu'aux colonnes d'indices et de vitesses.
+    lignes = entrees["lignes"]
+    parties = DataFrame({**entrees["trafic"], 'x': lignes.vues(0), 'y': lignes.vues(1)})
+    source_trafic, remplissage_trafic = source_multi_lignes_simplifiees(parties, TOLERANCES_TRAFIC)
+
+    plot_sub_trafic = figure(x_axis_type="mercator", y_axis_type="mercator",
+                             active_scroll="wheel_zoom", width=1100, height=400)
+    commun.fond_de_carte(plot_sub_trafic)
+
+    couleurs_route = linear_cmap("congestion_route", PALETTE_CONGESTION, 0, 1, nan_color=COULEUR_INCONNUE)
+    couleurs_troncon = linear_cmap("congestion", PALETTE_CONGESTION, 0, 1, nan_color=COULEUR_INCONNUE)
+    lignes_routes = plot_sub_trafic.multi_line(xs="x", ys="y", line_width=3, line_color=couleurs_route, source=source_trafic)
+    lignes_troncons = plot_sub_trafic.multi_line(xs="x", ys="y", line_width=3, line_color=couleurs_troncon, source=source_trafic, visible=False)
+    plot_sub_trafic.add_layout(ColorBar(color_mapper=couleurs_route["transform"], title="Indice de congestion (0 fluide, 1 à l'arrêt)",
+                                        title_standoff=6, width=10), "right")
+
+    # Ajout d'outils de survol
+    hover = HoverTool(renderers=[lignes_routes, lignes_troncons], line_policy="nearest")
+    hover.tooltips = [
+        ("Route", "@denomination"),
+        ("Congestion de la route", "@congestion_route{0.00}"),
+        ("Congestion du tronçon", "@congestion{0.00}"),
+        ("Vitesse moyenne / autorisée", "@averagevehiclespeed / @vitesse_maxi km/h"),
+        ("Temps de parcours (fiabilité)", "@traveltime s (@traveltimereliability %)"),
+        ("Vitesse maximale (dernière heure)", "@max_speed"),
+        ("Vitesse minimale (dernière heure)", "@min_speed"),
+    ]
+    plot_sub_trafic.add_tools(hover)
+
+    plot_sub_trafic.title.text = "Indice de congestion du trafic par route sur Rennes"
+    plot_sub_trafic.title.align = "center"
+    suivre_zoom(plot_sub_trafic, remplissage_trafic)
+
+    # Création du menu déroulant pour choisir l'indice affiché
+    select_trafic = Select(title="Colorer selon", options=["Indice de la route", "Indice du tronçon"], value="Indice de la route")
+    select_trafic.js_on_change("value", CustomJS(args=dict(lignes_routes=lignes_routes, lignes_troncons=lignes_troncons), code="""
+        const par_route = cb_obj.value === 'Indice de la route';
+        lignes_routes.visible = par_route;
+        lignes_troncons.visible = !par_route;
+    """))
+
+    # Affichage de la carte et du menu déroulant
+    div_etat_trafic = div_information(commun, """Pour obtenir une vision globale du trafic à Rennes, nous vous proposons une carte interactive de l'indice de congestion de chaque route. Pour chaque tronçon, l'indice compare le temps de parcours relevé à celui d'un trajet à la vitesse autorisée (d'autant plus que ce temps est fiable) et la vitesse moyenne relevée à la vitesse autorisée ; l'indice d'une route est la moyenne de ceux de ses tronçons, pondérée par leur longueur. Un indice proche de 0 (vert) indique un trafic fluide, un indice proche de 1 (rouge) un trafic très dense. Le menu permet d'afficher l'indice propre à chaque tronçon, et le survol d'un tronçon donne aussi les vitesses moyennes maximale et minimale de sa route au cours de la dernière heure.""")
+    return Panneau(Column(Row(plot_sub_trafic, select_trafic), div_etat_trafic), [plot_sub_trafic], [remplissage_trafic],
+                   {"trafic": source_trafic}, None)
+
+#Diagramme pour le bilan des accidents corporels
+def panneau_accidents(entrees, commun):
+    df_accidents = entrees["accidents"]
+    if df_accidents is None:
+        return Panneau(panneau_indisponible(commun, "Bilan des accidents corporels", entrees["indisponibles"]), [], [], {}, None)
+    # Sommes et nombre d'accidents par année en un seul passage ; les moyennes sont calculées dans le navigateur
+    df_grouped = agreger_accidents(df_accidents, cles=('annee',))
+    source_accidents = ColumnDataSource(df_grouped[['annee', 'ntu', 'nbh', 'nbnh', 'ntu_nombre', 'nbh_nombre', 'nbnh_nombre']])
+
+    p1  = figure(x_axis_label="Année", y_axis_label="Valeurs", width=1100, height=365)
+    p1.vbar_stack(['ntu', 'nbh', 'nbnh'], x='annee', width=0.5, color=Blues3, legend_label=['NTU: Nombre de personnes tuées', 'NBH: Nombre de blessés hospitalisés', 'NBNH: Nombre de blessés non hospitalisés'], source=source_accidents)
+    p1.title.text = "Visualisation du bilan d'accidents corporels par année dans la ville de Rennes"
+    p1.title.align = "center"
+
+    hover = HoverTool(tooltips=[('Année', '@annee'), ('NTU', '@ntu'), ('NBH', '@nbh'), ('NBNH', '@nbnh')])
+    p1.add_tools(hover)
+
+    select_accident = Select(title="Type de données:", value="Nombre réel", options=["Nombre réel", "Moyenne"])
+
+    # Les sommes d'origine sont gardées dans cache au premier changement ; moyenne = somme / nombre
+    # d'accidents où la mesure est renseignée
+    callback = CustomJS(args=dict(source_accidents=source_accidents, select=select_accident, cache={}), code="""
+        const data = source_accidents.data;
+        const mesures = ['ntu', 'nbh', 'nbnh'];
+        if (!cache.sommes) {
+            cache.sommes = {};
+            for (const m of mesures) cache.sommes[m] = data[m];
+        }
+        const nouvelles = {...data};
+        for (const m of mesures) {
+            const sommes = cache.sommes[m];
+            const nombres = data[m + '_nombre'];
+            nouvelles[m] = select.value == "Moyenne" ? Array.from(sommes, (s, i) => nombres[i] ? s / nombres[i] : NaN) : sommes;
+        }
+        source_accidents.data = nouvelles;
+    """)
+
+    select_accident.js_on_change('value', callback)
+
+    div_accident = div_information(commun, """Ce sous-onglet permet de visualiser le nombre de personnes tuées, de blessés hospitalisés et de blessés non hospitalisés par année. Il offre également la possibilité de choisir entre les données brutes et les données moyennes. L'analyse des graphiques montre une diminution significative des accidents en 2020, probablement liée aux mesures de confinement dues à la COVID-19.""")
+    return Panneau(Column(Row(p1 , select_accident), div_accident), [], [], {}, None)
+
+# Carte des parcs relais, données en temps réel
+def panneau_parcs_relais(entrees, commun):
+    if entrees["parcs_relais"] is None:
+        return Panneau(panneau_indisponible(commun, "Parcs relais STAR", entrees["indisponibles"]), [], [], {}, None)
+    #Conversion en format Bokeh
+    source_parc_relais = ColumnDataSource(data=entrees["parcs_relais"])
+
+    plot_sub_parc = figure(x_axis_type="mercator", y_axis_type="mercator",
+               active_scroll="wheel_zoom", width=1100, height=365)
+    commun.fond_de_carte(plot_sub_parc)
+
+    plot_sub_parc.scatter(x="x", y="y", marker="diamond", size=15, fill_color="blue", fill_alpha=0.8, source=source_parc_relais)
+
+    hover_tool = HoverTool(tooltips=[('Nom', '@nom'),
+                                     ('Etat', '@etat'),
+                                     ('Capacité', '@capacity'),
+                                     ('Places disponibles vehicule soliste', '@place_dispo_voit_perso'),
+                                     ('Places disponibles vehicule electriques', '@place_dispo_voit_elec'),
+                                     ('Places disponibles covoiturage', '@place_dispo_covoit'),
+                                     ('Places disponibles PMR', '@place_dispo_PMR'),
+                                     ('Places vehicule soliste dans 30 min (prévision)', '@place_dispo_voit_perso_30min{0}')])
+
+    plot_sub_parc.add_tools(hover_tool)
+    plot_sub_parc.title.text = f"{PREFIXE_TITRE_PARCS}{entrees['date']}"
+    plot_sub_parc.title.align = "center"
+    div_parc = div_information(commun, """Le sous-onglet "Emplacement des parcs relais STAR" offre une visualisation de l'emplacement des parkings du reseau STAR dans la ville de Rennes. Il permet un accès en temps réel à des informations détaillées telles que la capacité actuelle du parking, sa disponibilité, le nombre de places disponibles pour les covoiturages, ainsi que la répartition des véhicules selon leur type (électriques ou non).""")
+    return Panneau(Column(plot_sub_parc , div_parc), [plot_sub_parc], [],
+                   {"parcs_relais": source_parc_relais}, plot_sub_parc.title)
+
+CONSTRUCTEURS = {
+    "presentation": panneau_presentation,
+    "stations": panneau_stations,
+    "reparation": panneau_reparation,
+    "bus_metro": panneau_bus_metro,
+    "trafic": panneau_trafic,
+    "accidents": panneau_accidents,
+    "parcs_relais": panneau_parcs_relais,
+}
+
+# Fonction pour construire un panneau à partir de ses entrées ; commun regroupe les modèles
+# partagés avec les autres panneaux du même document
+def construire_panneau(nom, entrees, commun=None):
+    return CONSTRUCTEURS[nom](entrees, commun or ModelesCommuns())
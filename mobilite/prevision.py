@@ -0,0 +1,180 @@
+# Prévision de la disponibilité des stations vélo et des parcs relais à 15-60 min, à partir des
+# agrégats par tranche de 15 min de l'historique (mobilite.historique).
+# Modèle par station, calculé pour toutes les stations à la fois : profil saisonnier (moyenne par
+# jour de la semaine et tranche de 15 min, heure de Paris), lissé vers le profil tous jours
+# confondus quand une case a peu de relevés, plus l'écart actuel au profil, qui s'amortit avec
+# l'horizon selon un coefficient AR(1) propre à chaque station :
+#     prévision(t + h) = profil(t + h) + phi ** (h / 15 min) * (valeur(t) - profil(t))
+# L'entraînement est incrémental (sommes et nombres par case) : seules les tranches closes depuis
+# le dernier entraînement sont relues, la prévision de toutes les stations est un seul calcul NumPy.
+import numpy as np
+import pandas as pd
+from mobilite.historique import MESURES
+
+# Tranche du profil (celle des agrégats les plus fins de l'historique) et nombre de tranches par semaine
+TRANCHE = 900
+TRANCHES_JOUR = 86400 // TRANCHE
+TRANCHES_SEMAINE = 7 * TRANCHES_JOUR
+FUSEAU = "Europe/Paris"
+# Horizons de prévision en minutes
+HORIZONS = (15, 30, 45, 60)
+# Poids (en nombre de relevés) du profil tous jours confondus dans chaque case du profil
+LISSAGE = 4.0
+# Bornes du coefficient d'amortissement de l'écart au profil
+PHI_MIN, PHI_MAX = 0.0, 0.99
+
+# Case de la semaine (jour de la semaine x tranche, heure locale) de chaque horodatage (secondes UTC),
+# conversion d'heure faite une fois par horodatage distinct
+def cases_semaine(horodatages):
+    codes, distincts = pd.factorize(np.asarray(horodatages, dtype=np.float64))
+    dates = pd.to_datetime(distincts, unit="s", utc=True).tz_convert(FUSEAU)
+    cases = (dates.dayofweek * TRANCHES_JOUR + (dates.hour * 3600 + dates.minute * 60) // TRANCHE).to_numpy(dtype=np.int64)
+    return cases[codes]
+
+class ModeleDisponibilite:
+    def __init__(self, lissage=LISSAGE):
+        self.lissage = lissage
+        self.cles = pd.Index([], dtype=object)
+        self.sommes = np.zeros((0, TRANCHES_SEMAINE))
+        self.nombres = np.zeros((0, TRANCHES_SEMAINE))
+        # Sommes pour l'AR(1) des écarts au profil : écart x écart précédent, écart précédent²,
+        # écart² et nombre d'écarts
+        self.covariances = np.zeros((4, 0))
+        # Dernier écart connu de chaque station et début de sa tranche (pour enchaîner les entraînements)
+        self.derniers = np.zeros((2, 0))
+        self._profil = None
+
+    # Indices des clés, en ajoutant les stations inconnues
+    def _indices(self, cles):
+        codes, cles = pd.factorize(np.asarray(cles, dtype=object))
+        cles = pd.Index(cles, dtype=object)
+        nouvelles = cles[self.cles.get_indexer(cles) < 0]
+        if len(nouvelles):
+            self.cles = self.cles.append(nouvelles)
+            ajout = len(nouvelles)
+            self.sommes = np.vstack([self.sommes, np.zeros((ajout, TRANCHES_SEMAINE))])
+            self.nombres = np.vstack([self.nombres, np.zeros((ajout, TRANCHES_SEMAINE))])
+            self.covariances = np.hstack([self.covariances, np.zeros((4, ajout))])
+            self.derniers = np.hstack([self.derniers, np.tile([[0.0], [-np.inf]], ajout)])
+        return self.cles.get_indexer(cles)[codes]
+
+    # Profil lissé (stations x cases) : (somme + LISSAGE x profil tous jours) / (nombre + LISSAGE),
+    # profil tous jours lui-même lissé vers la moyenne de la station ; NaN pour une station sans relevé
+    def profil(self):
+        if self._profil is None:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                moyennes = self.sommes.sum(axis=1) / self.nombres.sum(axis=1)
+                sommes_jour = self.sommes.reshape(len(self.cles), 7, TRANCHES_JOUR).sum(axis=1)
+                nombres_jour = self.nombres.reshape(len(self.cles), 7, TRANCHES_JOUR).sum(axis=1)
+                tous_jours = (sommes_jour + self.lissage * moyennes[:, None]) / (nombres_jour + self.lissage)
+                self._profil = (self.sommes + self.lissage * np.tile(tous_jours, 7)) / (self.nombres + self.lissage)
+        return self._profil
+
+    # Fonction pour entraîner le modèle sur des moyennes par tranche de 15 min : cles, debuts
+    # (secondes UTC), moyennes et nombres de relevés, une valeur par (clé, tranche). Peut être
+    # appelée à chaque nouvelle tranche close, les tranches doivent arriver dans l'ordre du temps.
+    def entrainer(self, cles, debuts, moyennes, nombres=None):
+        stations = self._indices(cles)
+        debuts = np.asarray(debuts, dtype=np.float64)
+        moyennes = np.asarray(moyennes, dtype=np.float64)
+        nombres = np.ones(len(moyennes)) if nombres is None else np.asarray(nombres, dtype=np.float64)
+        valides = ~np.isnan(moyennes)
+        stations, debuts, moyennes, nombres = stations[valides], debuts[valides], moyennes[valides], nombres[valides]
+        cases = stations * TRANCHES_SEMAINE + cases_semaine(debuts)
+        taille = self.sommes.size
+        self.sommes += np.bincount(cases, moyennes * nombres, minlength=taille).reshape(self.sommes.shape)
+        self.nombres += np.bincount(cases, nombres, minlength=taille).reshape(self.nombres.shape)
+        self._profil = None
+
+        # Écarts au profil mis à jour, enchaînés par station dans l'ordre du temps ; seules les
+        # paires de tranches consécutives comptent pour l'AR(1) (tri évité pour des lignes déjà
+        # rangées par clé puis début, comme les renvoie Historique.agregats)
+        ecarts = moyennes - self.profil().ravel()[cases]
+        suivants = np.diff(stations)
+        if (suivants < 0).any() or (np.diff(debuts)[suivants == 0] <= 0).any():
+            ordre = np.lexsort((debuts, stations))
+            stations, debuts, ecarts = stations[ordre], debuts[ordre], ecarts[ordre]
+        premiers = np.r_[True, stations[1:] != stations[:-1]] if len(stations) else np.zeros(0, dtype=bool)
+        precedents = np.r_[0.0, ecarts[:-1]] if len(ecarts) else ecarts
+        debuts_precedents = np.r_[-np.inf, debuts[:-1]] if len(debuts) else debuts
+        precedents[premiers] = self.derniers[0, stations[premiers]]
+        debuts_precedents[premiers] = self.derniers[1, stations[premiers]]
+        consecutifs = debuts - debuts_precedents == TRANCHE
+        taille = len(self.cles)
+        self.covariances += np.stack([
+            np.bincount(stations[consecutifs], ecarts[consecutifs] * precedents[consecutifs], minlength=taille),
+            np.bincount(stations[consecutifs], precedents[consecutifs] ** 2, minlength=taille),
+            np.bincount(stations, ecarts ** 2, minlength=taille),
+            np.bincount(stations, minlength=taille),
+        ])
+        derniers = np.r_[stations[1:] != stations[:-1], True] if len(stations) else np.zeros(0, dtype=bool)
+        self.derniers[0, stations[derniers]] = ecarts[derniers]
+        self.derniers[1, stations[derniers]] = debuts[derniers]
+
+    # Coefficient d'amortissement et écart-type de l'écart au profil, par station
+    def parametres(self):
+        produits, carres_precedents, carres, nombres = self.covariances
+        with np.errstate(invalid="ignore", divide="ignore"):
+            phi = np.clip(np.nan_to_num(produits / carres_precedents), PHI_MIN, PHI_MAX)
+            sigma = np.sqrt(carres / nombres)
+        return phi, sigma
+
+    # Fonction pour prévoir en un seul calcul la valeur de chaque station (cles, valeurs actuelles à
+    # horodatage) à chaque horizon (minutes), bornée à [0, capacites] si les capacités sont données.
+    # Renvoie (prévisions, écarts-types), tableaux stations x horizons ; NaN pour une station inconnue.
+    def prevoir(self, cles, valeurs, horodatage, horizons=HORIZONS, capacites=None):
+        stations = self.cles.get_indexer(pd.Index(cles, dtype=object))
+        connues = stations >= 0
+        stations = np.where(connues, stations, 0)
+        valeurs = np.asarray(valeurs, dtype=np.float64)
+        pas = np.asarray(horizons, dtype=np.float64) * 60 / TRANCHE
+        case = cases_semaine([horodatage])[0]
+        cases = (case + np.round(pas).astype(np.int64)) % TRANCHES_SEMAINE
+        profil = self.profil() if len(self.cles) else np.full((1, TRANCHES_SEMAINE), np.nan)
+        phi, sigma = self.parametres() if len(self.cles) else (np.zeros(1), np.full(1, np.nan))
+        phi, sigma = phi[stations, None], sigma[stations, None]
+        amortissement = phi ** pas[None, :]
+        previsions = profil[stations][:, cases] + amortissement * (valeurs - profil[stations, case])[:, None]
+        # Écart-type de l'erreur : sigma est celui de l'écart au profil, dont la part connue s'amortit en phi^pas
+        ecarts = sigma * np.sqrt(1 - amortissement ** 2)
+        if capacites is not None:
+            previsions = np.clip(previsions, 0, np.asarray(capacites, dtype=np.float64)[:, None])
+        else:
+            previsions = np.maximum(previsions, 0)
+        previsions[~connues] = np.nan
+        ecarts[~connues] = np.nan
+        return previsions, ecarts
+
+# Prévision de toutes les mesures d'un jeu de l'historique (stations, parcs_relais), entraînée
+# au fil des tranches closes
+class Prevision:
+    def __init__(self, jeu, mesures=None, lissage=LISSAGE):
+        self.jeu = jeu
+        self.mesures = list(mesures or MESURES[jeu][2])
+        self.modeles = {mesure: ModeleDisponibilite(lissage) for mesure in self.mesures}
+        # Début de la première tranche pas encore apprise
+        self.fin = -np.inf
+
+    # Apprend les tranches closes avant maintenant (secondes UTC) qui ne l'ont pas encore été
+    def actualiser(self, historique, maintenant):
+        fin = np.floor(maintenant / TRANCHE) * TRANCHE
+        if fin <= self.fin:
+            return
+        for mesure, modele in self.modeles.items():
+            agregats = historique.agregats(self.jeu, mesure, "15min", None if np.isinf(self.fin) else self.fin, fin)
+            modele.entrainer(agregats['cle'], agregats['debut'], agregats['moyenne'], agregats['nombre'])
+        self.fin = fin
+
+    # Colonnes de prévision pour les lignes de df (colonne clé du jeu et mesures) :
+    # "<mesure>_<h>min" -> valeurs, dans l'ordre des lignes
+    def colonnes(self, df, horodatage, horizons=HORIZONS):
+        cles = df[MESURES[self.jeu][0]].astype(str)
+        colonnes = {}
+        for mesure, modele in self.modeles.items():
+            if mesure not in df:
+                continue
+            valeurs = pd.to_numeric(df[mesure], errors="coerce").to_numpy(dtype=np.float64)
+            previsions, _ = modele.prevoir(cles, valeurs, horodatage, horizons)
+            for i, horizon in enumerate(horizons):
+                colonnes[f"{mesure}_{horizon}min"] = np.round(previsions[:, i], 1)
+        return colonnes
@@ -0,0 +1,190 @@
+# Instrumentation du tableau de bord : durée et pic de mémoire de chaque étape (import,
+# téléchargement par adresse, analyse par jeu de données, projection, figures, sérialisation).
+# Désactivée par défaut : etape() ne coûte alors qu'un appel de fonction. Activée par l'option
+# --profil [fichier.json] ou la variable d'environnement MOBILITE_PROFIL=fichier.json ; les étapes
+# sont écrites en JSON, en piles repliées (fichier.folded, lisible par flamegraph.pl ou speedscope)
+# et résumées sous forme d'arbre.
+# La mémoire est celle suivie par tracemalloc (allocations Python et tableaux numpy), ce qui
+# ralentit le programme : --profil-sans-memoire ne mesure que les durées.
+import argparse
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+try:
+    import resource
+except ImportError:
+    resource = None
+
+VARIABLE_ENVIRONNEMENT = "MOBILITE_PROFIL"
+FICHIER_PAR_DEFAUT = "profil.json"
+
+class Profil:
+    def __init__(self, memoire=True):
+        self.memoire = memoire
+        self.etapes = []
+        self._verrou = threading.Lock()
+        self._local = threading.local()
+        self._principale = self._pile()
+        self._sequence = None
+        if memoire and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.origine = time.perf_counter()
+
+    # Pile des étapes ouvertes par le fil d'exécution courant
+    def _pile(self):
+        if not hasattr(self._local, "pile"):
+            self._local.pile = []
+        return self._local.pile
+
+    # Mesure une étape, imbriquée dans l'étape ouverte du même fil. Un fil secondaire sans étape
+    # ouverte se place sous l'étape en cours du fil principal (chargements simultanés).
+    # Seul le fil principal remet à zéro le pic de tracemalloc, qui est commun à tout le processus :
+    # le pic d'une étape d'un fil secondaire est donc un majorant.
+    @contextmanager
+    def etape(self, nom):
+        pile = self._pile()
+        principal = pile is self._principale
+        parent = pile[-1] if pile else (self._principale[-1] if self._principale else None)
+        noeud = dict(chemin=(parent["chemin"] if parent else ()) + (nom,), fil=threading.current_thread().name,
+                     debut=time.perf_counter(), memoire=0, pic=0)
+        if self.memoire:
+            courant, pic = tracemalloc.get_traced_memory()
+            if principal:
+                if pile:
+                    pile[-1]["pic"] = max(pile[-1]["pic"], pic)
+                tracemalloc.reset_peak()
+            noeud["memoire"] = noeud["pic"] = courant
+        pile.append(noeud)
+        try:
+            yield
+        finally:
+            duree = time.perf_counter() - noeud["debut"]
+            pile.pop()
+            memoire_nette = 0
+            if self.memoire:
+                courant, pic = tracemalloc.get_traced_memory()
+                noeud["pic"] = max(noeud["pic"], pic)
+                memoire_nette = courant - noeud["memoire"]
+                if principal:
+                    if pile:
+                        pile[-1]["pic"] = max(pile[-1]["pic"], noeud["pic"])
+                    tracemalloc.reset_peak()
+            with self._verrou:
+                self.etapes.append(dict(pile=list(noeud["chemin"]), fil=noeud["fil"],
+                                        debut=noeud["debut"] - self.origine, duree=duree,
+                                        pic_memoire=noeud["pic"] if self.memoire else None,
+                                        memoire_nette=memoire_nette if self.memoire else None))
+
+    # Termine l'étape de premier niveau en cours et en commence une nouvelle (nom=None : aucune).
+    # Pratique pour découper un script en étapes successives sans indenter son code.
+    def marquer(self, nom=None):
+        if self._sequence is not None:
+            self._sequence.__exit__(None, None, None)
+            self._sequence = None
+        if nom is not None:
+            self._sequence = self.etape(nom)
+            self._sequence.__enter__()
+
+    # Résultats sérialisables : étapes dans l'ordre de leur début, durée totale, pic de RSS du processus
+    def resultats(self, requetes=()):
+        resultats = dict(duree_totale=time.perf_counter() - self.origine, memoire_suivie=self.memoire,
+                         etapes=sorted(self.etapes, key=lambda etape: etape["debut"]))
+        if resource is not None:
+            # ru_maxrss en kilo-octets sous Linux
+            resultats["rss_max"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        resultats["requetes"] = [dict(url=mesure.url, statut=mesure.statut, duree=mesure.duree,
+                                      tentatives=mesure.tentatives, erreur=mesure.erreur and str(mesure.erreur))
+                                 for mesure in requetes]
+        return resultats
+
+    # Étapes regroupées par pile : tuple des noms -> [appels, durée cumulée, pic mémoire]
+    def _cumuls(self):
+        cumuls = {}
+        for etape in self.etapes:
+            cumul = cumuls.setdefault(tuple(etape["pile"]), [0, 0.0, 0])
+            cumul[0] += 1
+            cumul[1] += etape["duree"]
+            cumul[2] = max(cumul[2], etape["pic_memoire"] or 0)
+        return cumuls
+
+    # Piles repliées (une ligne "a;b;c microsecondes" par chemin, temps propre hors sous-étapes)
+    def piles_repliees(self):
+        cumuls = self._cumuls()
+        propres = {chemin: cumul[1] for chemin, cumul in cumuls.items()}
+        for chemin, cumul in cumuls.items():
+            if chemin[:-1] in propres:
+                propres[chemin[:-1]] -= cumul[1]
+        return "\n".join(f"{';'.join(nom.replace(';', ',') for nom in chemin)} {max(0, round(duree * 1e6))}"
+                         for chemin, duree in propres.items())
+
+    # Résumé en arbre : une ligne par chemin, barre proportionnelle à la durée cumulée.
+    # Les étapes des fils secondaires se chevauchent, leur cumul peut dépasser la durée du parent.
+    def resume(self, largeur=30):
+        cumuls = self._cumuls()
+        total = sum(cumul[1] for chemin, cumul in cumuls.items() if len(chemin) == 1) or 1.0
+        lignes = [f"{'durée (ms)':>11} {'appels':>6} {'pic (Mo)':>9}  étape"]
+        premiers, enfants = {}, {}
+        for etape in self.etapes:
+            chemin = tuple(etape["pile"])
+            premiers[chemin] = min(premiers.get(chemin, etape["debut"]), etape["debut"])
+        for chemin in cumuls:
+            enfants.setdefault(chemin[:-1], []).append(chemin)
+
+        # Parcours en profondeur, sous-étapes dans l'ordre de leur premier début
+        def parcourir(parent):
+            for chemin in sorted(enfants.get(parent, ()), key=premiers.get):
+                yield chemin
+                yield from parcourir(chemin)
+
+        for chemin in parcourir(()):
+            appels, duree, pic = cumuls[chemin]
+            niveau = len(chemin) - 1
+            barre = "█" * max(1, round(largeur * min(duree / total, 1.0)))
+            memoire = f"{pic / 1e6:>9.1f}" if self.memoire else f"{'-':>9}"
+            lignes.append(f"{duree * 1000:>11.1f} {appels:>6} {memoire}  {'  ' * niveau}{chemin[-1]} {barre}")
+        return "\n".join(lignes)
+
+    # Écrit chemin (JSON) et chemin sans extension + .folded ; renvoie le résumé en arbre
+    def ecrire(self, chemin, requetes=()):
+        with open(chemin, "w", encoding="utf-8") as fichier:
+            json.dump(self.resultats(requetes), fichier, ensure_ascii=False, indent=1)
+        with open(os.path.splitext(chemin)[0] + ".folded", "w", encoding="utf-8") as fichier:
+            fichier.write(self.piles_repliees() + "\n")
+        return self.resume()
+
+_actif = None
+
+# Fonction pour activer l'instrumentation (remplace un profil déjà actif)
+def activer(memoire=True):
+    global _actif
+    _actif = Profil(memoire)
+    return _actif
+
+# Profil actif, ou None
+def actif():
+    return _actif
+
+# Étape mesurée si l'instrumentation est active, sans effet sinon
+def etape(nom):
+    return _actif.etape(nom) if _actif is not None else nullcontext()
+
+# Découpage d'un script en étapes successives (voir Profil.marquer), sans effet si inactif
+def marquer(nom=None):
+    if _actif is not None:
+        _actif.marquer(nom)
+
+# Options --profil [fichier.json] et --profil-sans-memoire (les autres arguments sont ignorés), à
+# défaut la variable d'environnement MOBILITE_PROFIL ("1" : fichier par défaut).
+# Renvoie (fichier ou None, mesure de la mémoire).
+def options(argv=None):
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--profil", nargs="?", const=FICHIER_PAR_DEFAUT, default=None)
+    parser.add_argument("--profil-sans-memoire", action="store_true")
+    args, _ = parser.parse_known_args(argv)
+    chemin = args.profil or os.environ.get(VARIABLE_ENVIRONNEMENT) or None
+    if chemin == "1":
+        chemin = FICHIER_PAR_DEFAUT
+    return chemin, not args.profil_sans_memoire
@@ -0,0 +1,186 @@
+# Recherche des plus proches stations (vélo STAR, parcs relais) satisfaisant une condition de
+# disponibilité : « les 3 stations les plus proches avec au moins 2 vélos », « le parc relais le
+# plus proche avec une place PMR libre ».
+# Jusqu'à PARCOURS_COMPLET_MAX points (les stations de Rennes), une requête parcourt tous les
+# points d'un coup en NumPy : distances, filtre, tri partiel. C'est plus rapide que l'arbre, dont
+# la descente est faite en Python.
+# Au-delà, arbre k-d équilibré sur les coordonnées Web Mercator, rangé en tas (noeud i -> enfants
+# 2i+1 et 2i+2, feuilles toutes au même niveau) : les positions ne changent pas d'un relevé à
+# l'autre, seuls les compteurs changent. Chaque noeud garde le maximum de chaque compteur de son
+# sous-arbre, ce qui écarte sans les parcourir les sous-arbres où aucune station ne satisfait la
+# condition ; une mise à jour des compteurs ne recalcule que ces maximums (quelques opérations
+# NumPy, sans reconstruire l'arbre).
+# Les distances sont en mètres Web Mercator (à Rennes, environ 1,5 fois la distance au sol),
+# l'ordre des stations est le même qu'avec la distance au sol à l'échelle d'une ville.
+import heapq
+import numpy as np
+from mobilite.extraction import coor_wgs84_to_web_mercator
+
+# Nombre de points visé par feuille
+TAILLE_FEUILLE = 64
+# Nombre de points jusqu'auquel les requêtes parcourent tous les points au lieu de l'arbre
+# (bench_proximite : le parcours complet est 1,5 à 2,5 fois plus rapide à 1 100 stations, l'arbre
+# 2 fois plus rapide à 11 000 sans condition et au-delà de 10 fois à 110 000)
+PARCOURS_COMPLET_MAX = 8192
+# Compteurs utilisés comme conditions de disponibilité, par jeu de données
+COMPTEURS_STATIONS = ['nbre_de_velo_disponible', 'nbre_emplacement_vide']
+COMPTEURS_PARCS_RELAIS = ['place_dispo_voit_perso', 'place_dispo_voit_elec', 'place_dispo_PMR', 'place_dispo_covoit']
+
+class IndexProximite:
+    # x, y : coordonnées des points ; compteurs : nom -> valeurs (une par point, dans le même ordre)
+    def __init__(self, x, y, compteurs=None, taille_feuille=TAILLE_FEUILLE, parcours_complet_max=PARCOURS_COMPLET_MAX):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        n = len(x)
+        self.parcours_complet = n <= parcours_complet_max
+        self.profondeur = int(np.ceil(np.log2(n / taille_feuille))) if n > taille_feuille else 0
+        self.premiere_feuille = (1 << self.profondeur) - 1
+
+        # Découpage niveau par niveau à la médiane de l'axe le plus étendu ; chaque noeud couvre
+        # un intervalle contigu de l'ordre final, les deux moitiés ne diffèrent que d'un point
+        self.ordre = np.arange(n)
+        bornes = np.array([0, n])
+        for _ in range(self.profondeur):
+            nouvelles = [0]
+            for debut, fin in zip(bornes[:-1], bornes[1:]):
+                milieu = (debut + fin) // 2
+                indices = self.ordre[debut:fin]
+                axe = x if np.ptp(x[indices]) >= np.ptp(y[indices]) else y
+                self.ordre[debut:fin] = indices[np.argpartition(axe[indices], milieu - debut)]
+                nouvelles += [milieu, fin]
+            bornes = np.array(nouvelles)
+        self.bornes = bornes.tolist()
+        self.x = x[self.ordre]
+        self.y = y[self.ordre]
+
+        # Boîte englobante de chaque noeud : feuilles par reduceat, puis niveaux supérieurs par paires
+        boites = self._par_niveau([(np.minimum, self.x), (np.minimum, self.y), (np.maximum, self.x), (np.maximum, self.y)])
+        self.boites = boites.T.tolist()
+        self.compteurs = {}
+        self.maximums = {}
+        self.mettre_a_jour(compteurs or {})
+
+    # Fonction pour construire un index à partir d'un DataFrame (colonnes 'x', 'y' et compteurs)
+    @classmethod
+    def depuis_dataframe(cls, df, compteurs=(), taille_feuille=TAILLE_FEUILLE):
+        return cls(df['x'].to_numpy(), df['y'].to_numpy(),
+                   {nom: df[nom].to_numpy() for nom in compteurs}, taille_feuille)
+
+    def __len__(self):
+        return len(self.ordre)
+
+    # Valeur de chaque noeud (tableau (colonnes, noeuds)) : operation.reduceat sur les feuilles,
+    # puis même operation sur les paires d'enfants en remontant jusqu'à la racine
+    def _par_niveau(self, colonnes):
+        n = len(self.ordre)
+        niveau = np.stack([operation.reduceat(valeurs, self.bornes[:-1]) if n else np.zeros(1)
+                           for operation, valeurs in colonnes])
+        niveaux = [niveau]
+        while niveau.shape[1] > 1:
+            paires = niveau.reshape(len(colonnes), -1, 2)
+            niveau = np.stack([operation(paires[c, :, 0], paires[c, :, 1]) for c, (operation, _) in enumerate(colonnes)])
+            niveaux.append(niveau)
+        return np.concatenate(niveaux[::-1], axis=1)
+
+    # Remplace les compteurs (nom -> valeurs dans l'ordre d'origine des points) et recalcule les
+    # maximums des noeuds ; les compteurs non donnés sont conservés
+    def mettre_a_jour(self, compteurs):
+        for nom, valeurs in compteurs.items():
+            valeurs = np.asarray(valeurs, dtype=np.float64)
+            if len(valeurs) != len(self):
+                raise ValueError(f"{nom} : {len(valeurs)} valeurs pour {len(self)} points")
+            # Valeur manquante : la station n'est jamais retenue pour ce compteur
+            self.compteurs[nom] = np.nan_to_num(valeurs[self.ordre], nan=-np.inf)
+        if self.compteurs:
+            maximums = self._par_niveau([(np.maximum, valeurs) for valeurs in self.compteurs.values()])
+            self.maximums = dict(zip(self.compteurs, maximums.tolist()))
+
+    # Fonction pour trouver les nombre points les plus proches de (x, y) dont chaque compteur
+    # atteint son minimum (minimums : nom -> valeur), à moins de distance_max.
+    # Renvoie (indices dans l'ordre d'origine, distances), du plus proche au plus éloigné.
+    def plus_proches(self, x, y, nombre=1, minimums=None, distance_max=np.inf):
+        conditions = [(self.maximums[nom], self.compteurs[nom], minimum) for nom, minimum in (minimums or {}).items()]
+        if not len(self) or nombre < 1:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        limite = distance_max ** 2
+        if self.parcours_complet:
+            return self._parcours_complet(x, y, nombre, conditions, limite)
+        # Meilleurs candidats trouvés : tas de (-distance², position) limité à nombre éléments
+        meilleurs = []
+        a_visiter = [(0.0, 0)]
+        while a_visiter:
+            distance, noeud = heapq.heappop(a_visiter)
+            if distance > limite:
+                break
+            if noeud >= self.premiere_feuille:
+                feuille = noeud - self.premiere_feuille
+                debut, fin = self.bornes[feuille], self.bornes[feuille + 1]
+                distances = (self.x[debut:fin] - x) ** 2 + (self.y[debut:fin] - y) ** 2
+                retenus = distances <= limite
+                for _, compteur, minimum in conditions:
+                    retenus &= compteur[debut:fin] >= minimum
+                positions = np.flatnonzero(retenus)
+                if len(positions) > nombre:
+                    # Seuls les nombre meilleurs points de la feuille peuvent entrer dans le tas
+                    positions = positions[np.argpartition(distances[positions], nombre - 1)[:nombre]]
+                for position, distance_point in zip(positions.tolist(), distances[positions].tolist()):
+                    candidat = (-distance_point, debut + position)
+                    if len(meilleurs) < nombre:
+                        heapq.heappush(meilleurs, candidat)
+                    elif candidat > meilleurs[0]:
+                        heapq.heapreplace(meilleurs, candidat)
+                if len(meilleurs) == nombre:
+                    limite = -meilleurs[0][0]
+                continue
+            for enfant in (2 * noeud + 1, 2 * noeud + 2):
+                if any(maximums[enfant] < minimum for maximums, _, minimum in conditions):
+                    continue
+                xmin, ymin, xmax, ymax = self.boites[enfant]
+                dx = xmin - x if x < xmin else (x - xmax if x > xmax else 0.0)
+                dy = ymin - y if y < ymin else (y - ymax if y > ymax else 0.0)
+                distance = dx * dx + dy * dy
+                if distance <= limite:
+                    heapq.heappush(a_visiter, (distance, enfant))
+        meilleurs.sort(reverse=True)
+        positions = [position for _, position in meilleurs]
+        return self.ordre[positions], np.sqrt([-distance for distance, _ in meilleurs])
+
+    # Recherche par parcours de tous les points (dans l'ordre de l'arbre, les compteurs y sont rangés)
+    def _parcours_complet(self, x, y, nombre, conditions, limite):
+        distances = (self.x - x) ** 2 + (self.y - y) ** 2
+        retenus = distances <= limite if limite < np.inf else np.ones(len(distances), dtype=bool)
+        for _, compteur, minimum in conditions:
+            retenus &= compteur >= minimum
+        positions = np.flatnonzero(retenus)
+        if len(positions) > nombre:
+            positions = positions[np.argpartition(distances[positions], nombre - 1)[:nombre]]
+        positions = positions[np.argsort(distances[positions], kind="stable")]
+        return self.ordre[positions], np.sqrt(distances[positions])
+
+    # Même recherche à partir de coordonnées WGS84
+    def plus_proches_lonlat(self, lon, lat, nombre=1, minimums=None, distance_max=np.inf):
+        x, y = coor_wgs84_to_web_mercator(lon, lat)
+        return self.plus_proches(float(x), float(y), nombre, minimums, distance_max)
+
+# Index des stations Vélo STAR (DataFrame de analyse_station_velo)
+def index_stations_velo(df):
+    return IndexProximite.depuis_dataframe(df, COMPTEURS_STATIONS)
+
+# Index des parcs relais (DataFrame de analyse_data_reparation_velo_parc_relais). Un parc fermé
+# est indexé avec des compteurs à zéro : il n'est retenu par aucune condition de place libre.
+def index_parcs_relais(df):
+    ouverts = (df['etat'].str.upper() == "OUVERT").to_numpy()
+    index = IndexProximite.depuis_dataframe(df)
+    index.mettre_a_jour({nom: np.where(ouverts, df[nom].to_numpy(dtype=np.float64), 0) for nom in COMPTEURS_PARCS_RELAIS})
+    return index
+
+# Stations vélo les plus proches avec au moins velos vélos et places emplacements libres :
+# DataFrame des stations retenues, avec leur distance, de la plus proche à la plus éloignée
+def stations_proches(index, df, x, y, nombre=3, velos=0, places=0):
+    minimums = {}
+    if velos:
+        minimums['nbre_de_velo_disponible'] = velos
+    if places:
+        minimums['nbre_emplacement_vide'] = places
+    indices, distances = index.plus_proches(x, y, nombre, minimums)
+    return df.iloc[indices].assign(distance=distances)
@@ -0,0 +1,130 @@
+# Rattrapage de l'historique du trafic à partir d'archives JSON : ancien format de l'API
+# (enveloppe datasetid / recordid / fields, comme etat-du-trafic.json) ou format v2.1
+# (enregistrements à plat, liste ou page {"results": [...]}), fichiers .json ou .json.gz,
+# seuls ou rangés dans des dossiers. Les fichiers sont lus (avec orjson s'il est installé) et
+# normalisés en parallèle par un pool de processus ; le processus principal charge les relevés par
+# lots dans l'historique SQLite, où un relevé déjà présent (même tronçon, même date) est ignoré.
+# Le recordid de l'ancien format est volontairement laissé de côté : le doublon est écarté par la
+# clé primaire (tronçon, horodatage) avec INSERT OR IGNORE. Le format v2.1 n'a pas de recordid :
+# seul (tronçon, date) identifie un relevé dans les deux formats, sans table d'identifiants à
+# tenir ni à relire à chaque lot.
+# Usage : python -m mobilite.rattrapage etat-du-trafic.json archives/ [--processus 4] [--historique .cache/historique.sqlite]
+import argparse
+import gzip
+import json
+import os
+import time
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from mobilite.extraction import extraire_colonnes
+from mobilite.historique import FICHIER_PAR_DEFAUT, Historique
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Schéma commun des relevés de trafic, quelle que soit l'enveloppe d'origine
+COLONNES = ['troncon', 'horodatage', 'denomination', 'averagevehiclespeed', 'traveltime',
+            'traveltimereliability', 'vitesse_maxi', 'trafficstatus', 'insee']
+# Champs lus dans chaque enregistrement, colonne -> nom du champ
+CHAMPS = {
+    'troncon': "predefinedlocationreference",
+    'date': "datetime",
+    'denomination': "denomination",
+    'averagevehiclespeed': "averagevehiclespeed",
+    'traveltime': "traveltime",
+    'traveltimereliability': "traveltimereliability",
+    'vitesse_maxi': "vitesse_maxi",
+    'trafficstatus': "trafficstatus",
+    'insee': "insee",
+}
+NUMERIQUES = ['averagevehiclespeed', 'traveltime', 'traveltimereliability', 'vitesse_maxi']
+
+# Nombre de relevés chargés par transaction
+TAILLE_LOT = 200_000
+
+# Fichiers JSON désignés par chemins (les dossiers sont parcourus récursivement), dans l'ordre
+def lister_fichiers(chemins):
+    fichiers = []
+    for chemin in chemins:
+        if os.path.isdir(chemin):
+            for dossier, _, noms in sorted(os.walk(chemin)):
+                fichiers += [os.path.join(dossier, nom) for nom in sorted(noms) if nom.endswith((".json", ".json.gz"))]
+        else:
+            fichiers.append(chemin)
+    return fichiers
+
+# Enregistrements d'un fichier : liste, page de l'API v2.1 ({"results": [...]}) ou
+# export v1 ({"records": [...]})
+def lire_enregistrements(chemin):
+    ouvrir = gzip.open if chemin.endswith(".gz") else open
+    with ouvrir(chemin, "rb") as fichier:
+        octets = fichier.read()
+    contenu = orjson.loads(octets) if orjson is not None else json.loads(octets)
+    if isinstance(contenu, dict):
+        contenu = contenu.get("results", contenu.get("records", []))
+    return contenu
+
+# Fonction pour ramener des enregistrements des deux formats au schéma COLONNES
+# (champs absents -> valeurs manquantes, dates ISO 8601 -> secondes depuis l'époque). Les
+# enregistrements d'une archive partagent quelques dates : chacune n'est convertie qu'une fois.
+def normaliser(enregistrements):
+    champs = [e.get("fields", e) for e in enregistrements]
+    colonnes = extraire_colonnes(champs, CHAMPS, defauts=dict.fromkeys(CHAMPS))
+    codes, distinctes = pd.factorize(pd.Series(colonnes.pop('date'), dtype=object))
+    dates = pd.to_datetime(pd.Series(distinctes, dtype=object), format="ISO8601", utc=True, errors="coerce")
+    secondes = dates.dt.as_unit("ms").astype("int64").astype(np.float64).where(dates.notna()).to_numpy() / 1000
+    colonnes['horodatage'] = np.append(secondes, np.nan)[codes]
+    df = DataFrame(colonnes, columns=COLONNES)
+    for nom in NUMERIQUES:
+        df[nom] = pd.to_numeric(df[nom], errors="coerce")
+    return df[df['troncon'].notna() & df['horodatage'].notna()]
+
+# Tâche d'un processus du pool : (chemin, nombre d'enregistrements lus, relevés normalisés)
+def traiter_fichier(chemin):
+    enregistrements = lire_enregistrements(chemin)
+    return chemin, len(enregistrements), normaliser(enregistrements)
+
+# Fonction pour charger des archives dans l'historique. Renvoie un dictionnaire de mesures :
+# fichiers, enregistrements lus, relevés normalisés, relevés ajoutés, durée et débit.
+def rattraper(chemins, historique, processus=None, taille_lot=TAILLE_LOT):
+    fichiers = lister_fichiers(chemins)
+    processus = max(1, min(processus or os.cpu_count() or 1, len(fichiers)))
+    mesures = dict(fichiers=len(fichiers), lus=0, normalises=0, ajoutes=0)
+    debut = time.perf_counter()
+    en_attente = []
+
+    def charger():
+        if en_attente:
+            mesures['ajoutes'] += historique.ajouter_lot("trafic", pd.concat(en_attente, ignore_index=True))
+            en_attente.clear()
+
+    with Pool(processus) as pool:
+        for _, lus, df in pool.imap_unordered(traiter_fichier, fichiers):
+            mesures['lus'] += lus
+            mesures['normalises'] += len(df)
+            en_attente.append(df)
+            if sum(len(lot) for lot in en_attente) >= taille_lot:
+                charger()
+        charger()
+    mesures['duree'] = time.perf_counter() - debut
+    mesures['debit'] = mesures['lus'] / mesures['duree'] if mesures['duree'] else 0.0
+    return mesures
+
+def main():
+    parser = argparse.ArgumentParser(description="Rattrapage de l'historique du trafic à partir d'archives JSON")
+    parser.add_argument("chemins", nargs="+", help="fichiers .json / .json.gz ou dossiers")
+    parser.add_argument("--historique", default=FICHIER_PAR_DEFAUT, help="base SQLite de l'historique des relevés")
+    parser.add_argument("--processus", type=int, default=None, help="taille du pool (nombre de processeurs par défaut)")
+    parser.add_argument("--lot", type=int, default=TAILLE_LOT, help="relevés chargés par transaction")
+    args = parser.parse_args()
+    with Historique(args.historique) as historique:
+        mesures = rattraper(args.chemins, historique, args.processus, args.lot)
+    print(f"{mesures['fichiers']} fichiers, {mesures['lus']} enregistrements lus, {mesures['normalises']} relevés, "
+          f"{mesures['ajoutes']} relevés ajoutés en {mesures['duree']:.1f} s ({mesures['debit']:.0f} enregistrements/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Moteur de rendu des cartes : WebGL par défaut (tous les points d'un glyphe en un seul appel de
+# dessin, sans recalcul des chemins canvas à chaque déplacement), canvas sur demande.
+# Une figure n'est passée en WebGL que si au moins un de ses glyphes a un équivalent WebGL dans
+# BokehJS (marqueurs scatter, cercles, lignes, multi_line, barres...) ; les autres glyphes
+# (étiquettes de texte par exemple) restent dessinés sur canvas dans la même figure. Dans le
+# navigateur, BokehJS revient de lui-même au canvas si WebGL est indisponible : le seuil de niveau
+# de détail est alors abaissé pour que les déplacements restent fluides (sous-échantillonnage des
+# glyphes pendant l'interaction, sans effet en WebGL).
+# Choix du moteur : option --rendu webgl|canvas, à défaut la variable MOBILITE_RENDU.
+import argparse
+import os
+from bokeh.models import GlyphRenderer
+
+VARIABLE_ENVIRONNEMENT = "MOBILITE_RENDU"
+MODES = ("webgl", "canvas")
+MODE_PAR_DEFAUT = "webgl"
+# Glyphes dessinés par le moteur WebGL de BokehJS 3
+GLYPHES_WEBGL = {"AnnularWedge", "Annulus", "Block", "Circle", "HBar", "HexTile", "Image", "ImageRGBA",
+                 "ImageStack", "Line", "MultiLine", "Ngon", "Quad", "Rect", "Scatter", "Step", "VBar", "Wedge"}
+# Nombre d'éléments au-delà duquel un glyphe canvas est sous-échantillonné pendant un déplacement
+# (BokehJS : 2000 par défaut)
+SEUIL_NIVEAU_DETAIL = 500
+
+# Mode de rendu demandé : option --rendu (les autres arguments sont ignorés), variable d'environnement,
+# sinon WebGL
+def options(argv=None):
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--rendu", choices=MODES, default=None)
+    args, _ = parser.parse_known_args(argv)
+    mode = args.rendu or os.environ.get(VARIABLE_ENVIRONNEMENT) or MODE_PAR_DEFAUT
+    if mode not in MODES:
+        raise ValueError(f"Mode de rendu inconnu : {mode} (attendu : {', '.join(MODES)})")
+    return mode
+
+# Vrai si le glyphe a un équivalent WebGL (un Scatter à marqueurs personnalisés n'en a pas)
+def glyphe_webgl(glyphe):
+    return type(glyphe).__name__ in GLYPHES_WEBGL and not getattr(glyphe, "defs", None)
+
+# Nombre d'éléments dessinés par un GlyphRenderer avec les données présentes : sommets pour un
+# multi_line, lignes de la source sinon
+def elements(renderer):
+    donnees = renderer.data_source.data
+    glyphe = renderer.glyph
+    if type(glyphe).__name__ == "MultiLine" and isinstance(glyphe.xs, str) and glyphe.xs in donnees:
+        return int(sum(len(ligne) for ligne in donnees[glyphe.xs]))
+    return len(next(iter(donnees.values()), ()))
+
+# Fonction pour appliquer le mode de rendu aux figures (cartes) : WebGL pour celles qui ont au moins
+# un glyphe compatible, canvas sinon ; seuil de niveau de détail abaissé dans tous les cas.
+# Renvoie la liste des figures passées en WebGL.
+def appliquer_rendu(figures, mode=MODE_PAR_DEFAUT):
+    webgl = []
+    for plot in figures:
+        plot.lod_threshold = SEUIL_NIVEAU_DETAIL
+        compatibles = mode == "webgl" and any(glyphe_webgl(r.glyph) for r in plot.renderers if isinstance(r, GlyphRenderer))
+        plot.output_backend = "webgl" if compatibles else "canvas"
+        if compatibles:
+            webgl.append(plot)
+    return webgl
+
+# Glyphes des figures : liste de (titre de la figure, type de glyphe, éléments, moteur)
+def glyphes_rendus(figures):
+    glyphes = []
+    for plot in figures:
+        titre = (plot.title.text if plot.title is not None else "") or plot.id
+        for renderer in plot.renderers:
+            if isinstance(renderer, GlyphRenderer):
+                moteur = "webgl" if plot.output_backend == "webgl" and glyphe_webgl(renderer.glyph) else "canvas"
+                glyphes.append((titre, type(renderer.glyph).__name__, elements(renderer), moteur))
+    return glyphes
+
+# Totaux par moteur, moteur -> (glyphes, éléments, appels de dessin). Un glyphe WebGL coûte un appel
+# de dessin quel que soit son nombre d'éléments, un glyphe canvas un tracé par élément.
+def totaux_rendu(figures):
+    totaux = {moteur: [0, 0] for moteur in MODES}
+    for _, _, nombre, moteur in glyphes_rendus(figures):
+        totaux[moteur][0] += 1
+        totaux[moteur][1] += nombre
+    return {moteur: (glyphes, nombre, glyphes if moteur == "webgl" else nombre) for moteur, (glyphes, nombre) in totaux.items()}
+
+# Rapport texte : une ligne par glyphe puis les totaux par moteur
+def rapport_rendu(figures):
+    lignes = [f"{'figure':<28} {'glyphe':<10} {'éléments':>9} {'moteur':>7}"]
+    for titre, glyphe, nombre, moteur in glyphes_rendus(figures):
+        lignes.append(f"{titre[:28]:<28} {glyphe:<10} {nombre:>9} {moteur:>7}")
+    for moteur, (glyphes, nombre, appels) in totaux_rendu(figures).items():
+        lignes.append(f"total {moteur:<22} {glyphes:>10} {nombre:>9} {appels:>7} appels de dessin")
+    return "\n".join(lignes)
@@ -0,0 +1,282 @@
+# Réseau des aménagements cyclables : graphe compact (tableaux CSR) construit à partir des
+# LignesMultiples projetées, recherche d'itinéraires (Dijkstra, A*), isochrones et distances entre
+# toutes les paires de stations, d'où la part des autres stations joignables par un itinéraire
+# cyclable (« couverture » d'une station).
+# Les sommets sont accrochés sur une grille de TOLERANCE mètres : un noeud est une extrémité de
+# partie ou un sommet partagé par plusieurs parties (croisement). Les arêtes sont les morceaux de
+# partie entre deux noeuds, de coût longueur au sol x coefficient du type d'aménagement.
+# Le réseau étant discontinu (une bande s'arrête avant un carrefour), chaque extrémité libre est
+# reliée aux noeuds proches (LIAISON_MAX), et chaque station au noeud le plus proche (ACCES_MAX),
+# au coefficient COEFFICIENT_HORS_PISTE.
+import heapq
+import numpy as np
+from mobilite.extraction import RAYON_TERRE
+from mobilite.geometrie import LignesMultiples
+from mobilite.proximite import IndexProximite
+
+# Coefficient de coût par type d'aménagement (1 : site propre)
+COEFFICIENTS = {
+    'Piste bidirectionnelle': 1.0,
+    'Piste unidirectionnelle': 1.0,
+    'Voie verte': 1.0,
+    'Bande cyclable': 1.2,
+    'Mixte bus-vélo': 1.3,
+    'Mixte piétons-cycles': 1.3,
+    'Chaucidou': 1.5,
+    'Route partagée': 1.5,
+}
+COEFFICIENT_PAR_DEFAUT = 1.5
+# Trajet hors aménagement (liaison entre deux aménagements, accès à une station)
+COEFFICIENT_HORS_PISTE = 2.0
+# Distances en mètres au sol
+TOLERANCE = 2.0
+LIAISON_MAX = 30.0
+ACCES_MAX = 300.0
+# Une paire de stations est couverte si le coût de l'itinéraire ne dépasse pas DETOUR_MAX fois
+# la distance à vol d'oiseau
+DETOUR_MAX = 2.0
+
+# Facteur d'échelle Web Mercator -> mètres au sol à l'ordonnée y (1 / cosh(y / R) = cos(latitude))
+def echelle_sol(y):
+    return 1.0 / np.cosh(np.asarray(y) / RAYON_TERRE)
+
+# Distance au sol entre deux points Web Mercator (échelle prise au milieu)
+def distance_sol(x0, y0, x1, y1):
+    return np.hypot(np.subtract(x1, x0), np.subtract(y1, y0)) * echelle_sol((np.add(y0, y1)) / 2)
+
+class ReseauCyclable:
+    # lignes : LignesMultiples projetées ; types : type d'aménagement de chaque entité de lignes
+    def __init__(self, lignes, types, tolerance=TOLERANCE, liaison_max=LIAISON_MAX):
+        x, y = lignes.sommets
+        fins_parties = lignes.decalages[1:] - 1
+        extremites = np.zeros(lignes.nb_sommets, dtype=bool)
+        extremites[lignes.decalages[:-1]] = True
+        extremites[fins_parties] = True
+
+        # Accrochage des sommets sur la grille, puis noeuds : extrémités et sommets partagés
+        pas = tolerance / echelle_sol(np.median(y)) if lignes.nb_sommets else 1.0
+        grille = np.stack([np.round(x / pas), np.round(y / pas)], axis=1)
+        _, cles = np.unique(grille, axis=0, return_inverse=True)
+        cles = cles.ravel()
+        noeud = extremites | (np.bincount(cles)[cles] >= 2)
+        cles_noeuds, premiers = np.unique(cles[noeud], return_index=True)
+        self.x = x[noeud][premiers]
+        self.y = y[noeud][premiers]
+        numero = np.full(len(cles), -1, dtype=np.int64)
+        numero[noeud] = np.searchsorted(cles_noeuds, cles[noeud])
+
+        # Segments (sommet i -> i + 1 de la même partie) et arêtes : chaque noeud qui n'est pas la fin
+        # de sa partie commence une arête qui court jusqu'au noeud suivant
+        segments = np.ones(lignes.nb_sommets, dtype=bool)
+        segments[fins_parties] = False
+        segments = np.flatnonzero(segments)
+        debut_arete = noeud.copy()
+        debut_arete[fins_parties] = False
+        arete_segment = np.cumsum(debut_arete)[segments] - 1
+        longueurs_segments = distance_sol(x[segments], y[segments], x[segments + 1], y[segments + 1])
+        nb_aretes = int(debut_arete.sum())
+        longueurs = np.bincount(arete_segment, longueurs_segments, minlength=nb_aretes)
+        derniers = np.r_[np.flatnonzero(np.diff(arete_segment)), len(segments) - 1] if len(segments) else segments
+        origines = numero[debut_arete]
+        destinations = numero[segments[derniers] + 1]
+        parties = np.searchsorted(lignes.decalages, np.flatnonzero(debut_arete), side="right") - 1
+        types_entites = np.asarray(types, dtype=object)
+        coefficients = np.array([COEFFICIENTS.get(t, COEFFICIENT_PAR_DEFAUT) for t in types_entites], dtype=np.float64)
+        couts = longueurs * coefficients[lignes.entites[parties]] if len(parties) else longueurs
+        gardees = origines != destinations
+
+        self.index = IndexProximite(self.x, self.y)
+        liaisons = self._liaisons(origines[gardees], destinations[gardees], liaison_max)
+        self._construire_csr(np.concatenate([origines[gardees], liaisons[0]]),
+                             np.concatenate([destinations[gardees], liaisons[1]]),
+                             np.concatenate([couts[gardees], liaisons[2] * COEFFICIENT_HORS_PISTE]),
+                             np.concatenate([longueurs[gardees], liaisons[2]]))
+        # Minorant du coût par mètre Web Mercator à vol d'oiseau, pour l'heuristique d'A*
+        self._minorant = (min(COEFFICIENTS.values()) * float(echelle_sol(np.abs(self.y).max()))) if len(self.x) else 0.0
+        self._cache_stations = {}
+
+    # Fonction pour construire le réseau à partir du DataFrame des aménagements
+    # (analyse_data_reparation_velo_pistes_cyclables : une ligne par partie)
+    @classmethod
+    def depuis_dataframe(cls, df, tolerance=TOLERANCE, liaison_max=LIAISON_MAX):
+        return cls(LignesMultiples.depuis_dataframe(df), df['type_amenagement'].to_numpy(), tolerance, liaison_max)
+
+    def __len__(self):
+        return len(self.x)
+
+    # Liaisons hors aménagement : chaque noeud de degré 1 vers les noeuds à moins de liaison_max
+    # mètres qui ne lui sont pas déjà reliés. Renvoie (origines, destinations, longueurs).
+    def _liaisons(self, origines, destinations, liaison_max):
+        degres = np.bincount(np.concatenate([origines, destinations]), minlength=len(self))
+        voisins = set(zip(origines.tolist(), destinations.tolist()))
+        liaisons = []
+        if liaison_max > 0:
+            for libre in np.flatnonzero(degres == 1).tolist():
+                rayon = liaison_max / float(echelle_sol(self.y[libre]))
+                proches, distances = self.index.plus_proches(self.x[libre], self.y[libre], 4, distance_max=rayon)
+                for proche, distance in zip(proches.tolist(), distances.tolist()):
+                    if proche != libre and (libre, proche) not in voisins and (proche, libre) not in voisins:
+                        voisins.add((libre, proche))
+                        liaisons.append((libre, proche, distance * float(echelle_sol(self.y[libre]))))
+        if not liaisons:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        origines, destinations, longueurs = zip(*liaisons)
+        return np.array(origines), np.array(destinations), np.array(longueurs)
+
+    # Arêtes non orientées -> CSR (deux arcs par arête, triés par origine). Le sens de circulation
+    # des pistes unidirectionnelles n'est pas connu, toutes les arêtes sont à double sens.
+    def _construire_csr(self, origines, destinations, couts, longueurs):
+        depuis = np.concatenate([origines, destinations])
+        vers = np.concatenate([destinations, origines])
+        ordre = np.argsort(depuis, kind="stable")
+        self.decalages = np.searchsorted(depuis[ordre], np.arange(len(self) + 1))
+        self.voisins = vers[ordre]
+        self.couts = np.concatenate([couts, couts])[ordre]
+        self.longueurs = np.concatenate([longueurs, longueurs])[ordre]
+        # Listes Python pour les parcours (accès élément par élément bien plus rapide qu'en NumPy)
+        self._listes = (self.decalages.tolist(), self.voisins.tolist(), self.couts.tolist())
+        self.composantes = self._composantes()
+
+    # Numéro de composante connexe de chaque noeud (parcours en largeur) : deux noeuds de
+    # composantes différentes ne sont reliés par aucun itinéraire, inutile de les chercher
+    def _composantes(self):
+        decalages, voisins, _ = self._listes
+        composantes = [-1] * len(self)
+        numero = 0
+        for depart in range(len(self)):
+            if composantes[depart] >= 0:
+                continue
+            composantes[depart] = numero
+            a_visiter = [depart]
+            while a_visiter:
+                noeud = a_visiter.pop()
+                for voisin in voisins[decalages[noeud]:decalages[noeud + 1]]:
+                    if composantes[voisin] < 0:
+                        composantes[voisin] = numero
+                        a_visiter.append(voisin)
+            numero += 1
+        return np.array(composantes, dtype=np.int64)
+
+    @property
+    def nb_aretes(self):
+        return len(self.voisins) // 2
+
+    # Noeud le plus proche de chaque point et coût d'accès (COEFFICIENT_HORS_PISTE x distance au sol) ;
+    # noeud -1 et coût infini au-delà de acces_max mètres
+    def rattacher(self, x, y, acces_max=ACCES_MAX):
+        noeuds = np.full(len(x), -1, dtype=np.int64)
+        couts = np.full(len(x), np.inf)
+        for i, (px, py) in enumerate(zip(np.asarray(x, dtype=np.float64).tolist(), np.asarray(y, dtype=np.float64).tolist())):
+            echelle = float(echelle_sol(py))
+            proches, distances = self.index.plus_proches(px, py, 1, distance_max=acces_max / echelle)
+            if len(proches):
+                noeuds[i] = proches[0]
+                couts[i] = distances[0] * echelle * COEFFICIENT_HORS_PISTE
+        return noeuds, couts
+
+    # Parcours de Dijkstra (ou A* si cible_xy est donné) depuis departs (noeud -> coût initial).
+    # S'arrête au-delà de limite, ou dès que tous les noeuds de cibles sont atteints.
+    # Renvoie (coût de chaque noeud atteint, prédécesseurs), sous forme de dict.
+    def _parcourir(self, departs, limite=np.inf, cibles=None, cible_xy=None):
+        decalages, voisins, couts = self._listes
+        if cible_xy is not None:
+            xs, ys = self.x.tolist(), self.y.tolist()
+            cx, cy = cible_xy
+            minorant = self._minorant
+            estimation = lambda v: minorant * ((xs[v] - cx) ** 2 + (ys[v] - cy) ** 2) ** 0.5
+        else:
+            estimation = lambda v: 0.0
+        meilleurs = dict(departs)
+        predecesseurs = {noeud: -1 for noeud in departs}
+        atteints = {}
+        restantes = set(cibles) if cibles is not None else None
+        a_visiter = [(cout + estimation(noeud), cout, noeud) for noeud, cout in departs.items()]
+        heapq.heapify(a_visiter)
+        while a_visiter:
+            _, cout, noeud = heapq.heappop(a_visiter)
+            if noeud in atteints or cout > limite:
+                continue
+            atteints[noeud] = cout
+            if restantes is not None:
+                restantes.discard(noeud)
+                if not restantes:
+                    break
+            for k in range(decalages[noeud], decalages[noeud + 1]):
+                voisin = voisins[k]
+                nouveau = cout + couts[k]
+                if nouveau < meilleurs.get(voisin, np.inf) and nouveau <= limite:
+                    meilleurs[voisin] = nouveau
+                    predecesseurs[voisin] = noeud
+                    heapq.heappush(a_visiter, (nouveau + estimation(voisin), nouveau, voisin))
+        return atteints, predecesseurs
+
+    # Fonction pour calculer l'itinéraire le moins coûteux entre deux points (A*).
+    # Renvoie (coût, longueur au sol en mètres, noeuds traversés), ou (inf, inf, []) sans itinéraire.
+    def itineraire(self, x0, y0, x1, y1, acces_max=ACCES_MAX):
+        (depart, arrivee), (acces_depart, acces_arrivee) = self.rattacher([x0, x1], [y0, y1], acces_max)
+        if depart < 0 or arrivee < 0 or self.composantes[depart] != self.composantes[arrivee]:
+            return np.inf, np.inf, []
+        atteints, predecesseurs = self._parcourir({int(depart): 0.0}, cibles=[int(arrivee)],
+                                                  cible_xy=(self.x[arrivee], self.y[arrivee]))
+        if arrivee not in atteints:
+            return np.inf, np.inf, []
+        noeuds = [int(arrivee)]
+        while predecesseurs[noeuds[-1]] >= 0:
+            noeuds.append(predecesseurs[noeuds[-1]])
+        noeuds.reverse()
+        longueur = sum(self._longueur_arc(a, b) for a, b in zip(noeuds[:-1], noeuds[1:]))
+        longueur += (acces_depart + acces_arrivee) / COEFFICIENT_HORS_PISTE
+        return atteints[arrivee] + acces_depart + acces_arrivee, longueur, noeuds
+
+    # Longueur au sol du moins coûteux des arcs a -> b
+    def _longueur_arc(self, a, b):
+        debut, fin = self.decalages[a], self.decalages[a + 1]
+        arcs = np.flatnonzero(self.voisins[debut:fin] == b) + debut
+        return float(self.longueurs[arcs[np.argmin(self.couts[arcs])]])
+
+    # Fonction pour calculer l'isochrone d'un point : noeuds atteints pour un coût d'au plus budget
+    # (mètres pondérés), avec leur coût ; tableaux vides si le point est trop loin du réseau
+    def isochrone(self, x, y, budget, acces_max=ACCES_MAX):
+        (depart,), (acces,) = self.rattacher([x], [y], acces_max)
+        if depart < 0 or acces > budget:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        atteints, _ = self._parcourir({int(depart): float(acces)}, limite=budget)
+        return np.fromiter(atteints, dtype=np.int64, count=len(atteints)), np.fromiter(atteints.values(), dtype=np.float64, count=len(atteints))
+
+    # Fonction pour calculer le coût des itinéraires entre toutes les paires de stations (matrice
+    # n x n, inf sans itinéraire). Un parcours par noeud de rattachement, arrêté dès que les noeuds
+    # de toutes les stations sont atteints. Le résultat ne dépend que des positions des stations : il
+    # est conservé pour les rafraîchissements suivants tant que les positions ne changent pas.
+    def distances_stations(self, x, y, acces_max=ACCES_MAX):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        cle = (x.tobytes(), y.tobytes(), acces_max)
+        if cle in self._cache_stations:
+            return self._cache_stations[cle]
+        noeuds, acces = self.rattacher(x, y, acces_max)
+        rattaches = np.flatnonzero(noeuds >= 0)
+        cibles = set(noeuds[rattaches].tolist())
+        matrice = np.full((len(x), len(x)), np.inf)
+        for noeud in cibles:
+            atteints, _ = self._parcourir({noeud: 0.0}, cibles={c for c in cibles if self.composantes[c] == self.composantes[noeud]})
+            depuis = rattaches[noeuds[rattaches] == noeud]
+            vers = rattaches[np.isin(noeuds[rattaches], list(atteints))]
+            couts = np.array([atteints[v] for v in noeuds[vers].tolist()])
+            matrice[np.ix_(depuis, vers)] = acces[depuis][:, None] + couts[None, :] + acces[vers][None, :]
+        np.fill_diagonal(matrice, 0.0)
+        self._cache_stations = {cle: matrice}
+        return matrice
+
+# Fonction pour calculer la couverture de chaque station : part des autres stations joignables par
+# un itinéraire de coût au plus detour_max fois la distance à vol d'oiseau
+def couverture(reseau, x, y, detour_max=DETOUR_MAX, acces_max=ACCES_MAX):
+    n = len(x)
+    if n < 2:
+        return np.zeros(n)
+    matrice = reseau.distances_stations(x, y, acces_max)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    directes = distance_sol(x[:, None], y[:, None], x[None, :], y[None, :])
+    couvertes = matrice <= detour_max * directes
+    np.fill_diagonal(couvertes, False)
+    return couvertes.sum(axis=1) / (n - 1)
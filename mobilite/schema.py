@@ -0,0 +1,126 @@
+# Types compacts des jeux de données analysés, par jeu :
+# - texte répété (état, oui/non, type de voie, nom d'arrêt) : catégorie pandas (codes + valeurs
+#   distinctes une seule fois) ;
+# - compte (places, vélos, victimes) : int16, float32 s'il manque des valeurs ou si elles sortent
+#   de l'intervalle d'int16 ;
+# - les coordonnées restent en float64 (le float32 perd le demi-mètre en Web Mercator).
+# Dans une ColumnDataSource, une colonne catégorielle part sous forme de codes entiers (int8, int16
+# ou int32 selon le nombre de valeurs distinctes, tableau binaire), ses valeurs distinctes une seule fois dans le formateur des infobulles, qui
+# décode dans le navigateur.
+import json
+import re
+import numpy as np
+import pandas as pd
+from bokeh.core.json_encoder import serialize_json
+from bokeh.core.serialization import Serializer
+from bokeh.models import ColumnDataSource, CustomJSHover
+
+CATEGORIE = "categorie"
+COMPTE = "compte"
+
+# Type de chaque colonne concernée, par jeu ; les autres colonnes gardent leur type.
+# Les noms des stations vélo et des parcs relais, distincts d'une ligne à l'autre, restent du texte.
+SCHEMAS = {
+    "stations": {'total_possible': COMPTE, 'nbre_emplacement_vide': COMPTE, 'nbre_de_velo_disponible': COMPTE},
+    "reparation": {'gonflage': CATEGORIE, 'etat': CATEGORIE, 'reparation': CATEGORIE},
+    "amenagement": {'type_amenagement': CATEGORIE, 'position': CATEGORIE},
+    "parcs_relais": {'etat': CATEGORIE, 'place_dispo_voit_perso': COMPTE, 'place_dispo_voit_elec': COMPTE,
+                     'place_dispo_PMR': COMPTE, 'place_dispo_covoit': COMPTE, 'capacity': COMPTE},
+    "bus_metro": {'nom': CATEGORIE},
+    "accidents": {'ntu': COMPTE, 'nbh': COMPTE, 'nbnh': COMPTE},
+}
+
+INT16 = np.iinfo(np.int16)
+
+# Colonne de comptes en int16, ou en float32 si des valeurs manquent, ne sont pas entières ou dépassent int16
+def _compte(serie):
+    valeurs = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64)
+    if len(valeurs) and not (np.isnan(valeurs).any() or (valeurs % 1).any()
+                             or valeurs.min() < INT16.min or valeurs.max() > INT16.max):
+        return pd.Series(valeurs.astype(np.int16), index=serie.index, name=serie.name)
+    return pd.Series(valeurs.astype(np.float32), index=serie.index, name=serie.name)
+
+# Fonction pour donner aux colonnes d'un DataFrame analysé les types du schéma de son jeu
+def appliquer_schema(df, jeu):
+    for nom, type_colonne in SCHEMAS[jeu].items():
+        if nom not in df:
+            continue
+        if type_colonne == CATEGORIE:
+            df[nom] = df[nom].astype("category")
+        else:
+            df[nom] = _compte(df[nom])
+    return df
+
+# Inverse d'appliquer_schema (texte et int64/float64), pour comparer mémoire et octets
+def sans_schema(df, jeu):
+    df = df.copy()
+    for nom, type_colonne in SCHEMAS[jeu].items():
+        if nom not in df:
+            continue
+        if type_colonne == CATEGORIE:
+            df[nom] = df[nom].astype("str")
+        else:
+            df[nom] = df[nom].astype(np.int64 if df[nom].dtype.kind == "i" else np.float64)
+    return df
+
+# Colonnes d'une ColumnDataSource : les catégories deviennent leurs codes, dans le plus petit type
+# entier signé (-1 pour une valeur manquante). Renvoie (DataFrame, colonne -> valeurs distinctes).
+def colonnes_codees(df):
+    valeurs = {}
+    codees = {}
+    for nom in df.columns:
+        if isinstance(df[nom].dtype, pd.CategoricalDtype):
+            categories = df[nom].cat.categories
+            codes = df[nom].cat.codes.to_numpy()
+            # Type signé contenant -len(categories) : les codes 0..len-1 et -1 y tiennent
+            codees[nom] = codes.astype(np.min_scalar_type(-max(len(categories), 1)), copy=False)
+            valeurs[nom] = [str(valeur) for valeur in categories]
+    return df.assign(**codees), valeurs
+
+# Fonction pour créer une ColumnDataSource à colonnes catégorielles codées.
+# Renvoie (source, colonne -> valeurs distinctes) ; les valeurs servent à infobulles.
+def source_codee(df):
+    df, valeurs = colonnes_codees(df)
+    return ColumnDataSource(df), valeurs
+
+JS_DECODAGE = """
+    return value >= 0 && value < valeurs.length ? valeurs[value] : "";
+"""
+
+# Fonction pour adapter les infobulles d'un HoverTool à une source codée : chaque champ @colonne
+# d'une colonne codée est décodé dans le navigateur. Renvoie les arguments tooltips et formatters.
+def infobulles(tooltips, valeurs):
+    formateurs = {}
+    def decoder(champ):
+        nom = champ.group(1)
+        if nom not in valeurs:
+            return champ.group(0)
+        if f"@{nom}" not in formateurs:
+            formateurs[f"@{nom}"] = CustomJSHover(args=dict(valeurs=valeurs[nom]), code=JS_DECODAGE)
+        return f"@{nom}{{custom}}"
+    tooltips = [(libelle, re.sub(r"@(\w+)(?![\w{])", decoder, champ)) for libelle, champ in tooltips]
+    return dict(tooltips=tooltips, formatters=formateurs)
+
+# Taille en octets du JSON des colonnes d'une source (tableaux binaires compris, comme dans la
+# page) et des valeurs distinctes envoyées aux infobulles
+def octets_source(source, valeurs=None):
+    taille = len(serialize_json(Serializer(deferred=False).encode(dict(source.data))))
+    return taille + (len(json.dumps(valeurs, ensure_ascii=False)) if valeurs else 0)
+
+# Mémoire (profonde) et octets sérialisés d'un jeu sans puis avec schéma et codage.
+# Renvoie (mémoire avant, mémoire après, octets avant, octets après).
+def mesurer_schema(df, jeu):
+    avant = sans_schema(df, jeu)
+    memoire_avant = int(avant.memory_usage(deep=True).sum())
+    memoire_apres = int(df.memory_usage(deep=True).sum())
+    octets_avant = octets_source(ColumnDataSource(avant))
+    octets_apres = octets_source(*source_codee(df))
+    return memoire_avant, memoire_apres, octets_avant, octets_apres
+
+# Tableau mémoire / octets avant et après, une ligne par jeu (jeu -> DataFrame avec schéma)
+def rapport_schema(jeux):
+    lignes = [f"{'jeu':14} {'lignes':>7} {'mémoire avant':>14} {'après':>10} {'octets avant':>13} {'après':>10}"]
+    for jeu, df in jeux.items():
+        memoire_avant, memoire_apres, octets_avant, octets_apres = mesurer_schema(df, jeu)
+        lignes.append(f"{jeu:14} {len(df):>7} {memoire_avant:>14} {memoire_apres:>10} {octets_avant:>13} {octets_apres:>10}")
+    return "\n".join(lignes)
@@ -0,0 +1,150 @@
+# Simplification des multi-lignes (Douglas–Peucker) et niveaux de détail selon le zoom
+import numpy as np
+from bokeh.models import ColumnDataSource, CustomJS
+from mobilite.geometrie import LignesMultiples
+
+# Tolérances (en mètres Web Mercator) précalculées par défaut, de la plus grossière à la plus fine
+TOLERANCES_PAR_DEFAUT = (16.0, 4.0, 1.0)
+
+# Concatène des intervalles d'indices [debuts[i], fins[i]) sans boucle Python
+def _indices_intervalles(debuts, fins):
+    longueurs = fins - debuts
+    total = int(longueurs.sum())
+    proprietaire = np.repeat(np.arange(len(debuts)), longueurs)
+    premiers = np.zeros(len(debuts), dtype=np.int64)
+    np.cumsum(longueurs[:-1], out=premiers[1:])
+    indices = np.arange(total) - premiers[proprietaire] + debuts[proprietaire]
+    return indices, proprietaire
+
+# Distance de chaque point (px, py) au segment [a, b] correspondant
+def _distance_segment(px, py, ax, ay, bx, by):
+    dx = bx - ax
+    dy = by - ay
+    longueur2 = dx * dx + dy * dy
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.where(longueur2 > 0, ((px - ax) * dx + (py - ay) * dy) / longueur2, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+# Masque des sommets conservés par l'algorithme de Douglas–Peucker.
+# Toutes les parties sont traitées ensemble : à chaque tour, le sommet le plus éloigné de la corde
+# de chaque intervalle encore ouvert est cherché en une seule passe NumPy sur le tampon.
+# Les extrémités de chaque partie sont toujours conservées, le nombre de parties ne change donc pas.
+def masque_simplification(lignes, tolerance):
+    x, y = lignes.sommets
+    conserver = np.zeros(lignes.nb_sommets, dtype=bool)
+    conserver[lignes.decalages[:-1]] = True
+    conserver[lignes.decalages[1:] - 1] = True
+    debuts = lignes.decalages[:-1].copy()
+    fins = lignes.decalages[1:] - 1
+    while True:
+        ouverts = fins - debuts > 1
+        debuts, fins = debuts[ouverts], fins[ouverts]
+        if len(debuts) == 0:
+            break
+        # Sommets intérieurs de chaque intervalle et distance à la corde
+        indices, proprietaire = _indices_intervalles(debuts + 1, fins)
+        distances = _distance_segment(x[indices], y[indices],
+                                      x[debuts][proprietaire], y[debuts][proprietaire],
+                                      x[fins][proprietaire], y[fins][proprietaire])
+        premiers = np.zeros(len(debuts), dtype=np.int64)
+        np.cumsum(fins[:-1] - debuts[:-1] - 1, out=premiers[1:])
+        maximums = np.maximum.reduceat(distances, premiers)
+        # Premier sommet atteignant le maximum dans chaque intervalle
+        candidats = np.flatnonzero(distances == maximums[proprietaire])
+        _, position = np.unique(proprietaire[candidats], return_index=True)
+        sommet_max = indices[candidats[position]]
+        a_couper = maximums > tolerance
+        conserver[sommet_max[a_couper]] = True
+        debuts, fins = (np.concatenate([debuts[a_couper], sommet_max[a_couper]]),
+                        np.concatenate([sommet_max[a_couper], fins[a_couper]]))
+    return conserver
+
+# Ne garde que les sommets indiqués par le masque (les décalages sont recalculés par partie)
+def filtrer(lignes, masque):
+    cumul = np.concatenate([[0], np.cumsum(masque)])
+    return LignesMultiples(lignes.sommets[:, masque], cumul[lignes.decalages], lignes.entites)
+
+# Fonction pour simplifier toutes les parties avec une tolérance en mètres Web Mercator
+def simplifier(lignes, tolerance):
+    return filtrer(lignes, masque_simplification(lignes, tolerance))
+
+# Rang de chaque sommet : indice du niveau le plus grossier qui le conserve (tolérances triées
+# de la plus grande à la plus petite), -1 si même le niveau le plus fin l'élimine.
+# Avec le même choix du sommet le plus éloigné, les sommets d'une tolérance donnée sont toujours
+# inclus dans ceux d'une tolérance plus petite : un seul tampon suffit pour tous les niveaux.
+def rangs_niveaux(lignes, tolerances):
+    rangs = np.full(lignes.nb_sommets, -1, dtype=np.int8)
+    for rang, tolerance in reversed(list(enumerate(sorted(tolerances, reverse=True)))):
+        rangs[masque_simplification(lignes, tolerance)] = rang
+    return rangs
+
+# Précalcule plusieurs niveaux de détail (un par tolérance, triés du plus grossier au plus fin)
+def niveaux_de_detail(lignes, tolerances=TOLERANCES_PAR_DEFAUT):
+    return {tolerance: simplifier(lignes, tolerance) for tolerance in sorted(tolerances, reverse=True)}
+
+# Code exécuté dans le navigateur : choisit le niveau dont la tolérance reste sous la taille d'un pixel,
+# puis construit (une seule fois par niveau) les sommets de chaque partie dont le rang est suffisant
+JS_NIVEAUX = """
+    if (plot == null) {
+        return;
+    }
+    const metres_par_pixel = (plot.x_range.end - plot.x_range.start) / plot.width;
+    let choix = tolerances.length - 1;
+    for (let i = 0; i < tolerances.length; i++) {
+        if (tolerances[i] <= metres_par_pixel) {
+            choix = i;
+            break;
+        }
+    }
+    if (cache.courant === choix) {
+        return;
+    }
+    cache.courant = choix;
+    if (cache[choix] === undefined) {
+        const xs = [];
+        const ys = [];
+        for (let i = 0; i < decalages.length - 1; i++) {
+            if (choix === tolerances.length - 1) {
+                xs.push(x.subarray(decalages[i], decalages[i + 1]));
+                ys.push(y.subarray(decalages[i], decalages[i + 1]));
+                continue;
+            }
+            const px = [];
+            const py = [];
+            for (let j = decalages[i]; j < decalages[i + 1]; j++) {
+                if (rangs[j] <= choix) {
+                    px.push(x[j]);
+                    py.push(y[j]);
+                }
+            }
+            xs.push(px);
+            ys.push(py);
+        }
+        cache[choix] = [xs, ys];
+    }
+    const [xs, ys] = cache[choix];
+    source.data = Object.assign({}, source.data, {[colonne_x]: xs, [colonne_y]: ys});
+"""
+
+# Fonction pour créer la ColumnDataSource d'un multi_line avec plusieurs niveaux de détail.
+# Seuls les sommets du niveau le plus fin partent dans les tampons à plat, avec leur rang ;
+# le CustomJS renvoyé est à attacher à document_ready et la figure est branchée avec suivre_zoom.
+def source_multi_lignes_simplifiees(df, tolerances=TOLERANCES_PAR_DEFAUT, x='x', y='y'):
+    lignes = LignesMultiples.depuis_dataframe(df, x, y)
+    rangs = rangs_niveaux(lignes, tolerances)
+    fines = filtrer(lignes, rangs >= 0)
+    source = ColumnDataSource(df.drop(columns=[x, y]))
+    source.data[x] = [[] for _ in range(len(df))]
+    source.data[y] = [[] for _ in range(len(df))]
+    remplissage = CustomJS(args=dict(source=source, tolerances=sorted(map(float, tolerances), reverse=True),
+                                     x=fines.sommets[0], y=fines.sommets[1],
+                                     decalages=fines.decalages.astype(np.int32), rangs=rangs[rangs >= 0],
+                                     cache={}, plot=None, colonne_x=x, colonne_y=y), code=JS_NIVEAUX)
+    return source, remplissage
+
+# Branche le changement de niveau de détail sur les déplacements et zooms de la figure
+def suivre_zoom(plot, remplissage):
+    remplissage.args["plot"] = plot
+    plot.x_range.js_on_change("start", remplissage)
+    plot.x_range.js_on_change("end", remplissage)
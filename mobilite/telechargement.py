@@ -0,0 +1,214 @@
+# Téléchargement des jeux de données en ligne : connexions HTTP réutilisées (keep-alive),
+# requêtes simultanées, délai d'attente par requête, nouvelles tentatives et mesure des latences
+import gzip
+import http.client
+import json
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+from mobilite.profil import etape
+
+# Réponse HTTP complète (corps déjà lu et décompressé)
+Reponse = namedtuple("Reponse", "statut entetes corps")
+# Réponse HTTP lue ligne par ligne (lignes est un générateur)
+Flux = namedtuple("Flux", "statut entetes lignes")
+# Mesure d'une requête : durée totale (nouvelles tentatives comprises) et nombre de tentatives
+Mesure = namedtuple("Mesure", "url statut duree tentatives erreur")
+
+class ErreurTelechargement(Exception):
+    def __init__(self, url, message):
+        super().__init__(f"{url} : {message}")
+        self.url = url
+
+# Réserve de connexions ouvertes, par serveur (schéma, hôte, port)
+class PoolConnexions:
+    def __init__(self, delai=10.0, taille_max=8):
+        self.delai = delai
+        self.taille_max = taille_max
+        self._libres = {}
+        self._verrou = threading.Lock()
+
+    # Renvoie une connexion libre vers ce serveur, ou en ouvre une nouvelle
+    def obtenir(self, cle):
+        with self._verrou:
+            libres = self._libres.get(cle)
+            if libres:
+                return libres.pop()
+        return self.ouvrir(cle)
+
+    # Ouvre une nouvelle connexion (la socket n'est créée qu'à la première requête)
+    def ouvrir(self, cle):
+        schema, hote, port = cle
+        classe = http.client.HTTPSConnection if schema == "https" else http.client.HTTPConnection
+        return classe(hote, port, timeout=self.delai)
+
+    # Remet une connexion encore ouverte à disposition des requêtes suivantes
+    def rendre(self, cle, connexion):
+        with self._verrou:
+            libres = self._libres.setdefault(cle, [])
+            if len(libres) < self.taille_max:
+                libres.append(connexion)
+                return
+        connexion.close()
+
+    def fermer(self):
+        with self._verrou:
+            for libres in self._libres.values():
+                for connexion in libres:
+                    connexion.close()
+            self._libres.clear()
+
+class ClientHTTP:
+    # delai : délai d'attente (s) de chaque requête, tentatives : nombre maximal d'essais,
+    # attente : pause (s) avant le 2e essai, doublée à chaque nouvel essai
+    def __init__(self, delai=10.0, tentatives=3, attente=0.5, pool=None):
+        self.tentatives = tentatives
+        self.attente = attente
+        self.pool = pool or PoolConnexions(delai)
+        self.mesures = []
+        self._verrou = threading.Lock()
+
+    def _mesurer(self, mesure):
+        with self._verrou:
+            self.mesures.append(mesure)
+
+    # Envoie la requête sur une connexion de la réserve. Le corps est lu en entier, sauf en mode flux
+    # où la réponse est renvoyée avec sa connexion pour être lue au fur et à mesure.
+    def _echanger(self, cle, chemin, entetes, flux=False):
+        connexion = self.pool.obtenir(cle)
+        try:
+            try:
+                reutilisee = connexion.sock is not None
+                connexion.request("GET", chemin, headers=entetes)
+                reponse = connexion.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reutilisee:
+                    raise
+                # Le serveur a fermé une connexion restée inactive dans la réserve : une nouvelle suffit
+                connexion.close()
+                connexion = self.pool.ouvrir(cle)
+                connexion.request("GET", chemin, headers=entetes)
+                reponse = connexion.getresponse()
+            corps = None if flux else reponse.read()
+        except (OSError, http.client.HTTPException):
+            # Délai dépassé ou réponse invalide : la connexion n'est pas remise dans la réserve
+            connexion.close()
+            raise
+        if flux:
+            return reponse, None, connexion
+        self._liberer(cle, connexion, reponse)
+        return reponse, corps, None
+
+    def _liberer(self, cle, connexion, reponse):
+        if reponse.will_close:
+            connexion.close()
+        else:
+            self.pool.rendre(cle, connexion)
+
+    # Requête GET avec nouvelles tentatives sur erreur réseau, 429 et 5xx.
+    # Renvoie (réponse, corps, connexion, clé, début) ; les codes 4xx autres que 429 lèvent ErreurTelechargement.
+    def _requete(self, url, entetes, flux):
+        morceaux = urlsplit(url)
+        port = morceaux.port or (443 if morceaux.scheme == "https" else 80)
+        cle = (morceaux.scheme, morceaux.hostname, port)
+        chemin = (morceaux.path or "/") + (f"?{morceaux.query}" if morceaux.query else "")
+        entetes = {"Accept-Encoding": "gzip", **(entetes or {})}
+        debut = time.perf_counter()
+        statut = None
+        erreur = None
+        for tentative in range(1, self.tentatives + 1):
+            try:
+                reponse, corps, connexion = self._echanger(cle, chemin, entetes, flux)
+            except (OSError, http.client.HTTPException) as exc:
+                erreur = exc
+            else:
+                statut = reponse.status
+                if statut != 429 and statut < 500:
+                    if statut >= 400:
+                        if connexion is not None:
+                            connexion.close()
+                        self._mesurer(Mesure(url, statut, time.perf_counter() - debut, tentative, f"HTTP {statut}"))
+                        raise ErreurTelechargement(url, f"HTTP {statut}")
+                    return reponse, corps, connexion, cle, debut, tentative
+                if connexion is not None:
+                    connexion.close()
+                erreur = ErreurTelechargement(url, f"HTTP {statut}")
+            if tentative < self.tentatives:
+                time.sleep(self.attente * 2 ** (tentative - 1))
+        self._mesurer(Mesure(url, statut, time.perf_counter() - debut, self.tentatives, str(erreur)))
+        raise ErreurTelechargement(url, f"échec après {self.tentatives} tentatives ({erreur})") from erreur
+
+    # Nom de l'étape d'instrumentation d'une requête : hôte et chemin, sans les paramètres (les pages
+    # d'un même jeu de données sont cumulées)
+    @staticmethod
+    def _etape(url):
+        morceaux = urlsplit(url)
+        return etape(f"http {morceaux.netloc}{morceaux.path}")
+
+    # Requête GET complète : les codes 2xx et 304 sont renvoyés tels quels
+    def get(self, url, entetes=None):
+        with self._etape(url):
+            reponse, corps, _, _, debut, tentative = self._requete(url, entetes, flux=False)
+        self._mesurer(Mesure(url, reponse.status, time.perf_counter() - debut, tentative, None))
+        if reponse.getheader("Content-Encoding") == "gzip":
+            corps = gzip.decompress(corps)
+        return Reponse(reponse.status, dict(reponse.getheaders()), corps)
+
+    # Ouvre la réponse sans la lire : renvoie un Flux dont les lignes sont lues au fur et à mesure
+    # (format JSON Lines par exemple). Les nouvelles tentatives ne portent que sur l'ouverture.
+    def flux(self, url, entetes=None):
+        with self._etape(url):
+            reponse, _, connexion, cle, debut, tentative = self._requete(url, entetes, flux=True)
+        if reponse.status == 304:
+            # Pas de corps : la connexion est rendue tout de suite
+            reponse.read()
+            self._liberer(cle, connexion, reponse)
+            self._mesurer(Mesure(url, reponse.status, time.perf_counter() - debut, tentative, None))
+            return Flux(reponse.status, dict(reponse.getheaders()), iter(()))
+
+        def lire():
+            try:
+                source = gzip.GzipFile(fileobj=reponse) if reponse.getheader("Content-Encoding") == "gzip" else reponse
+                for ligne in source:
+                    if ligne.strip():
+                        yield ligne
+                # Termine la réponse pour que la connexion puisse resservir
+                reponse.read()
+            except BaseException:
+                connexion.close()
+                raise
+            self._liberer(cle, connexion, reponse)
+            self._mesurer(Mesure(url, reponse.status, time.perf_counter() - debut, tentative, None))
+
+        return Flux(reponse.status, dict(reponse.getheaders()), lire())
+
+    def lignes(self, url, entetes=None):
+        return self.flux(url, entetes).lignes
+
+    def get_json(self, url, entetes=None):
+        return json.loads(self.get(url, entetes).corps)
+
+    # Exécute simultanément plusieurs tâches (nom -> fonction sans argument) et renvoie nom -> résultat.
+    # La durée totale est celle de la tâche la plus lente, pas la somme des tâches.
+    def en_parallele(self, taches):
+        with ThreadPoolExecutor(max_workers=max(1, len(taches))) as executeur:
+            futurs = {nom: executeur.submit(tache) for nom, tache in taches.items()}
+            return {nom: futur.result() for nom, futur in futurs.items()}
+
+    # Télécharge simultanément plusieurs documents JSON (nom -> URL) et renvoie nom -> document
+    def telecharger_tout(self, urls, fonction=None):
+        fonction = fonction or self.get_json
+        return self.en_parallele({nom: partial(fonction, url) for nom, url in urls.items()})
+
+    # Tableau des latences mesurées, une ligne par requête
+    def rapport_latences(self):
+        lignes = [f"{'durée (ms)':>11} {'essais':>6} {'statut':>6}  url"]
+        with self._verrou:
+            mesures = list(self.mesures)
+        for mesure in mesures:
+            statut = mesure.statut or "ERR"
+            lignes.append(f"{mesure.duree * 1000:>11.1f} {mesure.tentatives:>6} {statut!s:>6}  {mesure.url}")
+        return "\n".join(lignes)
@@ -0,0 +1,315 @@
+# Rafraîchissement des seules sources en temps réel (stations vélo, parcs relais, trafic) :
+# un processus de longue durée télécharge les trois jeux à intervalle régulier et écrit à côté
+# de la page deux fichiers JSON, l'état complet et les différences avec l'état précédent.
+# Dans le navigateur, un CustomJS interroge le fichier de différences et applique source.patch(),
+# les couches statiques (pistes cyclables, arrêts de bus...) ne sont jamais rechargées.
+# Chaque relevé est aussi ajouté à l'historique SQLite (mobilite.historique), dont sont tirées
+# les prévisions de disponibilité des stations et parcs relais (mobilite.prevision).
+# Usage : python -m mobilite.temps_reel [--intervalle 60] [--sortie donnees_temps_reel] [--sans-historique]
+#                                       [--pistes amenagement_cyclable.json]
+import argparse
+import json
+import logging
+import os
+import time
+from functools import partial
+import numpy as np
+import pandas as pd
+from bokeh.models import CustomJS
+from mobilite.analyse import (analyse_station_velo, analyse_data_reparation_velo_parc_relais, analyse_data_reparation_velo_trafic,
+                              analyse_data_reparation_velo_pistes_cyclables)
+from mobilite.cache import CacheHTTP, ecrire_atomique
+from mobilite.chargement import charger_sources, sources_disponibles
+from mobilite.historique import FICHIER_PAR_DEFAUT, Historique
+from mobilite.pagination import iterer_enregistrements
+from mobilite.reseau import ReseauCyclable, couverture
+from mobilite.prevision import Prevision
+from mobilite.trafic import carte_congestion, lignes_troncons
+from mobilite.telechargement import ClientHTTP
+
+logger = logging.getLogger(__name__)
+
+# Adresses des jeux de données en temps réel de Rennes Métropole
+URL_STATIONS_VELO = "https://data.rennesmetropole.fr/api/explore/v2.1/catalog/datasets/etat-des-stations-le-velo-star-en-temps-reel/records"
+URL_PARCS_RELAIS = "https://data.rennesmetropole.fr/api/explore/v2.1/catalog/datasets/tco-parcsrelais-star-etat-tr/records"
+URL_TRAFIC = "https://data.rennesmetropole.fr/api/explore/v2.1/catalog/datasets/etat-du-trafic-en-temps-reel/records?where=insee%3D35238"
+
+# Durée de vie du cache (en secondes) par jeu de données en ligne : avant expiration la copie locale
+# est utilisée sans requête, ensuite une requête conditionnelle (ETag / Last-Modified) est envoyée
+TTL_EN_LIGNE = {
+    "etat-des-stations-le-velo-star-en-temps-reel": 30,
+    "tco-parcsrelais-star-etat-tr": 60,
+    "etat-du-trafic-en-temps-reel": 60,
+}
+
+# Jeux de données en temps réel : nom -> (URL, fonction d'analyse)
+JEUX_TEMPS_REEL = {
+    "stations": (URL_STATIONS_VELO, analyse_station_velo),
+    "parcs_relais": (URL_PARCS_RELAIS, analyse_data_reparation_velo_parc_relais),
+    "trafic": (URL_TRAFIC, analyse_data_reparation_velo_trafic),
+}
+# Colonne servant à garder le même ordre des lignes d'un téléchargement à l'autre
+CLES_TRI = {"stations": "nom", "parcs_relais": "nom", "trafic": "troncon"}
+
+# Nom par défaut des fichiers écrits à côté de la page (sans extension)
+SORTIE_PAR_DEFAUT = "donnees_temps_reel"
+# Période (en secondes) sur laquelle sont prises les vitesses maximale et minimale du trafic
+DUREE_TRAFIC = 3600
+# Jeux dont la disponibilité est prévue à partir de l'historique
+JEUX_PREVUS = ("stations", "parcs_relais")
+
+# Fonction pour télécharger et analyser un des jeux de données en temps réel
+def charger_jeu(client, nom):
+    url, analyse = JEUX_TEMPS_REEL[nom]
+    return analyse(iterer_enregistrements(client, url))
+
+# Fonction pour télécharger et analyser simultanément les trois jeux de données, chacun de son
+# côté : renvoie nom -> Chargement (mobilite.chargement), un jeu en erreur n'empêche pas les autres
+def tables_temps_reel(client):
+    return charger_sources({nom: partial(charger_jeu, client, nom) for nom in JEUX_TEMPS_REEL})
+
+# Regroupement des données de trafic par dénomination : vitesse moyenne maximale et minimale
+# entre les tronçons du relevé, ou, avec un historique, sur tous les relevés des duree dernières
+# secondes (relevé courant compris, à ajouter à l'historique avant l'appel)
+def grouper_trafic(data_trafic, historique=None, duree=DUREE_TRAFIC):
+    grouped_data = data_trafic.groupby("denomination")["averagevehiclespeed"].agg(["max", "min"])
+    if historique is not None:
+        glissant = historique.glissant("trafic", "averagevehiclespeed", duree, par_groupe=True, centile=False).set_index("cle")
+        glissant = glissant.reindex(grouped_data.index)
+        grouped_data["max"] = glissant["maximum"].fillna(grouped_data["max"])
+        grouped_data["min"] = glissant["minimum"].fillna(grouped_data["min"])
+    return dict(denominations=grouped_data.index.tolist(),
+                max_speed=grouped_data["max"].tolist(),
+                min_speed=grouped_data["min"].tolist())
+
+# Colonnes de la carte du trafic envoyées à la page (les sommets restent dans la page, lignes_trafic)
+COLONNES_TRAFIC = ["denomination", "averagevehiclespeed", "vitesse_maxi", "traveltime", "traveltimereliability",
+                   "congestion", "congestion_route", "max_speed", "min_speed"]
+# Colonnes propres à la page, jamais envoyées : gardées telles quelles quand une source est remplacée
+COLONNES_PAGE = {"trafic": ["x", "y"]}
+
+# Données de la carte du trafic : une ligne par partie de tronçon, dans l'ordre des tronçons, avec
+# ses indices de congestion (mobilite.trafic) et les vitesses maximale et minimale de sa route
+# (grouper_trafic). Les sommets n'en font pas partie : ils ne changent pas d'un relevé à l'autre.
+def carte_trafic(data_trafic, historique=None, duree=DUREE_TRAFIC):
+    vitesses = grouper_trafic(data_trafic, historique, duree)
+    parties = carte_congestion(data_trafic.sort_values(CLES_TRI["trafic"], kind="stable", ignore_index=True))
+    for nom in ("max_speed", "min_speed"):
+        parties[nom] = parties['denomination'].map(pd.Series(vitesses[nom], index=vitesses["denominations"], dtype=np.float64))
+    parties[["congestion", "congestion_route"]] = parties[["congestion", "congestion_route"]].round(3)
+    return _colonnes_json(parties[COLONNES_TRAFIC])
+
+# Géométries de la carte du trafic (LignesMultiples projetées), une partie par ligne de carte_trafic
+def lignes_trafic(data_trafic):
+    return lignes_troncons(data_trafic.sort_values(CLES_TRI["trafic"], kind="stable", ignore_index=True))
+
+# Date de mise à jour des parcs relais, formatée pour le titre de la carte
+def date_parcs_relais(df_parc_relais):
+    return df_parc_relais['date'].iloc[0].strftime("%d/%m/%Y à %Hh%M")
+
+# Colonnes d'un DataFrame en listes sérialisables en JSON : les dates deviennent des
+# millisecondes depuis l'époque (comme dans Bokeh) et les valeurs manquantes des null
+def _colonnes_json(df):
+    colonnes = {}
+    for nom in df.columns:
+        serie = df[nom]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            millisecondes = serie.dt.as_unit("ms").astype("int64").astype(np.float64)
+            serie = millisecondes.where(serie.notna())
+        colonnes[nom] = [None if pd.isna(v) else v for v in serie.astype(object).tolist()]
+    return colonnes
+
+# Données des ColumnDataSource en temps réel, nom de la source -> colonnes (seulement pour les
+# jeux présents dans tables). Avec reseau (ReseauCyclable), les stations vélo reçoivent leur
+# couverture : part des autres stations joignables par un itinéraire cyclable. Avec previsions
+# (jeu -> Prevision) et historique, les stations et parcs relais reçoivent leurs prévisions à
+# 15-60 min ("<mesure>_<h>min"), le modèle apprenant d'abord les tranches closes depuis l'appel précédent.
+def donnees_sources(tables, historique=None, reseau=None, previsions=None, horodatage=None):
+    donnees = {}
+    horodatage = time.time() if horodatage is None else horodatage
+    for nom in ("stations", "parcs_relais"):
+        if nom in tables:
+            df = tables[nom].sort_values(CLES_TRI[nom], kind="stable", ignore_index=True)
+            if nom == "stations" and reseau is not None:
+                df['couverture'] = couverture(reseau, df['x'].to_numpy(), df['y'].to_numpy())
+            if previsions is not None and historique is not None and nom in previsions:
+                previsions[nom].actualiser(historique, horodatage)
+                df = df.assign(**previsions[nom].colonnes(df, horodatage))
+            donnees[nom] = _colonnes_json(df)
+    if "trafic" in tables:
+        donnees["trafic"] = carte_trafic(tables["trafic"], historique)
+    return donnees
+
+# Différences entre deux états d'une source, au format de ColumnDataSource.patch :
+# colonne -> [[indice, nouvelle valeur], ...]. Renvoie None si le nombre de lignes ou les
+# colonnes ont changé, la source doit alors être remplacée en entier.
+def calculer_patch(ancien, nouveau):
+    if ancien.keys() != nouveau.keys():
+        return None
+    longueurs = {len(valeurs) for valeurs in ancien.values()} | {len(valeurs) for valeurs in nouveau.values()}
+    if len(longueurs) > 1:
+        return None
+    patch = {}
+    for nom, valeurs in nouveau.items():
+        changements = [[i, v] for i, (a, v) in enumerate(zip(ancien[nom], valeurs)) if a != v]
+        if changements:
+            patch[nom] = changements
+    return patch
+
+# Écrit l'état complet (<sortie>.json) puis les différences (<sortie>.patch.json).
+# base est la version à laquelle le patch s'applique, None si le navigateur doit tout recharger.
+def ecrire_etat(sortie, version, donnees, titre_parcs, precedent=None):
+    patches = None
+    if precedent is not None:
+        patches = {nom: calculer_patch(precedent[nom], colonnes) for nom, colonnes in donnees.items()}
+        if any(patch is None for patch in patches.values()):
+            patches = None
+    complet = {"version": version, "titre_parcs": titre_parcs, "sources": donnees}
+    ecrire_atomique(f"{sortie}.json", json.dumps(complet, ensure_ascii=False).encode("utf-8"))
+    differences = {"version": version, "base": version - 1 if patches is not None else None,
+                   "titre_parcs": titre_parcs,
+                   "sources": {nom: patch for nom, patch in (patches or {}).items() if patch}}
+    ecrire_atomique(f"{sortie}.patch.json", json.dumps(differences, ensure_ascii=False).encode("utf-8"))
+    return patches
+
+# Relit l'état complet laissé par un processus précédent : renvoie (version, données)
+def lire_etat(sortie):
+    try:
+        with open(f"{sortie}.json", encoding="utf-8") as fichier:
+            complet = json.load(fichier)
+        return complet["version"], complet["sources"]
+    except (OSError, ValueError, KeyError):
+        return 0, None
+
+# Boucle de rafraîchissement : un téléchargement toutes les intervalle secondes, ajouté à
+# historique s'il est donné. Chaque jeu est chargé de son côté : un jeu en échec est journalisé
+# et sa dernière table valide est gardée jusqu'au tour suivant (elle n'est pas ajoutée une seconde
+# fois à l'historique). Toute autre erreur d'un tour (historique, données de forme inattendue,
+# écriture) est journalisée et la boucle continue. Avec reseau, la couverture des stations est
+# recalculée à chaque tour (les distances entre stations ne sont recalculées que si leurs positions
+# changent). Avec historique, les prévisions de disponibilité sont mises à jour à chaque tour.
+def rafraichir(client, sortie=SORTIE_PAR_DEFAUT, intervalle=60.0, tours=None, historique=None, reseau=None):
+    version, precedent = lire_etat(sortie)
+    previsions = {jeu: Prevision(jeu) for jeu in JEUX_PREVUS} if historique is not None else None
+    tables = {}
+    tour = 0
+    while tours is None or tour < tours:
+        debut = time.monotonic()
+        try:
+            nouvelles = sources_disponibles(tables_temps_reel(client))
+            tables.update(nouvelles)
+            if not tables:
+                logger.warning("Rafraîchissement impossible : aucun jeu disponible")
+            else:
+                horodatage = time.time()
+                if historique is not None and nouvelles:
+                    historique.ajouter_tables(nouvelles, horodatage)
+                donnees = donnees_sources(tables, historique, reseau, previsions, horodatage)
+                if donnees != precedent:
+                    version += 1
+                    titre_parcs = date_parcs_relais(tables["parcs_relais"]) if "parcs_relais" in tables else None
+                    patches = ecrire_etat(sortie, version, donnees, titre_parcs, precedent)
+                    modifiees = sum(len(changements) for patch in (patches or {}).values() for changements in patch.values())
+                    logger.info("Version %d : %s", version, f"{modifiees} valeurs modifiées" if patches is not None else "état complet")
+                precedent = donnees
+        except Exception:
+            logger.exception("Rafraîchissement interrompu, nouvel essai au tour suivant")
+        tour += 1
+        if tours is None or tour < tours:
+            time.sleep(max(0.0, intervalle - (time.monotonic() - debut)))
+
+JS_RAFRAICHISSEMENT = """
+    let version = null;
+    const recharger = (url) => fetch(url, {cache: "no-cache"}).then((reponse) => {
+        if (!reponse.ok) {
+            throw new Error(url + " : HTTP " + reponse.status);
+        }
+        return reponse.json();
+    });
+    const rafraichir = async () => {
+        try {
+            const differences = await recharger(url_patch);
+            if (differences.version === version) {
+                return;
+            }
+            if (version !== null && differences.base === version) {
+                // Sources absentes de la page (jeu indisponible à sa construction) : leurs données sont ignorées
+                for (const nom in differences.sources) {
+                    if (nom in sources) {
+                        sources[nom].patch(differences.sources[nom]);
+                    }
+                }
+                version = differences.version;
+            } else {
+                const complet = await recharger(url_complet);
+                let a_jour = true;
+                for (const nom in complet.sources) {
+                    if (!(nom in sources)) {
+                        continue;
+                    }
+                    // Les colonnes de la page absentes de l'état sont vidées (prévisions ou couverture que
+                    // ce rafraîchissement ne calcule pas), sauf les colonnes propres à la page (sommets du
+                    // trafic, en tampons dans la page) : si le nombre de lignes a changé elles ne correspondent plus
+                    const donnees = Object.assign({}, complet.sources[nom]);
+                    const lignes = Math.max(0, ...Object.values(donnees).map((colonne) => colonne.length));
+                    const gardees = conservees[nom] || [];
+                    for (const colonne in sources[nom].data) {
+                        if (!(colonne in donnees)) {
+                            donnees[colonne] = gardees.includes(colonne) ? sources[nom].data[colonne] : new Array(lignes).fill(null);
+                        }
+                    }
+                    if (new Set(Object.values(donnees).map((colonne) => colonne.length)).size > 1) {
+                        console.warn(nom + " : nombre de lignes modifié, rechargez la page");
+                        a_jour = false;
+                        continue;
+                    }
+                    sources[nom].data = donnees;
+                }
+                if (a_jour) {
+                    version = complet.version;
+                }
+            }
+            if (titre !== null && differences.titre_parcs !== null) {
+                titre.text = prefixe_titre + differences.titre_parcs;
+            }
+        } catch (erreur) {
+            console.warn("Données en temps réel indisponibles", erreur);
+        }
+    };
+    rafraichir();
+    setInterval(rafraichir, intervalle);
+"""
+
+# CustomJS à attacher à document_ready : interroge les fichiers écrits par rafraichir()
+# toutes les intervalle secondes et met à jour les sources sans recharger la page.
+# sources ne contient que les sources présentes dans la page ; titre (parcs relais) vaut None si
+# la carte correspondante n'a pas pu être construite.
+def suivre_temps_reel(sources, titre, prefixe_titre, sortie=SORTIE_PAR_DEFAUT, intervalle=60.0):
+    nom = os.path.basename(sortie)
+    return CustomJS(args=dict(sources=sources, titre=titre, conservees=COLONNES_PAGE,
+                              prefixe_titre=prefixe_titre, url_complet=f"{nom}.json", url_patch=f"{nom}.patch.json",
+                              intervalle=int(intervalle * 1000)), code=JS_RAFRAICHISSEMENT)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rafraîchissement des données en temps réel du tableau de bord")
+    parser.add_argument("--intervalle", type=float, default=60.0, help="secondes entre deux téléchargements")
+    parser.add_argument("--sortie", default=SORTIE_PAR_DEFAUT, help="chemin des fichiers JSON, sans extension")
+    parser.add_argument("--tours", type=int, default=None, help="nombre de rafraîchissements (sans fin par défaut)")
+    parser.add_argument("--historique", default=FICHIER_PAR_DEFAUT, help="base SQLite de l'historique des relevés")
+    parser.add_argument("--sans-historique", action="store_true", help="ne pas conserver les relevés")
+    parser.add_argument("--pistes", default=None, help="fichier des aménagements cyclables (couverture des stations)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    client = CacheHTTP(ClientHTTP(delai=15, tentatives=3), TTL_EN_LIGNE)
+    reseau = None
+    if args.pistes:
+        with open(args.pistes, encoding="utf-8") as fichier:
+            reseau = ReseauCyclable.depuis_dataframe(analyse_data_reparation_velo_pistes_cyclables(json.load(fichier)))
+    if args.sans_historique:
+        rafraichir(client, args.sortie, args.intervalle, args.tours, reseau=reseau)
+    else:
+        with Historique(args.historique) as historique:
+            rafraichir(client, args.sortie, args.intervalle, args.tours, historique, reseau)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Indice de congestion du trafic, calculé pour tous les tronçons d'un relevé à la fois :
+# - rapport de vitesse : vitesse moyenne observée / vitesse autorisée (vitesse_maxi) ;
+# - indice de temps de parcours : temps observé / temps à la vitesse autorisée sur la longueur au
+#   sol du tronçon ;
+# - congestion, de 0 (fluide) à 1 (à l'arrêt) : 1 - 1 / indice de temps, pondéré par la fiabilité
+#   du temps de parcours (traveltimereliability, en %), le reste du poids allant à
+#   1 - rapport de vitesse (seule mesure utilisable quand la fiabilité est nulle).
+# L'indice d'une route (dénomination) est la moyenne des congestions de ses tronçons pondérée par
+# leur longueur. La carte a une ligne par partie de tronçon (multi_line), colorée selon l'un ou
+# l'autre indice ; ses sommets partent à part, en tampons à plat (lignes_troncons), les colonnes
+# d'indices seules étant rafraîchies.
+import numpy as np
+import pandas as pd
+from bokeh.palettes import RdYlGn11
+from mobilite.geometrie import LignesMultiples
+from mobilite.reseau import distance_sol
+
+# Couleurs de la carte, du fluide (vert) au congestionné (rouge), et couleur d'un indice inconnu
+PALETTE_CONGESTION = RdYlGn11
+COULEUR_INCONNUE = "#bbbbbb"
+
+# Géométrie GeoJSON d'un tronçon : geo_shape nu (export v1) ou entité {"type": "Feature"} (API v2.1)
+def _geometrie(forme):
+    if isinstance(forme, dict) and forme.get("type") == "Feature":
+        return forme.get("geometry")
+    return forme
+
+# Géométries projetées des tronçons d'un relevé, une partie par ligne de LineString ou MultiLineString,
+# dans l'ordre des tronçons
+def lignes_troncons(data_trafic):
+    return LignesMultiples.depuis_geometries(map(_geometrie, data_trafic['geometrie'])).projeter()
+
+# Longueur au sol (m) de chacune des nombre entités de lignes projetées, sommets consécutifs d'une
+# même partie seulement
+def longueurs_entites(lignes, nombre):
+    x, y = lignes.sommets
+    segments = distance_sol(x[:-1], y[:-1], x[1:], y[1:])
+    parties = np.repeat(np.arange(lignes.nb_parties), np.diff(lignes.decalages))[:-1]
+    interieurs = np.ones(len(segments), dtype=bool)
+    interieurs[lignes.decalages[1:-1] - 1] = False
+    longueurs = np.bincount(parties[interieurs], segments[interieurs], minlength=lignes.nb_parties)
+    return np.bincount(lignes.entites, longueurs, minlength=nombre)
+
+# Indices de chaque tronçon à partir de tableaux NumPy (vitesses en km/h, temps en s, fiabilités en
+# %, longueurs en m) : (rapports de vitesse, indices de temps de parcours, congestions), NaN là où
+# les données manquent
+def indices_congestion(vitesses, vitesses_maxi, temps, fiabilites, longueurs):
+    vitesses, vitesses_maxi, temps, fiabilites, longueurs = (
+        np.asarray(valeurs, dtype=np.float64) for valeurs in (vitesses, vitesses_maxi, temps, fiabilites, longueurs))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vitesses_maxi = np.where(vitesses_maxi > 0, vitesses_maxi, np.nan)
+        rapports = vitesses / vitesses_maxi
+        temps_libres = longueurs / (vitesses_maxi / 3.6)
+        indices_temps = temps / np.where(temps_libres > 0, temps_libres, np.nan)
+        par_vitesse = np.clip(1 - rapports, 0, 1)
+        par_temps = np.clip(1 - 1 / indices_temps, 0, 1)
+    poids = np.where(np.isnan(par_temps), 0, np.nan_to_num(np.clip(fiabilites / 100, 0, 1)))
+    congestions = np.where(np.isnan(par_vitesse), np.where(poids > 0, par_temps, np.nan),
+                           poids * np.nan_to_num(par_temps) + (1 - poids) * par_vitesse)
+    return rapports, indices_temps, congestions
+
+# Fonction pour calculer la congestion de chaque tronçon d'un relevé (analyse_data_reparation_velo_trafic).
+# Renvoie (tronçons sans la géométrie, avec longueur, rapport_vitesse, indice_temps et congestion ;
+# LignesMultiples projetées de leurs géométries)
+def congestion_troncons(data_trafic):
+    lignes = lignes_troncons(data_trafic)
+    longueurs = longueurs_entites(lignes, len(data_trafic))
+    rapports, indices_temps, congestions = indices_congestion(
+        pd.to_numeric(data_trafic['averagevehiclespeed'], errors="coerce"), pd.to_numeric(data_trafic['vitesse_maxi'], errors="coerce"),
+        pd.to_numeric(data_trafic['traveltime'], errors="coerce"), pd.to_numeric(data_trafic['traveltimereliability'], errors="coerce"),
+        longueurs)
+    troncons = data_trafic.drop(columns='geometrie').assign(longueur=longueurs, rapport_vitesse=rapports,
+                                                            indice_temps=indices_temps, congestion=congestions)
+    return troncons, lignes
+
+# Indice de chaque route (dénomination) : moyenne des congestions de ses tronçons pondérée par leur
+# longueur. Renvoie un DataFrame denomination, longueur (des tronçons dont l'indice est connu), congestion.
+def congestion_routes(troncons):
+    codes, routes = pd.factorize(troncons['denomination'])
+    congestions = troncons['congestion'].to_numpy(dtype=np.float64)
+    longueurs = troncons['longueur'].to_numpy(dtype=np.float64)
+    valides = (codes >= 0) & ~np.isnan(congestions) & (longueurs > 0)
+    poids = np.bincount(codes[valides], longueurs[valides], minlength=len(routes))
+    sommes = np.bincount(codes[valides], (congestions * longueurs)[valides], minlength=len(routes))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return pd.DataFrame({'denomination': routes, 'longueur': poids, 'congestion': sommes / poids})
+
+# Fonction pour préparer la carte de congestion : une ligne par partie de tronçon, colonnes des
+# tronçons et congestion_route (indice de sa route), sans les sommets. Les lignes sont dans l'ordre
+# des parties de lignes_troncons(data_trafic).
+def carte_congestion(data_trafic):
+    troncons, lignes = congestion_troncons(data_trafic)
+    routes = congestion_routes(troncons).set_index('denomination')['congestion']
+    troncons['congestion_route'] = troncons['denomination'].map(routes)
+    return troncons.iloc[lignes.entites].reset_index(drop=True)